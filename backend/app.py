@@ -1,18 +1,50 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, g, has_app_context, stream_with_context
 from flask_cors import CORS
+from collections.abc import Mapping
 import json
+import time
 import traceback
 from datetime import datetime
 import os
-import speech_recognition as sr
-import io
 import base64
 
 # Import our models
 from models.nutrition import NutritionCalculator
+from models.catalog_manager import create_catalog_manager
 from models.diet_engine import DietEngine
+from models.food_store import DEFAULT_PAGE_SIZE, TAG_FIELDS, TEXT_FIELDS, create_food_store
+from models.instrumentation import StageTimings, stage_timings
+from models.plan_executor import get_default_workers, plan_options
+from models.plan_model import PLAN_TYPES, WeeklyPlan, plan_json_default, to_columnar
+from models.session_store import create_session_store
+from models.result_cache import NutritionSummaryCache, PlanResponseCache, canonical_hash
+from models.serialization import (
+    DEFAULT_COMPRESS_MIN_BYTES, compress, create_json_provider, encode, negotiate_encoding
+)
+from models.transcription import (
+    TranscriberBusyError, TranscriptionServiceError, UnintelligibleAudioError, create_transcriber
+)
 
 app = Flask(__name__)
+# orjson-backed when installed (see JSON_ENCODER)
+app.json = create_json_provider(app)
+flask_json_default = app.json.default
+
+def json_default(value):
+    """Plans stay compact objects until a response is serialized"""
+    if isinstance(value, PLAN_TYPES):
+        return value.to_json()
+    return flask_json_default(value)
+
+app.json.default = json_default
+
+# Compress JSON responses of at least COMPRESS_MIN_BYTES (RESPONSE_COMPRESSION=0 turns it off)
+RESPONSE_COMPRESSION = os.environ.get('RESPONSE_COMPRESSION', '1') != '0'
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', DEFAULT_COMPRESS_MIN_BYTES))
+PLAN_FORMATS = ('full', 'columnar')
+# Plan seeds are 63-bit, like new_plan_seed() draws (and the JSON encoders can represent)
+MAX_PLAN_SEED = 2 ** 63
+
 # CORS configuration
 CORS(app, supports_credentials=True, origins=[
     "http://127.0.0.1:5501", 
@@ -25,33 +57,138 @@ CORS(app, supports_credentials=True, origins=[
 
 # Initialize our engines
 nutrition_calc = NutritionCalculator()
-diet_engine = DietEngine()
+# Food catalog, meal index and plan workers; reloaded when data/ changes (see CATALOG_POLL_SECONDS)
+catalog_manager = create_catalog_manager(max_workers=get_default_workers())
+nutrition_cache = NutritionSummaryCache(
+    nutrition_calc, max_entries=int(os.environ.get('NUTRITION_CACHE_SIZE', 4096))
+)
+plan_cache = PlanResponseCache(
+    max_entries=int(os.environ.get('PLAN_CACHE_SIZE', 256)),
+    compress=os.environ.get('PLAN_CACHE_GZIP', '1') != '0'
+)
+
+# Responses cached for the previous catalog version can't be served again
+catalog_manager.add_listener(lambda snapshot: plan_cache.clear())
+
+# Indexed food search (SQLite at FOOD_DB_PATH), rebuilt with each catalog version
+food_store = create_food_store(catalog_manager.engine)
+if food_store is not None:
+    catalog_manager.add_listener(lambda snapshot: food_store.refresh(snapshot.engine))
+
+# Speech-to-text engine pool (google, vosk or whisper; see SPEECH_BACKEND)
+transcriber = create_transcriber()
 
-# Initialize speech recognition
-recognizer = sr.Recognizer()
+# Session storage backend (memory, sqlite or redis; see SESSION_BACKEND)
+session_store = create_session_store()
 
-# In-memory session storage (simple dict)
-sessions = {}
+# Per-endpoint request latency, labelled with the response status
+request_timings = StageTimings(('endpoint', 'status'), enabled=stage_timings.enabled)
+
+def current_catalog():
+    """Catalog snapshot for this request, taken once so a reload mid-request can't mix versions"""
+    if not has_app_context():
+        return catalog_manager.snapshot
+    if 'catalog' not in g:
+        g.catalog = catalog_manager.snapshot
+    return g.catalog
 
 def get_or_create_session(session_id):
     """Get or create a session"""
-    if session_id not in sessions:
-        sessions[session_id] = {
-            'step': 'greeting',
-            'data': {}
-        }
-    return sessions[session_id]
+    return session_store.get_or_create(session_id)
+
+if request_timings.enabled:
+    @app.before_request
+    def start_request_timer():
+        request.environ['diet.started'] = time.perf_counter()
+    
+    @app.after_request
+    def record_request_time(response):
+        started = request.environ.get('diet.started')
+        if started is not None:
+            request_timings.observe(
+                (request.endpoint or 'unmatched', str(response.status_code)), time.perf_counter() - started
+            )
+        return response
+
+@app.after_request
+def compress_response(response):
+    """Compress large JSON bodies with the best coding the client accepts (br, gzip)"""
+    if (not RESPONSE_COMPRESSION or response.is_streamed or response.status_code != 200
+            or response.mimetype != 'application/json' or 'Content-Encoding' in response.headers):
+        return response
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding(request.accept_encodings)
+    if encoding is not None:
+        response.set_data(compress(body, encoding))
+        response.headers['Content-Encoding'] = encoding
+    return response
 
 @app.route('/')
 def home():
     return jsonify({"message": "Diet Chatbot API is running!", "status": "success"})
 
+@app.route('/metrics')
+def metrics():
+    """Prometheus text-format metrics"""
+    lines = []
+    cache_stats = nutrition_cache.stats()
+    plan_stats = plan_cache.stats()
+    enrichment_stats = catalog_manager.engine.meal_enrichment.stats()
+    catalog_stats = catalog_manager.stats()
+    voice_stats = transcriber.stats()
+    for name, kind, help_text, value in [
+        ('diet_nutrition_cache_hits_total', 'counter', 'Nutrition summary cache hits', cache_stats['hits']),
+        ('diet_nutrition_cache_misses_total', 'counter', 'Nutrition summary cache misses', cache_stats['misses']),
+        ('diet_nutrition_cache_entries', 'gauge', 'Nutrition summaries currently cached', cache_stats['entries']),
+        ('diet_nutrition_cache_hit_ratio', 'gauge', 'Nutrition summary cache hit rate', cache_stats['hit_rate']),
+        ('diet_plan_cache_hits_total', 'counter', 'Meal plan response cache hits', plan_stats['hits']),
+        ('diet_plan_cache_misses_total', 'counter', 'Meal plan response cache misses', plan_stats['misses']),
+        ('diet_plan_cache_entries', 'gauge', 'Meal plan responses currently cached', plan_stats['entries']),
+        ('diet_meal_enrichment_hits_total', 'counter', 'Enriched meals served from the table', enrichment_stats['hits']),
+        ('diet_meal_enrichment_misses_total', 'counter', 'Meals enriched on first use', enrichment_stats['misses']),
+        ('diet_meal_enrichment_entries', 'gauge', 'Enriched meals currently kept', enrichment_stats['entries']),
+        ('diet_catalog_version', 'gauge', 'Catalog version being served (counts successful reloads)', catalog_stats['version']),
+        ('diet_catalog_reloads_total', 'counter', 'Catalog reloads by outcome', catalog_stats['reloads']),
+        ('diet_voice_requests_total', 'counter', 'Voice transcriptions by outcome', voice_stats['outcomes']),
+        ('diet_voice_in_flight', 'gauge', 'Voice transcriptions running or queued', voice_stats['in_flight']),
+        ('diet_voice_queued', 'gauge', 'Voice transcriptions waiting for an engine', voice_stats['queued']),
+        ('diet_voice_latency_seconds', 'summary', 'Voice transcription latency', voice_stats['latency']),
+        ('diet_voice_wait_seconds', 'summary', 'Time spent waiting for a speech engine', voice_stats['wait_time']),
+        ('diet_stage_seconds', 'histogram', 'Time spent in each plan/response stage', stage_timings),
+        ('diet_request_seconds', 'histogram', 'Request handling time by endpoint and status', request_timings)
+    ]:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == 'summary':
+            for quantile, amount in value['quantiles'].items():
+                lines.append(f'{name}{{quantile="{quantile}"}} {amount}')
+            lines.append(f"{name}_sum {value['sum']}")
+            lines.append(f"{name}_count {value['count']}")
+        elif kind == 'histogram':
+            for labels, histogram in value.snapshot().items():
+                label_text = ','.join(f'{label}="{item}"' for label, item in zip(value.label_names, labels))
+                for bound, amount in histogram['buckets']:
+                    lines.append(f'{name}_bucket{{{label_text},le="{bound}"}} {amount}')
+                lines.append(f"{name}_sum{{{label_text}}} {histogram['sum']}")
+                lines.append(f"{name}_count{{{label_text}}} {histogram['count']}")
+        elif isinstance(value, dict):
+            for label, amount in value.items():
+                lines.append(f'{name}{{outcome="{label}"}} {amount}')
+        else:
+            lines.append(f"{name} {value}")
+    
+    return Response("\n".join(lines) + "\n", mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     """Main chat endpoint"""
     try:
         data = request.get_json()
         session_id = data.get('session_id', 'default_session')
+        user_id = data.get('user_id')
         message = data.get('message', '')
         message_type = data.get('message_type', 'text')  # text, voice
         
@@ -65,16 +202,29 @@ def chat():
             message = str(message).strip().lower()
         
         # Process conversation
-        response = process_enhanced_conversation(session_data, message)
+        stream = wants_event_stream(data)
+        response = process_enhanced_conversation(session_data, message, stream)
+        
+        if stream:
+            return Response(
+                stream_with_context(stream_chat_events(session_id, session_data, response, user_id)),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
         
-        # Update session
-        sessions[session_id] = session_data
+        # Update session (one write per request)
+        session_store.save(session_id, session_data, user_id)
         
         # Add session_id to response
         response['session_id'] = session_id
         
         return jsonify(response)
         
+    except ValueError as e:
+        return jsonify({
+            "error": str(e),
+            "status": "error"
+        }), 400
     except Exception as e:
         print(f"Error in chat endpoint: {str(e)}")
         traceback.print_exc()
@@ -83,6 +233,41 @@ def chat():
             "status": "error"
         }), 500
 
+def wants_event_stream(data):
+    """Whether the client asked for Server-Sent Events (?stream=1, "stream": true or Accept)"""
+    if request.args.get('stream', '').lower() in ('1', 'true'):
+        return True
+    if data.get('stream') is True:
+        return True
+    return request.accept_mimetypes.best == 'text/event-stream'
+
+def format_sse(event, payload):
+    """Encode one Server-Sent Event"""
+    return f"event: {event}\ndata: {app.json.dumps(payload)}\n\n"
+
+def stream_chat_events(session_id, session_data, response, user_id=None):
+    """SSE stream for a chat reply; plan generation is sent section by section"""
+    if isinstance(response, dict):
+        response['session_id'] = session_id
+        session_store.save(session_id, session_data, user_id)
+        yield format_sse('complete', response)
+        return
+    
+    try:
+        for event, payload in response:
+            if event == 'complete':
+                # Every section was already streamed; finish with the message only
+                payload = {key: value for key, value in payload.items() if key != 'data'}
+                payload['session_id'] = session_id
+            yield format_sse(event, payload)
+    except Exception as e:
+        print(f"Error generating enhanced diet plan: {str(e)}")
+        traceback.print_exc()
+        error = plan_error_response()
+        error['session_id'] = session_id
+        yield format_sse('error', error)
+    session_store.save(session_id, session_data, user_id)
+
 @app.route('/api/reset', methods=['POST'])
 def reset_session():
     """Reset chat session"""
@@ -91,26 +276,114 @@ def reset_session():
         session_id = data.get('session_id', 'default_session')
         
         # Reset session
-        sessions[session_id] = {
-            'step': 'greeting',
-            'data': {}
-        }
+        session_store.reset(session_id, data.get('user_id'))
         
         return jsonify({
             "message": "Session reset successfully!",
             "status": "success"
         })
         
+    except ValueError as e:
+        return jsonify({
+            "error": str(e),
+            "status": "error"
+        }), 400
     except Exception as e:
         return jsonify({
             "error": str(e),
             "status": "error"
         }), 500
 
+# Raw audio uploads are read from the request stream in chunks of this size
+VOICE_CHUNK_BYTES = 8192
+STREAMING_AUDIO_TYPES = ('audio/wav', 'audio/wave', 'audio/x-wav', 'application/octet-stream')
+
+def voice_busy_response():
+    response = jsonify({
+        'success': False,
+        'error': 'Voice service is busy, please try again'
+    })
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+def iter_voice_stream(session):
+    """Read the upload chunk by chunk; yields partial transcripts, then the final one"""
+    try:
+        for chunk in iter(lambda: request.stream.read(VOICE_CHUNK_BYTES), b''):
+            partial = session.feed(chunk)
+            if partial:
+                yield 'partial', {'text': partial}
+        text, latency = session.finish()
+        yield 'final', {
+            'success': True,
+            'transcribed_text': text,
+            'message': 'Voice processed successfully',
+            'latency_ms': round(latency * 1000, 1)
+        }
+    finally:
+        session.close()
+
+def stream_voice_events(session):
+    """SSE stream of partial transcripts while the audio is still uploading"""
+    try:
+        for event, payload in iter_voice_stream(session):
+            yield format_sse(event, payload)
+    except UnintelligibleAudioError:
+        yield format_sse('error', {'success': False, 'error': 'Could not understand audio'})
+    except TranscriptionServiceError as e:
+        yield format_sse('error', {'success': False, 'error': f'Speech recognition service error: {str(e)}'})
+    except Exception as e:
+        print(f"Voice processing error: {str(e)}")
+        yield format_sse('error', {'success': False, 'error': 'Voice processing failed'})
+
+def process_voice_stream():
+    """Raw WAV body (optionally chunked) fed to the speech engine as it arrives"""
+    try:
+        session = transcriber.open_stream()
+    except TranscriberBusyError:
+        return voice_busy_response()
+    except TranscriptionServiceError as e:
+        return jsonify({
+            'success': False,
+            'error': f'Speech recognition service error: {str(e)}'
+        }), 500
+    
+    if wants_event_stream({}):
+        return Response(
+            stream_with_context(stream_voice_events(session)),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+    
+    try:
+        result = None
+        for event, payload in iter_voice_stream(session):
+            result = payload
+        return jsonify(result)
+    except UnintelligibleAudioError:
+        return jsonify({
+            'success': False,
+            'error': 'Could not understand audio'
+        }), 400
+    except TranscriptionServiceError as e:
+        return jsonify({
+            'success': False,
+            'error': f'Speech recognition service error: {str(e)}'
+        }), 500
+    except Exception as e:
+        print(f"Voice processing error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Voice processing failed'
+        }), 500
+
 # Voice Input Processing Endpoint
 @app.route('/api/process-voice', methods=['POST'])
 def process_voice():
     """Process voice input from user"""
+    if request.mimetype in STREAMING_AUDIO_TYPES:
+        return process_voice_stream()
+    
     try:
         data = request.get_json()
         audio_data = data.get('audio_data')  # Base64 encoded audio
@@ -121,26 +394,27 @@ def process_voice():
         # Decode base64 audio data
         audio_bytes = base64.b64decode(audio_data)
         
-        # Use speech recognition to convert to text
-        with sr.AudioFile(io.BytesIO(audio_bytes)) as source:
-            audio = recognizer.record(source)
-            try:
-                text = recognizer.recognize_google(audio)
-                return jsonify({
-                    'success': True,
-                    'transcribed_text': text,
-                    'message': 'Voice processed successfully'
-                })
-            except sr.UnknownValueError:
-                return jsonify({
-                    'success': False,
-                    'error': 'Could not understand audio'
-                }), 400
-            except sr.RequestError as e:
-                return jsonify({
-                    'success': False,
-                    'error': f'Speech recognition service error: {str(e)}'
-                }), 500
+        # Transcribe on a pooled speech engine
+        try:
+            text, latency = transcriber.transcribe(audio_bytes)
+            return jsonify({
+                'success': True,
+                'transcribed_text': text,
+                'message': 'Voice processed successfully',
+                'latency_ms': round(latency * 1000, 1)
+            })
+        except UnintelligibleAudioError:
+            return jsonify({
+                'success': False,
+                'error': 'Could not understand audio'
+            }), 400
+        except TranscriberBusyError:
+            return voice_busy_response()
+        except TranscriptionServiceError as e:
+            return jsonify({
+                'success': False,
+                'error': f'Speech recognition service error: {str(e)}'
+            }), 500
                 
     except Exception as e:
         print(f"Voice processing error: {str(e)}")
@@ -229,6 +503,11 @@ def get_food_categories():
                 {"id": "autumn", "name": "Autumn", "months": "Oct-Nov"}
             ]
         }
+        if food_store is not None:
+            categories["food_groups"] = [
+                {"id": category, "name": category.replace('_', ' ').title(), "count": count}
+                for category, count in food_store.category_counts().items()
+            ]
         
         return jsonify({
             'success': True,
@@ -241,6 +520,42 @@ def get_food_categories():
             'error': str(e)
         }), 500
 
+@app.route('/api/foods/search', methods=['GET'])
+def search_foods():
+    """Search foods and meals, e.g. ?q=iron_mg > 3 and vegetarian and season=winter&sort=-iron&limit=20"""
+    if food_store is None:
+        return jsonify({"error": "Food search is disabled (FOOD_DB_PATH is empty)", "status": "error"}), 503
+    try:
+        filters = food_store.parse_query(request.args.get('q', ''))
+        # Plain field=value parameters are added to the query
+        for field in TEXT_FIELDS + TAG_FIELDS:
+            if field in request.args:
+                filters.append((field, '=', request.args[field]))
+        
+        foods, next_cursor = food_store.search(
+            filters,
+            sort=request.args.get('sort'),
+            limit=request.args.get('limit', DEFAULT_PAGE_SIZE),
+            cursor=request.args.get('cursor')
+        )
+        return jsonify({
+            "foods": foods,
+            "count": len(foods),
+            "next_cursor": next_cursor,
+            "status": "success"
+        })
+        
+    except ValueError as e:
+        return jsonify({
+            "error": str(e),
+            "status": "error"
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "error": str(e),
+            "status": "error"
+        }), 500
+
 # Enhanced nutrition calculation endpoint
 @app.route('/api/nutrition', methods=['POST'])
 def calculate_nutrition():
@@ -248,7 +563,7 @@ def calculate_nutrition():
     try:
         data = request.get_json()
         
-        nutrition_summary = nutrition_calc.get_enhanced_nutrition_summary(
+        nutrition_summary = nutrition_cache.get(
             data['weight'],
             data['height'],
             data['age'],
@@ -273,9 +588,34 @@ def generate_meal_plan():
     """Enhanced meal plan generation endpoint"""
     try:
         data = request.get_json()
+        response_format = request.args.get('format', 'full')
+        if response_format not in PLAN_FORMATS:
+            return jsonify({
+                "error": f"Unknown format: {response_format} (expected one of {', '.join(PLAN_FORMATS)})",
+                "status": "error"
+            }), 400
+        
+        options_error = plan_seed_error(data) or plan_solver_error(data)
+        if options_error:
+            return jsonify({"error": options_error, "status": "error"}), 400
+        
+        # Identical requests map to the same seed, so their plans can be cached
+        profile = {key: value for key, value in data.items() if key != 'seed'}
+        seed = get_plan_seed(data, default=int(canonical_hash(profile)[:15], 16))
+        cache_profile = profile if response_format == 'full' else dict(profile, format=response_format)
+        etag = plan_cache.key(cache_profile, current_catalog().engine.data_version, seed)
+        
+        if request.if_none_match.contains(etag):
+            return plan_response(b'', etag, status=304)
+        
+        accept_gzip = 'gzip' in request.accept_encodings
+        cached = plan_cache.get(etag, accept_gzip)
+        if cached:
+            body, gzipped = cached
+            return plan_response(body, etag, gzipped)
         
         # Calculate enhanced nutrition first
-        nutrition_summary = nutrition_calc.get_enhanced_nutrition_summary(
+        nutrition_summary = nutrition_cache.get(
             data['weight'],
             data['height'],
             data['age'],
@@ -284,38 +624,254 @@ def generate_meal_plan():
             data.get('timeline', 'short_term')
         )
         
-        # Generate enhanced meal plan
-        weekly_plan = diet_engine.generate_enhanced_weekly_plan(
-            data, 
-            nutrition_summary,
-            health_conditions=data.get('health_conditions', []),
-            cost_preference=data.get('cost_preference', 'medium'),
-            food_style=data.get('food_style', 'both'),
-            current_season=data.get('current_season', 'spring')
-        )
+        weekly_plan = current_catalog().executor.generate_weekly_plan(data, nutrition_summary, seed, **plan_options(data))
         
-        recommendations = diet_engine.get_enhanced_health_recommendations(
-            data, 
-            nutrition_summary,
-            health_conditions=data.get('health_conditions', [])
-        )
+        response = build_meal_plan(data, nutrition_summary, weekly_plan)
+        response.update({'seed': seed, 'status': 'success'})
+        if response_format == 'columnar':
+            response.update({'weekly_plan': to_columnar(weekly_plan), 'format': 'columnar'})
         
-        grocery_list = diet_engine.generate_grocery_list(weekly_plan)
+        with stage_timings.stage('response_formatting'):
+            body = app.json.dumps(response).encode('utf-8')
+        if not weekly_plan.complete:
+            # The solver's time budget ran out, so the seed may not reproduce this plan
+            return plan_response(body, None)
+        plan_cache.put(etag, body)
+        return plan_response(body, etag)
         
+    except Exception as e:
         return jsonify({
-            "nutrition_summary": nutrition_summary,
-            "weekly_plan": weekly_plan,
-            "recommendations": recommendations,
-            "grocery_list": grocery_list,
-            "status": "success"
-        })
+            "error": str(e),
+            "status": "error"
+        }), 500
+
+def plan_response(body, etag, gzipped=False, status=200):
+    """Serialized plan response carrying its ETag (None: a plan that must not be cached)"""
+    response = Response(body, status=status, mimetype='application/json')
+    if etag is None:
+        response.headers['Cache-Control'] = 'no-store'
+    else:
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
+    if gzipped:
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+def plan_seed_error(data):
+    """Return an error message if the request's seed isn't an integer in [0, 2**63), or None"""
+    seed = data.get('seed')
+    if seed is None:
+        return None
+    if isinstance(seed, bool) or not isinstance(seed, int):
+        return "seed must be an integer"
+    if not 0 <= seed < MAX_PLAN_SEED:
+        return "seed must be between 0 and 2**63 - 1"
+    return None
+
+def plan_solver_error(data):
+    """Return an error message if the request's solver or time_budget_ms is unusable, or None"""
+    solver = data.get('solver', 'greedy')
+    if solver not in DietEngine.SOLVERS:
+        return f"Unknown solver: {solver} (expected one of {', '.join(DietEngine.SOLVERS)})"
+    budget = data.get('time_budget_ms')
+    if budget is None:
+        return None
+    if isinstance(budget, bool) or not isinstance(budget, (int, float)) or not budget > 0:
+        return "time_budget_ms must be a positive number"
+    return None
+
+def get_plan_seed(data, default=None):
+    """Use the request's plan seed if given, otherwise the default or a new one"""
+    seed = data.get('seed')
+    if seed is None:
+        return default if default is not None else current_catalog().engine.new_plan_seed()
+    return int(seed)
+
+def build_meal_plan(data, nutrition_summary, weekly_plan):
+    """Add recommendations and the grocery list to a generated weekly plan"""
+    recommendations = current_catalog().engine.get_enhanced_health_recommendations(
+        data, 
+        nutrition_summary,
+        health_conditions=data.get('health_conditions', [])
+    )
+    
+    grocery_list = current_catalog().engine.generate_grocery_list(weekly_plan)
+    
+    return {
+        "nutrition_summary": nutrition_summary,
+        "weekly_plan": weekly_plan,
+        "recommendations": recommendations,
+        "grocery_list": grocery_list
+    }
+
+@app.route('/api/meal-plan/swap', methods=['POST'])
+def swap_meal():
+    """Replace one meal of an existing plan
+    
+    Body: the profile fields used for /api/meal-plan plus weekly_plan, day,
+    meal_type and optionally constraints, grocery_list and rebalance. Only
+    the changed meals, that day's totals and the grocery list (with its
+    delta) are returned.
+    """
+    try:
+        data = request.get_json()
+        for field in ('weekly_plan', 'day', 'meal_type'):
+            if field not in data:
+                return jsonify({"error": f"Missing field: {field}", "status": "error"}), 400
+        
+        nutrition_summary = nutrition_cache.get(
+            data['weight'],
+            data['height'],
+            data['age'],
+            data['gender'],
+            data['goal'],
+            data.get('timeline', 'short_term')
+        )
+        
+        patch = current_catalog().engine.swap_meal(
+            data['weekly_plan'], data['day'], data['meal_type'],
+            constraints=data.get('constraints'),
+            user_data=data,
+            nutrition_summary=nutrition_summary,
+            grocery_list=data.get('grocery_list'),
+            rebalance=bool(data.get('rebalance', False))
+        )
+        patch['status'] = 'success'
+        return jsonify(patch)
         
+    except ValueError as e:
+        return jsonify({
+            "error": str(e),
+            "status": "error"
+        }), 400
     except Exception as e:
         return jsonify({
             "error": str(e),
             "status": "error"
         }), 500
 
+# Profiles are summarized together in chunks of this size
+BATCH_CHUNK_SIZE = 256
+BATCH_REQUIRED_FIELDS = ['weight', 'height', 'age', 'gender', 'goal', 'region', 'food_preference']
+
+def validate_batch_profile(profile):
+    """Return an error message for an unusable batch profile, or None"""
+    if not isinstance(profile, dict):
+        return "Profile must be a JSON object"
+    missing = [field for field in BATCH_REQUIRED_FIELDS if field not in profile]
+    if missing:
+        return f"Missing fields: {', '.join(missing)}"
+    try:
+        for field in ['weight', 'height', 'age']:
+            if float(profile[field]) <= 0:
+                return f"Invalid {field}"
+    except (TypeError, ValueError):
+        return "weight, height and age must be numbers"
+    return plan_seed_error(profile) or plan_solver_error(profile)
+
+def iter_ndjson_profiles():
+    """Yield one profile per line of an NDJSON request body (None for a line that isn't JSON)"""
+    for line in request.stream:
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None
+
+def get_batch_profiles():
+    """Profiles from an NDJSON stream or a JSON list/{"profiles": [...]} body
+
+    A JSON body is checked before anything is streamed; raises ValueError
+    if it holds no list of profiles.
+    """
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        return iter_ndjson_profiles()
+    
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('profiles', [])
+    if not isinstance(data, list):
+        raise ValueError('Request body must be a JSON list of profiles or {"profiles": [...]}')
+    return data
+
+def iter_chunks(items, size):
+    """Group an iterable into lists of at most size items"""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+@app.route('/api/meal-plan/batch', methods=['POST'])
+def generate_meal_plan_batch():
+    """Generate meal plans for many profiles, streamed back as NDJSON"""
+    try:
+        profiles = get_batch_profiles()
+    except ValueError as e:
+        return jsonify({
+            "error": str(e),
+            "status": "error"
+        }), 400
+    
+    def generate():
+        started = time.perf_counter()
+        completed = 0
+        failed = 0
+        index = 0
+        
+        for chunk in iter_chunks(profiles, BATCH_CHUNK_SIZE):
+            valid = []
+            for profile in chunk:
+                error = validate_batch_profile(profile)
+                if error:
+                    failed += 1
+                    yield encode({"index": index, "status": "error", "error": error}) + b"\n"
+                else:
+                    valid.append((index, profile))
+                index += 1
+            
+            summaries = nutrition_cache.get_many([profile for _, profile in valid])
+            jobs = []
+            for (_, profile), nutrition_summary in zip(valid, summaries):
+                try:
+                    jobs.append((profile, nutrition_summary, plan_options(profile), get_plan_seed(profile)))
+                except Exception as e:
+                    jobs.append(e)
+            
+            # Every plan has its own handle, so a failing profile only fails its own line
+            executor = current_catalog().executor
+            handles = iter(executor.submit_weekly_plans([job for job in jobs if not isinstance(job, Exception)]))
+            for (profile_index, profile), job in zip(valid, jobs):
+                try:
+                    if isinstance(job, Exception):
+                        raise job
+                    _, nutrition_summary, _, seed = job
+                    result = build_meal_plan(profile, nutrition_summary, next(handles)())
+                    result.update({"index": profile_index, "id": profile.get('id'), "seed": seed, "status": "success"})
+                    completed += 1
+                except Exception as e:
+                    result = {"index": profile_index, "id": profile.get('id'), "status": "error", "error": str(e)}
+                    failed += 1
+                with stage_timings.stage('response_formatting'):
+                    line = encode(result, plan_json_default) + b"\n"
+                yield line
+        
+        elapsed = time.perf_counter() - started
+        yield encode({
+            "status": "complete",
+            "plans": completed,
+            "errors": failed,
+            "elapsed_seconds": round(elapsed, 3),
+            "plans_per_second": round(completed / elapsed, 2) if elapsed > 0 else 0
+        }) + b"\n"
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/api/health-conditions', methods=['GET'])
 def get_health_conditions():
     """Get list of available health conditions"""
@@ -345,8 +901,12 @@ def get_health_conditions():
         }), 500
 
 # All conversation processing functions remain the same
-def process_enhanced_conversation(session, message):
-    """Enhanced conversation flow with all new features"""
+def process_enhanced_conversation(session, message, stream=False):
+    """Enhanced conversation flow with all new features
+    
+    With stream=True the final step returns the iter_enhanced_diet_plan()
+    generator instead of the finished response.
+    """
     step = session['step']
     user_data = session['data']
     
@@ -625,6 +1185,8 @@ def process_enhanced_conversation(session, message):
             }
         
         # Generate the enhanced diet plan
+        if stream:
+            return iter_enhanced_diet_plan(session)
         return generate_enhanced_diet_plan(session)
     
     else:
@@ -672,76 +1234,99 @@ def parse_health_conditions(message):
 def generate_enhanced_diet_plan(session):
     """Generate the comprehensive diet plan with all enhancements"""
     try:
-        user_data = session['data']
-        
-        # Calculate comprehensive nutrition metrics
-        nutrition_summary = nutrition_calc.get_enhanced_nutrition_summary(
-            user_data['weight'],
-            user_data['height'],
-            user_data['age'],
-            user_data['gender'],
-            user_data['goal'],
-            user_data['timeline']
-        )
-        
-        # Generate enhanced weekly meal plan
-        weekly_plan = diet_engine.generate_enhanced_weekly_plan(
-            user_data, 
-            nutrition_summary,
-            health_conditions=user_data.get('health_conditions', []),
-            cost_preference=user_data.get('cost_preference', 'medium'),
-            food_style=user_data.get('food_style', 'both'),
-            current_season=user_data.get('current_season', 'spring')
-        )
-        
-        # Get enhanced health recommendations
-        recommendations = diet_engine.get_enhanced_health_recommendations(
-            user_data, 
-            nutrition_summary,
-            health_conditions=user_data.get('health_conditions', [])
-        )
-        
-        # Generate grocery list
-        grocery_list = diet_engine.generate_grocery_list(weekly_plan)
-        
-        # Format comprehensive response
-        response_message = format_enhanced_diet_plan_response(
-            user_data, nutrition_summary, weekly_plan, recommendations, grocery_list
-        )
-        
-        # Reset session
-        session['step'] = 'completed'
-        session['plan'] = {
-            'nutrition_summary': nutrition_summary,
-            'weekly_plan': weekly_plan,
-            'recommendations': recommendations,
-            'grocery_list': grocery_list
-        }
-        
-        return {
-            "message": response_message,
-            "step": "completed",
-            "status": "success",
-            "data": {
-                "nutrition_summary": nutrition_summary,
-                "weekly_plan": weekly_plan,
-                "recommendations": recommendations,
-                "grocery_list": grocery_list,
-                "user_profile": user_data
-            }
-        }
+        for event, payload in iter_enhanced_diet_plan(session):
+            pass
+        return payload
         
     except Exception as e:
         print(f"Error generating enhanced diet plan: {str(e)}")
         traceback.print_exc()
-        return {
-            "message": "I apologize, but there was an error generating your comprehensive diet plan. Please try again.",
-            "step": "greeting",
-            "status": "error"
+        return plan_error_response()
+
+def plan_error_response():
+    """Chat response for a failed plan generation"""
+    return {
+        "message": "I apologize, but there was an error generating your comprehensive diet plan. Please try again.",
+        "step": "greeting",
+        "status": "error"
+    }
+
+def iter_enhanced_diet_plan(session):
+    """Generate the diet plan section by section
+    
+    Yields (event, payload) pairs: 'profile' with the nutrition summary,
+    one 'day' per day as soon as it is generated, 'grocery' with the
+    recommendations and grocery list, and finally 'complete' with the full
+    chat response.
+    """
+    user_data = session['data']
+    
+    # Calculate comprehensive nutrition metrics
+    nutrition_summary = nutrition_cache.get(
+        user_data['weight'],
+        user_data['height'],
+        user_data['age'],
+        user_data['gender'],
+        user_data['goal'],
+        user_data['timeline']
+    )
+    yield 'profile', {
+        "message": format_profile_section(user_data, nutrition_summary),
+        "nutrition_summary": nutrition_summary,
+        "user_profile": user_data
+    }
+    
+    # Generate enhanced weekly meal plan
+    seed = current_catalog().engine.new_plan_seed()
+    weekly_plan = WeeklyPlan()
+    for day, day_plan in current_catalog().executor.iter_weekly_plan(
+        user_data, nutrition_summary, seed, **plan_options(user_data)
+    ):
+        weekly_plan[day] = day_plan
+        yield 'day', {"day": day, "plan": day_plan}
+    
+    # Get enhanced health recommendations
+    recommendations = current_catalog().engine.get_enhanced_health_recommendations(
+        user_data, 
+        nutrition_summary,
+        health_conditions=user_data.get('health_conditions', [])
+    )
+    
+    # Generate grocery list
+    grocery_list = current_catalog().engine.generate_grocery_list(weekly_plan)
+    yield 'grocery', {"recommendations": recommendations, "grocery_list": grocery_list}
+    
+    # Format comprehensive response
+    response_message = format_enhanced_diet_plan_response(
+        user_data, nutrition_summary, weekly_plan, recommendations, grocery_list
+    )
+    
+    # Reset session
+    session['step'] = 'completed'
+    session['plan'] = {
+        'seed': seed,
+        'nutrition_summary': nutrition_summary,
+        'weekly_plan': weekly_plan,
+        'recommendations': recommendations,
+        'grocery_list': grocery_list
+    }
+    
+    yield 'complete', {
+        "message": response_message,
+        "step": "completed",
+        "status": "success",
+        "data": {
+            "nutrition_summary": nutrition_summary,
+            "weekly_plan": weekly_plan,
+            "recommendations": recommendations,
+            "grocery_list": grocery_list,
+            "user_profile": user_data
         }
+    }
 
-def format_enhanced_diet_plan_response(user_data, nutrition_summary, weekly_plan, recommendations, grocery_list):
-    """Format the enhanced diet plan response message"""
+@stage_timings.timed('response_formatting')
+def format_profile_section(user_data, nutrition_summary):
+    """Format the profile and nutrition part of the diet plan message"""
     
     # User profile summary
     profile = f"Your Complete Profile\n"
@@ -766,12 +1351,20 @@ def format_enhanced_diet_plan_response(user_data, nutrition_summary, weekly_plan
     if 'minerals' in nutrition_summary:
         nutrition += f"• Essential Minerals: Iron ({nutrition_summary['minerals'].get('iron', 18)}mg), Calcium ({nutrition_summary['minerals'].get('calcium', 1000)}mg)\n\n"
     
+    return profile + nutrition
+
+@stage_timings.timed('response_formatting')
+def format_enhanced_diet_plan_response(user_data, nutrition_summary, weekly_plan, recommendations, grocery_list):
+    """Format the enhanced diet plan response message"""
+    
+    profile_section = format_profile_section(user_data, nutrition_summary)
+    
     # Sample day with enhanced details
     monday_plan = weekly_plan.get('Monday', {})
     sample_day = f"Sample Day Menu (Monday)\n"
     
     for meal_type, meal_data in monday_plan.items():
-        if meal_type != 'totals' and isinstance(meal_data, dict):
+        if meal_type != 'totals' and isinstance(meal_data, Mapping):
             sample_day += f"**{meal_type.title()}:** {meal_data.get('name', 'N/A')}\n"
             sample_day += f"  • Calories: {meal_data.get('calories', 0)} kcal\n"
             sample_day += f"  • Prep Time: {meal_data.get('prep_time', '15 mins')}\n"
@@ -807,7 +1400,7 @@ def format_enhanced_diet_plan_response(user_data, nutrition_summary, weekly_plan
 
     final_message = f"""Your Enhanced 7-Day Diet Plan is Ready!
 
-{profile}{nutrition}{sample_day}{recs}{grocery_preview}{seasonal_text}
+{profile_section}{sample_day}{recs}{grocery_preview}{seasonal_text}
 
 Complete Features Included:
 - Full vitamin & mineral analysis
@@ -839,17 +1432,21 @@ if __name__ == '__main__':
     print("✅ Storage guidelines")
     print("✅ Grocery list generation")
     print("✅ Enhanced nutrition analysis")
-    print("✅ In-memory session storage (no database)")
+    print(f"✅ Session storage: {type(session_store).__name__}")
+    print(f"✅ Speech engine: {transcriber.engine_name}")
     print("✅ No authentication required")
     print("-" * 50)
     print("API Endpoints:")
-    print("POST /api/chat - Main chat endpoint")
+    print("POST /api/chat - Main chat endpoint (add ?stream=1 for Server-Sent Events)")
     print("POST /api/reset - Reset session")
-    print("POST /api/process-voice - Voice input processing")
+    print("POST /api/process-voice - Voice input processing (base64 JSON, or a raw audio/wav body; ?stream=1 for partial transcripts)")
     print("GET /api/current-season - Get current season")
     print("GET /api/food-categories - Get food categories")
     print("POST /api/nutrition - Complete nutrition analysis")
     print("POST /api/meal-plan - Enhanced meal planning")
+    print("POST /api/meal-plan/batch - Batch meal planning (JSON list or NDJSON in, NDJSON out)")
+    print("POST /api/meal-plan/swap - Swap one meal of a plan")
     print("GET /api/health-conditions - Get health conditions list")
+    print("GET /metrics - Prometheus metrics")
     print("-" * 50)
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,270 @@
+"""ASGI entry point for production serving
+
+    cd backend
+    gunicorn -c gunicorn.conf.py asgi:application
+
+The Flask handlers stay synchronous. The event loop only moves bytes:
+every request runs in a worker thread, and slow I/O routes (the remote
+speech call) get a separate pool so they can never starve chat traffic.
+CPU-bound plan generation goes to the process pool (PLAN_WORKERS).
+Request and response bodies are both forwarded chunk by chunk: the SSE and
+NDJSON endpoints keep streaming, and a raw audio upload reaches the speech
+engine while it is still being sent.
+"""
+import asyncio
+import os
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from app import app, catalog_manager
+
+# Routes that block on remote services
+SLOW_PATHS = ('/api/process-voice',)
+# Largest request body accepted (audio uploads are the biggest payload)
+DEFAULT_MAX_BODY = 16 * 1024 * 1024
+
+_END = object()
+
+
+class RequestBody:
+    """wsgi.input fed from the event loop while the handler reads it on its thread"""
+
+    def __init__(self, max_body):
+        self.max_body = max_body
+        self.chunks = deque()
+        self.size = 0
+        self.eof = False
+        self.error = None
+        self.too_large = False
+        self.condition = threading.Condition()
+
+    def feed(self, chunk):
+        with self.condition:
+            self.size += len(chunk)
+            if self.size > self.max_body:
+                self.too_large = True
+                self.error = RequestEntityTooLarge()
+            elif chunk:
+                self.chunks.append(chunk)
+            self.condition.notify_all()
+
+    def feed_eof(self, error=None):
+        with self.condition:
+            self.eof = True
+            self.error = self.error or error
+            self.condition.notify_all()
+
+    def read(self, size=-1):
+        with self.condition:
+            while True:
+                if self.error is not None:
+                    raise self.error
+                if self.chunks and (size is not None and size >= 0 or self.eof):
+                    break
+                if self.eof:
+                    return b''
+                self.condition.wait()
+            if size is None or size < 0:
+                data = b''.join(self.chunks)
+                self.chunks.clear()
+                return data
+            data = self.chunks.popleft()
+            if len(data) > size:
+                self.chunks.appendleft(data[size:])
+                data = data[:size]
+            return data
+
+    def readline(self, size=-1):
+        line = bytearray()
+        while size is None or size < 0 or len(line) < size:
+            chunk = self.read(1 if size is None or size < 0 else size - len(line))
+            if not chunk:
+                break
+            line += chunk
+            if chunk.endswith(b'\n'):
+                break
+        return bytes(line)
+
+    def __iter__(self):
+        return iter(self.readline, b'')
+
+
+class ASGIAdapter:
+    """Serve a WSGI application over ASGI using thread pools"""
+
+    def __init__(self, wsgi_app, max_threads=32, slow_paths=(), slow_threads=8,
+                 max_body=DEFAULT_MAX_BODY, on_shutdown=()):
+        self.wsgi_app = wsgi_app
+        self.slow_paths = tuple(slow_paths)
+        self.max_body = max_body
+        self.on_shutdown = list(on_shutdown)
+        self.executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix='asgi')
+        self.slow_executor = ThreadPoolExecutor(max_workers=slow_threads, thread_name_prefix='asgi-slow')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.handle_http(scope, receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def shutdown(self):
+        """Stop the thread pools and run shutdown hooks"""
+        for callback in self.on_shutdown:
+            callback()
+        self.executor.shutdown(wait=False)
+        self.slow_executor.shutdown(wait=False)
+
+    async def pump_body(self, receive, body):
+        """Move request body chunks from the server to the handler thread"""
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.feed_eof(ConnectionError('Client disconnected'))
+                return
+            body.feed(message.get('body', b''))
+            if body.error is not None or not message.get('more_body', False):
+                body.feed_eof()
+                return
+
+    def build_environ(self, scope, body):
+        """WSGI environ for an ASGI HTTP scope"""
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', ''),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': str(server[0]),
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': str(client[0]),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            # Chunked uploads have no Content-Length; input ends at the stream's EOF
+            'wsgi.input_terminated': True,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False
+        }
+        for raw_name, raw_value in scope.get('headers', []):
+            name = raw_name.decode('latin-1').upper().replace('-', '_')
+            value = raw_value.decode('latin-1')
+            if name == 'CONTENT_TYPE':
+                environ['CONTENT_TYPE'] = value
+            elif name == 'CONTENT_LENGTH':
+                environ['CONTENT_LENGTH'] = value
+            else:
+                key = f"HTTP_{name}"
+                environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+    async def handle_http(self, scope, receive, send):
+        content_length = dict(scope.get('headers', [])).get(b'content-length', b'0')
+        if content_length.isdigit() and int(content_length) > self.max_body:
+            await send({'type': 'http.response.start', 'status': 413,
+                        'headers': [(b'content-type', b'text/plain')]})
+            await send({'type': 'http.response.body', 'body': b'Request body too large'})
+            return
+
+        body = RequestBody(self.max_body)
+        pump = asyncio.ensure_future(self.pump_body(receive, body))
+        executor = self.slow_executor if scope['path'] in self.slow_paths else self.executor
+        loop = asyncio.get_running_loop()
+        # Small bound: a slow client pauses the handler instead of buffering the stream
+        queue = asyncio.Queue(maxsize=8)
+        disconnected = threading.Event()
+
+        def put(message):
+            if disconnected.is_set():
+                raise ConnectionError('Client disconnected')
+            asyncio.run_coroutine_threadsafe(queue.put(message), loop).result()
+
+        rejected = []
+
+        def start_response(status, headers, exc_info=None):
+            if body.too_large:
+                rejected.append(True)
+                # Whatever the handler made of the failed read, answer like an oversize Content-Length
+                status, headers = '413 Request Entity Too Large', [('Content-Type', 'text/plain')]
+            put({
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [
+                    (name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers
+                ]
+            })
+            return lambda data: put({'type': 'http.response.body', 'body': data, 'more_body': True})
+
+        def run():
+            # The whole request, body iteration included, stays on one thread:
+            # Flask's streaming contexts are bound to the thread that opened them
+            iterable = self.wsgi_app(self.build_environ(scope, body), start_response)
+            try:
+                if rejected:
+                    put({'type': 'http.response.body', 'body': b'Request body too large', 'more_body': True})
+                    return
+                for chunk in iterable:
+                    if chunk:
+                        put({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            finally:
+                if hasattr(iterable, 'close'):
+                    iterable.close()
+
+        task = loop.run_in_executor(executor, run)
+        task.add_done_callback(lambda _: loop.create_task(queue.put(_END)))
+        try:
+            while True:
+                message = await queue.get()
+                if message is _END:
+                    break
+                await send(message)
+        except Exception:
+            # Stop the handler at its next chunk and let it unwind
+            disconnected.set()
+            body.feed_eof(ConnectionError('Client disconnected'))
+            while await queue.get() is not _END:
+                pass
+            task.exception()
+            raise
+        finally:
+            # The handler may not have read the whole body; stop waiting for it
+            if not pump.done():
+                pump.cancel()
+        # Re-raise handler errors for the server to log / turn into a 500
+        await task
+        await send({'type': 'http.response.body', 'body': b''})
+
+
+application = ASGIAdapter(
+    app,
+    max_threads=int(os.environ.get('ASGI_THREADS', 32)),
+    slow_paths=SLOW_PATHS,
+    slow_threads=int(os.environ.get('ASGI_SLOW_THREADS', 8)),
+    max_body=int(os.environ.get('MAX_BODY_BYTES', DEFAULT_MAX_BODY)),
+    on_shutdown=[catalog_manager.shutdown]
+)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(application, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
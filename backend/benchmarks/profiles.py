@@ -0,0 +1,69 @@
+import random
+
+from models.catalog import KNOWN_SEASONS
+from models.meal_index import KNOWN_CONDITIONS, KNOWN_DIETS, KNOWN_REGIONS
+
+GENDERS = ('male', 'female')
+GOALS = ('weight_loss', 'weight_gain', 'maintain')
+TIMELINES = ('short_term', 'mid_term', 'long_term')
+FOOD_STYLES = ('traditional', 'modern', 'both')
+COST_PREFERENCES = ('low', 'medium', 'high')
+# The chat flow offers the first ten condition codes (options 1-10)
+CHAT_CONDITIONS = KNOWN_CONDITIONS[:10]
+
+# Chat answers that select each option in process_enhanced_conversation
+CHAT_ANSWERS = {
+    'gender': {'male': 'male', 'female': 'female'},
+    'food_preference': {'vegetarian': 'vegetarian', 'non_vegetarian': 'meat', 'both': 'both'},
+    'region': {'south_indian': 'south', 'north_indian': 'north'},
+    'goal': {'weight_loss': 'loss', 'weight_gain': 'gain', 'maintain': 'maintain'},
+    'timeline': {'short_term': 'short', 'mid_term': 'mid', 'long_term': 'long'}
+}
+
+
+def generate_profile(rng):
+    """One random request profile within the chat flow's accepted ranges"""
+    conditions = rng.sample(CHAT_CONDITIONS, rng.choice((0, 0, 1, 1, 2, 3)))
+    return {
+        'age': rng.randint(18, 80),
+        'weight': round(rng.uniform(40, 130), 1),
+        'height': round(rng.uniform(145, 200), 1),
+        'gender': rng.choice(GENDERS),
+        'goal': rng.choice(GOALS),
+        'timeline': rng.choice(TIMELINES),
+        'food_preference': rng.choice(KNOWN_DIETS),
+        'food_style': rng.choice(FOOD_STYLES),
+        'region': rng.choice(KNOWN_REGIONS),
+        'current_season': rng.choice(KNOWN_SEASONS),
+        'health_conditions': conditions,
+        'cost_preference': rng.choice(COST_PREFERENCES)
+    }
+
+
+def generate_profiles(count, seed=0):
+    """Reproducible list of synthetic profiles"""
+    rng = random.Random(seed)
+    return [generate_profile(rng) for _ in range(count)]
+
+
+def chat_messages(profile):
+    """Messages that walk the chat state machine to a finished plan for profile"""
+    conditions = profile['health_conditions']
+    condition_answer = ','.join(
+        str(CHAT_CONDITIONS.index(condition) + 1) for condition in conditions
+    ) or 'none'
+    return [
+        'hi',
+        str(profile['age']),
+        str(profile['weight']),
+        str(profile['height']),
+        CHAT_ANSWERS['gender'][profile['gender']],
+        CHAT_ANSWERS['food_preference'][profile['food_preference']],
+        profile['food_style'],
+        profile['current_season'],
+        CHAT_ANSWERS['region'][profile['region']],
+        CHAT_ANSWERS['goal'][profile['goal']],
+        condition_answer,
+        profile['cost_preference'],
+        CHAT_ANSWERS['timeline'][profile['timeline']]
+    ]
@@ -0,0 +1,220 @@
+"""Benchmarks for the plan-generation hot path
+
+Run from backend/:
+
+    python -m benchmarks.run --iterations 200 --output results.json
+    python -m benchmarks.run --compare results.json
+
+Every stage runs on synthetic profiles against the bundled data, so results
+are reproducible offline. Latencies are measured in one pass and peak memory
+(tracemalloc) in a separate, shorter pass so tracing doesn't skew timings.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.profiles import chat_messages, generate_profiles
+from models.diet_engine import DietEngine
+from models.nutrition import NutritionCalculator
+from models.plan_executor import plan_options
+
+STAGES = ('nutrition_summary', 'weekly_plan', 'grocery_list', 'chat')
+
+
+class Workload:
+    """Synthetic profiles plus the engines and inputs each stage needs"""
+
+    def __init__(self, count, seed=0):
+        self.profiles = generate_profiles(count, seed)
+        self.calculator = NutritionCalculator()
+        self.engine = DietEngine()
+        self.summaries = [self.summary(profile) for profile in self.profiles]
+        self.plans = [
+            self.weekly_plan(profile, summary, index)
+            for index, (profile, summary) in enumerate(zip(self.profiles, self.summaries))
+        ]
+        self._client = None
+        self._sessions = itertools.count()
+
+    def summary(self, profile):
+        return self.calculator.get_enhanced_nutrition_summary(
+            profile['weight'], profile['height'], profile['age'],
+            profile['gender'], profile['goal'], profile['timeline']
+        )
+
+    def weekly_plan(self, profile, summary, seed):
+        return self.engine.generate_enhanced_weekly_plan(
+            profile, summary, seed=seed, **plan_options(profile)
+        )
+
+    @property
+    def client(self):
+        """Flask test client, created on first use (imports the app)"""
+        if self._client is None:
+            from app import app
+            self._client = app.test_client()
+        return self._client
+
+    def chat(self, profile, session_id):
+        """Walk one full conversation through /api/chat"""
+        for message in chat_messages(profile):
+            response = self.client.post('/api/chat', json={'session_id': session_id, 'message': message})
+            if response.status_code != 200:
+                raise RuntimeError(f"/api/chat failed: {response.get_data(as_text=True)}")
+        if response.get_json().get('step') != 'completed':
+            raise RuntimeError(f"Chat did not finish: {response.get_json().get('step')}")
+
+    def task(self, stage, index):
+        """Zero-argument callable running one iteration of a stage"""
+        i = index % len(self.profiles)
+        profile = self.profiles[i]
+        if stage == 'nutrition_summary':
+            return lambda: self.summary(profile)
+        if stage == 'weekly_plan':
+            return lambda: self.weekly_plan(profile, self.summaries[i], index)
+        if stage == 'grocery_list':
+            return lambda: self.engine.generate_grocery_list(self.plans[i])
+        if stage == 'chat':
+            return lambda: self.chat(profile, f"bench-{next(self._sessions)}")
+        raise ValueError(f"Unknown stage: {stage}")
+
+
+def measure_stage(workload, stage, iterations, warmup, memory_iterations):
+    """Latency percentiles, throughput and peak traced memory for one stage"""
+    for index in range(warmup):
+        workload.task(stage, index)()
+
+    tasks = [workload.task(stage, index) for index in range(iterations)]
+    latencies = np.empty(iterations)
+    started = time.perf_counter()
+    for index, task in enumerate(tasks):
+        begin = time.perf_counter()
+        task()
+        latencies[index] = time.perf_counter() - begin
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    for index in range(memory_iterations):
+        workload.task(stage, index)()
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    return {
+        'iterations': iterations,
+        'p50_ms': round(float(p50), 4),
+        'p95_ms': round(float(p95), 4),
+        'p99_ms': round(float(p99), 4),
+        'mean_ms': round(float(latencies.mean()) * 1000, 4),
+        'throughput_per_s': round(iterations / elapsed, 2) if elapsed else None,
+        'peak_memory_kb': round(peak / 1024, 1)
+    }
+
+
+def get_commit():
+    """Current git commit, if the tree is a checkout"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(stages=STAGES, iterations=200, warmup=10, profiles=100, seed=0, memory_iterations=10):
+    """Run the selected stages and return the JSON-serializable report"""
+    workload = Workload(profiles, seed)
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': get_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'profiles': profiles,
+            'seed': seed,
+            'warmup': warmup,
+            'data_version': workload.engine.data_version
+        },
+        'stages': {}
+    }
+    for stage in stages:
+        # The chat flow is ~13 requests per iteration; keep its run comparable in time
+        stage_iterations = max(1, iterations // 10) if stage == 'chat' else iterations
+        report['stages'][stage] = measure_stage(
+            workload, stage, stage_iterations, warmup, memory_iterations
+        )
+    return report
+
+
+def compare_reports(baseline, current):
+    """Per-stage relative change of the headline numbers (negative = faster/smaller)"""
+    changes = {}
+    for stage, result in current['stages'].items():
+        before = baseline.get('stages', {}).get(stage)
+        if not before:
+            continue
+        changes[stage] = {
+            metric: round((result[metric] - before[metric]) / before[metric] * 100, 1)
+            for metric in ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_per_s', 'peak_memory_kb')
+            if before.get(metric) and result.get(metric) is not None
+        }
+    return changes
+
+
+def format_report(report, changes=None):
+    """Human-readable table of a report"""
+    lines = [f"{'stage':<20}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/s':>12}{'peak KB':>12}"]
+    for stage, result in report['stages'].items():
+        lines.append(
+            f"{stage:<20}{result['p50_ms']:>10.3f}{result['p95_ms']:>10.3f}{result['p99_ms']:>10.3f}"
+            f"{result['throughput_per_s']:>12.1f}{result['peak_memory_kb']:>12.1f}"
+        )
+        if changes and stage in changes:
+            delta = ', '.join(f"{metric} {value:+.1f}%" for metric, value in changes[stage].items())
+            lines.append(f"{'':<20}vs baseline: {delta}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the plan-generation hot path')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES))
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--profiles', type=int, default=100, help='distinct synthetic profiles')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--memory-iterations', type=int, default=10)
+    parser.add_argument('--output', help='write the JSON report to this file')
+    parser.add_argument('--compare', help='baseline JSON report to compare against')
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(
+        args.stages, args.iterations, args.warmup, args.profiles, args.seed, args.memory_iterations
+    )
+    changes = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            changes = compare_reports(json.load(f), report)
+        report['comparison'] = {'baseline': args.compare, 'change_percent': changes}
+
+    print(format_report(report, changes))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    return report
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,24 @@
+"""Production launcher config
+
+    cd backend
+    gunicorn -c gunicorn.conf.py asgi:application
+
+Needs gunicorn and uvicorn installed. Every setting can be overridden from
+the environment.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+worker_class = 'uvicorn.workers.UvicornWorker'
+timeout = int(os.environ.get('WORKER_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+accesslog = '-'
+
+# Sessions must be shared between workers, so default to the SQLite store
+os.environ.setdefault('SESSION_BACKEND', 'sqlite')
+
+# Split the cores between web workers' plan-generation process pools
+os.environ.setdefault('PLAN_WORKERS', str(max(1, multiprocessing.cpu_count() // workers)))
@@ -0,0 +1,278 @@
+import hashlib
+import json
+import os
+import threading
+from array import array
+
+import numpy as np
+
+# Data files live next to the models package, independent of the CWD
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+# Canonical seasons used by the chat flow and the meal templates
+KNOWN_SEASONS = ('winter', 'spring', 'summer', 'monsoon', 'post_monsoon', 'autumn')
+
+
+def get_data_path(filename):
+    """Resolve a bundled data file path"""
+    return os.path.join(DATA_DIR, filename)
+
+
+def load_data_file(filename, default_factory=None, data_dir=None):
+    """Load a bundled JSON data file, falling back to defaults if missing"""
+    path = os.path.join(data_dir, filename) if data_dir else get_data_path(filename)
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default_factory() if default_factory else {}
+
+
+def get_default_nutrition_data():
+    """Default enhanced nutrition data with vitamins/minerals"""
+    return {
+        "rice": {
+            "dietary_type": "vegetarian",
+            "macros": {"protein": 2.7, "carbs": 28, "fats": 0.3},
+            "vitamins": {"B1": 0.07, "B3": 1.6, "folate": 8},
+            "minerals": {"iron": 0.8, "magnesium": 25, "phosphorus": 115},
+            "food_style": "traditional",
+            "seasonal_availability": ["spring", "summer", "monsoon", "autumn"],
+            "preparation_methods": ["boiled", "steamed", "fried rice"],
+            "storage": "Store in airtight container, consume within 2 days if cooked",
+            "serving_size": "150g cooked"
+        },
+        "quinoa": {
+            "dietary_type": "vegetarian",
+            "macros": {"protein": 4.4, "carbs": 22, "fats": 1.9},
+            "vitamins": {"B6": 0.2, "folate": 42, "E": 0.6},
+            "minerals": {"iron": 1.5, "magnesium": 64, "zinc": 1.1},
+            "food_style": "modern",
+            "seasonal_availability": ["spring", "summer", "monsoon", "autumn", "winter"],
+            "preparation_methods": ["boiled", "salad", "pilaf"],
+            "storage": "Store dry quinoa in airtight container, cooked quinoa refrigerate 3 days",
+            "serving_size": "100g cooked"
+        },
+        "dal": {
+            "dietary_type": "vegetarian",
+            "macros": {"protein": 9, "carbs": 20, "fats": 0.5},
+            "vitamins": {"B1": 0.37, "B6": 0.21, "folate": 181},
+            "minerals": {"iron": 3.3, "magnesium": 47, "potassium": 367},
+            "food_style": "traditional",
+            "seasonal_availability": ["spring", "summer", "monsoon", "autumn"],
+            "preparation_methods": ["pressure cooked", "boiled with tempering"],
+            "storage": "Refrigerate cooked dal for up to 3 days, reheat before serving",
+            "serving_size": "100g"
+        }
+    }
+
+
+def content_version(data):
+    """Short content hash of JSON-serializable data"""
+    canonical = json.dumps(data, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+
+
+def split_nutrient_key(key):
+    """Split a raw nutrient key like 'iron_mg' into ('iron', 'mg')"""
+    if key.endswith('_per_100g'):
+        return key[:-len('_per_100g')], 'g'
+    for unit in ('mcg', 'mg', 'g', 'iu'):
+        suffix = '_' + unit
+        if key.endswith(suffix):
+            return key[:-len(suffix)], unit
+    return key, None
+
+
+class FoodCatalog:
+    """Flattened, column-oriented view of nutrition_data.json
+
+    Every food becomes one row; every macro, vitamin and mineral becomes one
+    array('d') column indexed by row. Metadata indexes give O(1) lookups by
+    food id, category, dietary type and season.
+    """
+
+    # Engine-facing macro names (the data files use '<name>_per_100g')
+    MACRO_ALIASES = {'fat': 'fats'}
+
+    def __init__(self, nutrition_data):
+        self.food_ids = []
+        self.rows = {}
+        self.foods = []
+        self.columns = {}
+        self.units = {}
+        self.nutrient_groups = {'macros': [], 'vitamins': [], 'minerals': []}
+        self.by_category = {}
+        self.by_dietary_type = {}
+        self.by_season = {}
+        self.dietary_combinations = nutrition_data.get('dietary_combinations', {})
+        self.version = content_version(nutrition_data)
+        self._matrix = None
+        self._build(nutrition_data)
+
+    @classmethod
+    def from_file(cls, filename='nutrition_data.json'):
+        """Load and compile the catalog from a bundled data file"""
+        return cls(load_data_file(filename, get_default_nutrition_data))
+
+    def _iter_foods(self, nutrition_data):
+        """Yield (category, food_id, food) from nested or flat nutrition data"""
+        if 'food_items' in nutrition_data:
+            for category, foods in nutrition_data['food_items'].items():
+                for food_id, food in foods.items():
+                    yield category, food_id, food
+        else:
+            for food_id, food in nutrition_data.items():
+                if isinstance(food, dict) and 'macros' in food:
+                    yield 'general', food_id, food
+
+    def _nutrient_name(self, group, raw_key):
+        """Map a raw data key to its column name and record its unit"""
+        name, unit = split_nutrient_key(raw_key)
+        if group == 'macros':
+            name = self.MACRO_ALIASES.get(name, name)
+        if name not in self.columns:
+            self.columns[name] = array('d')
+            self.nutrient_groups[group].append(name)
+            if unit:
+                self.units[name] = unit
+        return name
+
+    def _build(self, nutrition_data):
+        """Flatten foods into rows, columns and lookup indexes"""
+        entries = list(self._iter_foods(nutrition_data))
+
+        # First pass fixes the nutrient axis so every column has one slot per row
+        for _, _, food in entries:
+            for group in ('macros', 'vitamins', 'minerals'):
+                for raw_key in food.get(group, {}):
+                    self._nutrient_name(group, raw_key)
+
+        year_round = []
+        for category, food_id, food in entries:
+            row = len(self.food_ids)
+            self.food_ids.append(food_id)
+            self.rows[food_id] = row
+
+            values = {}
+            for group in ('macros', 'vitamins', 'minerals'):
+                for raw_key, amount in food.get(group, {}).items():
+                    values[self._nutrient_name(group, raw_key)] = float(amount or 0)
+            for name, column in self.columns.items():
+                column.append(values.get(name, 0.0))
+
+            seasons = tuple(food.get('seasonal_availability', []))
+            dietary_type = food.get('dietary_type', 'vegetarian')
+            self.foods.append({
+                'id': food_id,
+                'name': food.get('name', food_id.replace('_', ' ').title()),
+                'category': category,
+                'dietary_type': dietary_type,
+                'food_style': food.get('food_style', 'traditional'),
+                'seasonal_availability': seasons,
+                'cost': food.get('cost', 'medium'),
+                'health_benefits': tuple(food.get('health_benefits', [])),
+                'avoid_in_conditions': tuple(food.get('avoid_in_conditions', [])),
+                'preparation_methods': tuple(food.get('preparation_methods', [])),
+                'storage': food.get('storage', ''),
+                'serving_size': food.get('serving_size', ''),
+                'glycemic_index': food.get('glycemic_index')
+            })
+
+            self.by_category.setdefault(category, []).append(food_id)
+            self.by_dietary_type.setdefault(dietary_type, []).append(food_id)
+            if 'year_round' in seasons or not seasons:
+                year_round.append(food_id)
+            for season in seasons:
+                self.by_season.setdefault(season, []).append(food_id)
+
+        # Year-round foods are available in every season
+        for season in set(KNOWN_SEASONS) | set(self.by_season):
+            if season != 'year_round':
+                season_foods = self.by_season.setdefault(season, [])
+                season_foods.extend(f for f in year_round if f not in season_foods)
+        self.by_season['year_round'] = year_round
+
+        for index in (self.by_category, self.by_dietary_type, self.by_season):
+            for key in index:
+                index[key] = tuple(index[key])
+        self._year_round = tuple(year_round)
+
+    def __len__(self):
+        return len(self.food_ids)
+
+    def __contains__(self, food_id):
+        return food_id in self.rows
+
+    def get(self, food_id):
+        """Get food metadata by id, or None"""
+        row = self.rows.get(food_id)
+        return self.foods[row] if row is not None else None
+
+    def get_nutrients(self, food_id):
+        """Get per-100g nutrients for a food, grouped like the source data"""
+        row = self.rows.get(food_id)
+        if row is None:
+            return None
+        return {
+            group: {name: self.columns[name][row] for name in names}
+            for group, names in self.nutrient_groups.items()
+        }
+
+    def get_value(self, food_id, nutrient):
+        """Get a single per-100g nutrient value for a food"""
+        row = self.rows.get(food_id)
+        if row is None or nutrient not in self.columns:
+            return 0.0
+        return self.columns[nutrient][row]
+
+    @property
+    def nutrient_names(self):
+        """Nutrient axis of the catalog matrix (macros, vitamins, minerals)"""
+        return list(self.columns)
+
+    def nutrient_matrix(self):
+        """Read-only (foods x nutrients) matrix of per-100g values"""
+        if self._matrix is None:
+            matrix = np.column_stack([
+                np.frombuffer(column, dtype=np.float64) for column in self.columns.values()
+            ]) if self.columns else np.zeros((len(self.food_ids), 0))
+            matrix.setflags(write=False)
+            self._matrix = matrix
+        return self._matrix
+
+    def quantity_matrix(self, meals):
+        """Scale factors (quantity / 100g) for meals of {food_id: grams} as a (meals x foods) matrix"""
+        quantities = np.zeros((len(meals), len(self.food_ids)))
+        for row, meal_items in enumerate(meals):
+            for food_id, quantity in meal_items.items():
+                column = self.rows.get(food_id)
+                if column is not None:
+                    quantities[row, column] += quantity / 100
+        return quantities
+
+    def foods_in_category(self, category):
+        """Food ids in a category"""
+        return self.by_category.get(category, ())
+
+    def foods_by_dietary_type(self, dietary_type):
+        """Food ids with a dietary type"""
+        return self.by_dietary_type.get(dietary_type, ())
+
+    def foods_in_season(self, season):
+        """Food ids available in a season (including year-round foods)"""
+        return self.by_season.get(season, self._year_round)
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_food_catalog():
+    """Get the process-wide food catalog, loading it on first use"""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = FoodCatalog.from_file()
+    return _catalog
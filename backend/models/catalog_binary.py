@@ -0,0 +1,237 @@
+"""Compiled, memory-mappable food catalog
+
+Build step, run from backend/ whenever the data files change:
+
+    python -m models.catalog_binary
+    python -m models.catalog_binary --data-dir /srv/diet/data --output /srv/diet/data/catalog.bin
+
+The file holds everything FoodCatalog and the meal index are built from, in
+one little-endian layout that is mapped read-only instead of parsed:
+
+    header       magic, format version, food/nutrient/string counts, section offsets
+    offsets      uint64[strings + 1]: start of each string in the string table
+    strings      UTF-8: food ids, nutrient names, one JSON record per food, the
+                 catalog metadata (units, indexes, version) and the meal templates
+    matrix       float64[nutrients][foods], 8-byte aligned
+
+Nutrient columns are views into the mapping, so every process that maps the
+file shares the same page-cache pages, and a food's metadata record is only
+decoded the first time it is looked up.
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from collections.abc import Sequence
+
+import numpy as np
+
+from models.catalog import DATA_DIR, FoodCatalog, get_default_nutrition_data, load_data_file
+from models.diet_engine import DietEngine
+
+COMPILED_CATALOG = 'catalog.bin'
+SOURCE_FILES = ('nutrition_data.json', 'meals.json')
+
+MAGIC = b'DIETCAT\x00'
+FORMAT_VERSION = 1
+# magic, format version, foods, nutrients, strings, offsets/strings/matrix section starts
+HEADER = struct.Struct('<8sIIIIQQQ')
+
+# Food record fields held as tuples by FoodCatalog (JSON gives lists back)
+TUPLE_FIELDS = ('seasonal_availability', 'health_benefits', 'avoid_in_conditions', 'preparation_methods')
+INDEXES = ('by_category', 'by_dietary_type', 'by_season')
+
+
+def align(offset, boundary=8):
+    return -(-offset // boundary) * boundary
+
+
+def source_signature(data_dir=DATA_DIR):
+    """{file: [mtime_ns, size]} of the source data files that exist"""
+    signature = {}
+    for filename in SOURCE_FILES:
+        try:
+            stat = os.stat(os.path.join(data_dir, filename))
+        except FileNotFoundError:
+            continue
+        signature[filename] = [stat.st_mtime_ns, stat.st_size]
+    return signature
+
+
+def compile_catalog(data_dir=DATA_DIR, output=None):
+    """Compile the data files in data_dir into a binary catalog; returns its path
+
+    The file is written next to its final path and renamed into place, so
+    processes that have the previous version mapped keep reading it intact.
+    """
+    output = output or os.path.join(data_dir, COMPILED_CATALOG)
+    signature = source_signature(data_dir)
+    nutrition_data = load_data_file('nutrition_data.json', get_default_nutrition_data, data_dir)
+    meal_templates = load_data_file('meals.json', DietEngine.get_default_meal_templates, data_dir)
+    catalog = FoodCatalog(nutrition_data)
+
+    rows = catalog.rows
+    metadata = {
+        'version': catalog.version,
+        'units': catalog.units,
+        'nutrient_groups': catalog.nutrient_groups,
+        'dietary_combinations': catalog.dietary_combinations,
+        'year_round': [rows[food_id] for food_id in catalog._year_round],
+        'sources': signature
+    }
+    for name in INDEXES:
+        metadata[name] = {
+            key: [rows[food_id] for food_id in food_ids] for key, food_ids in getattr(catalog, name).items()
+        }
+
+    strings = list(catalog.food_ids) + catalog.nutrient_names
+    strings += [json.dumps(food, separators=(',', ':')) for food in catalog.foods]
+    strings += [json.dumps(metadata, separators=(',', ':')), json.dumps(meal_templates, separators=(',', ':'))]
+    encoded = [value.encode('utf-8') for value in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype='<u8')
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    matrix = np.asarray(catalog.nutrient_matrix(), dtype='<f8').T
+
+    offsets_at = align(HEADER.size)
+    strings_at = offsets_at + offsets.nbytes
+    matrix_at = align(strings_at + int(offsets[-1]))
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, len(catalog), len(catalog.columns), len(encoded),
+        offsets_at, strings_at, matrix_at
+    )
+
+    partial = output + '.tmp'
+    with open(partial, 'wb') as f:
+        f.write(header.ljust(offsets_at, b'\0'))
+        f.write(offsets.tobytes())
+        for value in encoded:
+            f.write(value)
+        f.write(b'\0' * (matrix_at - strings_at - int(offsets[-1])))
+        f.write(np.ascontiguousarray(matrix).tobytes())
+    os.replace(partial, output)
+    return output
+
+
+class CompiledFoods(Sequence):
+    """Per-food metadata records, decoded from the string table on first access"""
+
+    def __init__(self, catalog, first):
+        self.catalog = catalog
+        self.first = first
+        self.decoded = {}
+
+    def __len__(self):
+        return len(self.catalog.food_ids)
+
+    def __getitem__(self, row):
+        food = self.decoded.get(row)
+        if food is None:
+            if not 0 <= row < len(self):
+                raise IndexError(row)
+            food = json.loads(self.catalog.string(self.first + row))
+            for field in TUPLE_FIELDS:
+                food[field] = tuple(food[field])
+            self.decoded[row] = food
+        return food
+
+
+class CompiledCatalog(FoodCatalog):
+    """FoodCatalog backed by a read-only mapping of a compiled catalog file"""
+
+    def __init__(self, path):
+        if sys.byteorder != 'little':
+            raise ValueError('Compiled catalogs are little-endian')
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.path = path
+        buffer = memoryview(self._mmap)
+        (magic, format_version, food_count, nutrient_count, string_count,
+         offsets_at, strings_at, matrix_at) = HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise ValueError(f"Not a compiled catalog: {path}")
+        if format_version != FORMAT_VERSION:
+            raise ValueError(f"Compiled catalog format {format_version} is not supported (expected {FORMAT_VERSION})")
+
+        self._buffer = buffer
+        self._strings_at = strings_at
+        self._offsets = buffer[offsets_at:offsets_at + 8 * (string_count + 1)].cast('Q')
+
+        self.food_ids = [self.string(row) for row in range(food_count)]
+        self.rows = {food_id: row for row, food_id in enumerate(self.food_ids)}
+        names = [self.string(food_count + index) for index in range(nutrient_count)]
+        self.foods = CompiledFoods(self, food_count + nutrient_count)
+
+        metadata = json.loads(self.string(string_count - 2))
+        self.version = metadata['version']
+        self.units = metadata['units']
+        self.nutrient_groups = metadata['nutrient_groups']
+        self.dietary_combinations = metadata['dietary_combinations']
+        self.sources = metadata['sources']
+        self._meal_templates_at = string_count - 1
+        for name in INDEXES:
+            setattr(self, name, {
+                key: tuple(self.food_ids[row] for row in rows) for key, rows in metadata[name].items()
+            })
+        self._year_round = tuple(self.food_ids[row] for row in metadata['year_round'])
+
+        # Columns and the matrix are views of the mapped pages, never copies
+        matrix_end = matrix_at + 8 * food_count * nutrient_count
+        values = buffer[matrix_at:matrix_end].cast('d')
+        self.columns = {
+            name: values[index * food_count:(index + 1) * food_count] for index, name in enumerate(names)
+        }
+        matrix = np.frombuffer(self._mmap, dtype='<f8', count=food_count * nutrient_count, offset=matrix_at)
+        self._matrix = matrix.reshape(nutrient_count, food_count).T
+
+    def __reduce__(self):
+        # Spawned pool workers map the file again rather than receiving a copy
+        return (CompiledCatalog, (self.path,))
+
+    def string(self, index):
+        """Entry of the string table"""
+        start = self._strings_at + self._offsets[index]
+        return str(self._buffer[start:self._strings_at + self._offsets[index + 1]], 'utf-8')
+
+    def meal_templates(self):
+        """Meal templates compiled with this catalog"""
+        return json.loads(self.string(self._meal_templates_at))
+
+    def is_current(self, data_dir):
+        """True unless a source data file in data_dir changed after this file was compiled"""
+        current = source_signature(data_dir)
+        return all(current.get(filename, signature) == signature for filename, signature in self.sources.items())
+
+
+def load_compiled_catalog(data_dir=DATA_DIR):
+    """Map data_dir's compiled catalog, or None if there is none, it is unreadable or out of date"""
+    path = os.path.join(data_dir, COMPILED_CATALOG)
+    if not os.path.exists(path):
+        return None
+    try:
+        catalog = CompiledCatalog(path)
+    except (ValueError, TypeError, KeyError, IndexError, struct.error, OSError) as e:
+        # Truncated, corrupt or written by another format version: use the JSON files
+        print(f"Ignoring unreadable {path}: {e}; rebuild it with `python -m models.catalog_binary`")
+        return None
+    if not catalog.is_current(data_dir):
+        print(f"{path} is older than the data files; rebuild it with `python -m models.catalog_binary`")
+        return None
+    return catalog
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compile the food catalog and meal templates to catalog.bin')
+    parser.add_argument('--data-dir', default=DATA_DIR, help='directory holding nutrition_data.json and meals.json')
+    parser.add_argument('--output', help=f"compiled file (default: <data-dir>/{COMPILED_CATALOG})")
+    args = parser.parse_args(argv)
+
+    path = compile_catalog(args.data_dir, args.output)
+    catalog = CompiledCatalog(path)
+    print(f"Compiled {len(catalog)} foods x {len(catalog.columns)} nutrients to {path} "
+          f"({os.path.getsize(path)} bytes, catalog version {catalog.version})")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
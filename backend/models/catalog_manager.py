@@ -0,0 +1,213 @@
+import os
+import threading
+import time
+
+from models.catalog import DATA_DIR, FoodCatalog, get_default_nutrition_data, load_data_file
+from models.catalog_binary import COMPILED_CATALOG, load_compiled_catalog
+from models.diet_engine import DietEngine
+from models.plan_executor import PlanExecutor
+
+CATALOG_FILES = ('nutrition_data.json', 'meals.json', COMPILED_CATALOG)
+DEFAULT_POLL_INTERVAL = 2.0
+
+# Profile used to check that a freshly loaded catalog can actually produce a plan
+VALIDATION_PROFILE = {
+    'weight': 70, 'height': 170, 'age': 30, 'gender': 'male', 'goal': 'maintain',
+    'food_preference': 'vegetarian', 'region': 'south_indian'
+}
+VALIDATION_SUMMARY = {'daily_calories': 2000, 'protein': 75, 'carbs': 250, 'fats': 67}
+
+
+class CatalogValidationError(ValueError):
+    """A new catalog version was loaded but is not usable"""
+
+
+class CatalogSnapshot:
+    """One loaded version of the data files and everything compiled from it
+
+    A request takes the current snapshot once and uses it throughout, so a
+    swap in the middle of a plan generation never mixes two versions. The
+    snapshot's plan executor builds its pool workers from the same data.
+    """
+
+    def __init__(self, version, signature, catalog, engine, executor):
+        self.version = version
+        self.signature = signature
+        self.catalog = catalog
+        self.engine = engine
+        self.executor = executor
+        self.loaded_at = time.time()
+
+    @property
+    def data_version(self):
+        return self.engine.data_version
+
+
+class CatalogManager:
+    """Owns the current catalog snapshot and swaps in new versions as data/ changes
+
+    A background thread polls the data files' mtimes and sizes. Once a
+    change has been stable for one poll interval, the new version is parsed,
+    compiled and validated off the request path, then published with a
+    single reference assignment; version counts successful swaps. A version
+    that fails to load or validate is logged and the current one stays.
+    """
+
+    def __init__(self, data_dir=DATA_DIR, max_workers=0, poll_interval=DEFAULT_POLL_INTERVAL):
+        self.data_dir = data_dir
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self.reloads = 0
+        self.failures = 0
+        self.last_error = None
+        self._listeners = []
+        self._pending = None
+        self._failed_signature = None
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.snapshot = self.load(version=1)
+
+    @property
+    def engine(self):
+        return self.snapshot.engine
+
+    @property
+    def executor(self):
+        return self.snapshot.executor
+
+    @property
+    def version(self):
+        return self.snapshot.version
+
+    def add_listener(self, callback):
+        """Call callback(snapshot) after every swap"""
+        self._listeners.append(callback)
+
+    def file_signature(self):
+        """(name, mtime_ns, size) of each data file; None for a missing file"""
+        signature = []
+        for filename in CATALOG_FILES:
+            try:
+                stat = os.stat(os.path.join(self.data_dir, filename))
+                signature.append((filename, stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.append((filename, None, None))
+        return tuple(signature)
+
+    def load(self, version):
+        """Parse, compile and validate the data files into a snapshot"""
+        signature = self.file_signature()
+        # A current catalog.bin is mapped instead of parsing the JSON files
+        catalog = load_compiled_catalog(self.data_dir)
+        if catalog is not None:
+            meal_templates = catalog.meal_templates()
+            worker_catalog = catalog
+        else:
+            nutrition_data = load_data_file('nutrition_data.json', get_default_nutrition_data, self.data_dir)
+            meal_templates = load_data_file('meals.json', DietEngine.get_default_meal_templates, self.data_dir)
+            catalog = FoodCatalog(nutrition_data)
+            worker_catalog = nutrition_data
+
+        engine = DietEngine(catalog, meal_templates)
+        self.validate(catalog, engine)
+        executor = PlanExecutor(
+            engine, max_workers=self.max_workers, worker_data=(worker_catalog, engine.meal_templates)
+        )
+        return CatalogSnapshot(version, signature, catalog, engine, executor)
+
+    def validate(self, catalog, engine):
+        """Reject catalogs that would break plan generation"""
+        if not len(catalog):
+            raise CatalogValidationError('Food catalog is empty')
+        if not engine.meal_index.meals:
+            raise CatalogValidationError('No meal templates found')
+        weekly_plan = engine.generate_enhanced_weekly_plan(VALIDATION_PROFILE, VALIDATION_SUMMARY, seed=0)
+        if len(weekly_plan) != len(engine.DAYS):
+            raise CatalogValidationError('Catalog could not produce a full weekly plan')
+
+    def reload(self):
+        """Load the data files now and swap them in; returns True on success"""
+        with self._reload_lock:
+            signature = self.file_signature()
+            try:
+                snapshot = self.load(self.snapshot.version + 1)
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                # Don't retry the same broken files on every poll
+                self._pending = None
+                self._failed_signature = signature
+                print(f"Catalog reload failed, keeping version {self.snapshot.version}: {e}")
+                return False
+
+            previous, self.snapshot = self.snapshot, snapshot
+            self.reloads += 1
+            self.last_error = None
+            print(f"Catalog version {snapshot.version} loaded (data {snapshot.data_version})")
+        for callback in self._listeners:
+            callback(snapshot)
+        # Requests still holding the previous snapshot keep using its engine;
+        # its pool shuts down once they let go of it
+        del previous
+        return True
+
+    def check(self):
+        """Reload if the data files changed and have stayed unchanged since the last check"""
+        signature = self.file_signature()
+        if signature == self.snapshot.signature or signature == self._failed_signature:
+            self._pending = None
+            return False
+        if signature != self._pending:
+            # Still being written (or just changed): wait one more interval
+            self._pending = signature
+            return False
+        return self.reload()
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"Catalog watcher error: {e}")
+
+    def start(self):
+        """Start the background watcher (no-op if polling is disabled or already running)"""
+        if self.poll_interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name='catalog-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background watcher"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def shutdown(self):
+        """Stop watching and shut down the current plan executor"""
+        self.stop()
+        self.snapshot.executor.shutdown()
+
+    def stats(self):
+        """Counters for the /metrics endpoint"""
+        snapshot = self.snapshot
+        return {
+            'version': snapshot.version,
+            'data_version': snapshot.data_version,
+            'loaded_at': snapshot.loaded_at,
+            'reloads': {'success': self.reloads, 'failure': self.failures},
+            'last_error': self.last_error
+        }
+
+
+def create_catalog_manager(max_workers=0):
+    """Catalog manager watching data/ every CATALOG_POLL_SECONDS (0 disables watching)"""
+    manager = CatalogManager(
+        max_workers=max_workers,
+        poll_interval=float(os.environ.get('CATALOG_POLL_SECONDS', DEFAULT_POLL_INTERVAL))
+    )
+    manager.start()
+    return manager
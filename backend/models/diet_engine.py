@@ -1,68 +1,221 @@
+import bisect
+import itertools
 import json
 import random
+from collections.abc import Mapping
 from datetime import datetime
+from functools import lru_cache
+from types import MappingProxyType
+
+from models.catalog import content_version, get_food_catalog, load_data_file
+from models.instrumentation import stage_timings
+from models.keyword_matcher import KeywordMatcher
+from models.meal_index import MealIndex
+from models.nutrient_vectors import MACRO_KEYS, MICRO_GROUPS, NutrientAxis
+from models.plan_model import PLAN_DAYS, DayPlan, Meal, WeeklyPlan
+from models.plan_optimizer import WeeklyPlanOptimizer, scale_meal
+from models.result_cache import LRUCache
+
+# Keyword tables for the name-based meal classifiers. Where several groups
+# can match, the first matching group wins.
+HEALTH_RESTRICTION_KEYWORDS = {
+    'diabetes': ('sweet', 'sugar', 'jaggery', 'honey', 'fruit_juice'),
+    'hypertension': ('salt', 'pickle', 'papad', 'processed'),
+    'kidney_stones': ('spinach', 'tomato', 'chocolate', 'nuts'),
+    'lactose_intolerance': ('milk', 'curd', 'cheese', 'paneer'),
+    'gluten_intolerance': ('wheat', 'bread', 'pasta', 'roti')
+}
+
+COST_KEYWORDS = (
+    ('high', ('paneer', 'cashew', 'almond', 'quinoa', 'avocado', 'salmon', 'chicken')),
+    ('medium', ('dal', 'vegetables', 'rice', 'eggs', 'yogurt'))
+)
+
+SEASONAL_KEYWORDS = {
+    'winter': ('warm', 'hot', 'soup', 'tea', 'ginger', 'jaggery'),
+    'spring': ('fresh', 'light', 'detox', 'green', 'bitter'),
+    'monsoon': ('immunity', 'ginger', 'turmeric', 'warm', 'steamed'),
+    'autumn': ('balanced', 'cooked', 'moderate', 'warming')
+}
+
+STORAGE_GUIDELINES = {
+    'cooked_rice': 'Store in refrigerator for up to 3 days. Reheat thoroughly before serving.',
+    'dal': 'Refrigerate for up to 3 days. Add water if too thick when reheating.',
+    'vegetables': 'Best consumed fresh. Refrigerate for maximum 2 days.',
+    'bread_items': 'Store at room temperature for 1 day, refrigerate for up to 3 days.',
+    'smoothie': 'Consume immediately. Do not store.',
+    'salad': 'Prepare fresh. Dress just before serving.',
+    'soup': 'Cool completely before refrigerating. Store for up to 4 days.'
+}
+
+STORAGE_KEYWORDS = (
+    ('cooked_rice', ('rice', 'biryani', 'pulao')),
+    ('dal', ('dal', 'lentil', 'sambar', 'rasam')),
+    ('smoothie', ('smoothie', 'juice')),
+    ('salad', ('salad', 'raw')),
+    ('soup', ('soup', 'broth')),
+    ('bread_items', ('roti', 'bread', 'chapati'))
+)
+
+# Fallback meal name and protein/carb/fat calorie shares per meal type
+FALLBACK_MEALS = {
+    'breakfast': ('Simple Breakfast', (0.15, 0.55, 0.30)),
+    'lunch': ('Balanced Lunch', (0.20, 0.50, 0.30)),
+    'dinner': ('Light Dinner', (0.25, 0.45, 0.30)),
+    'snacks': ('Healthy Snack', (0.20, 0.50, 0.30))
+}
+
+PREPARATION_METHODS = {
+    'idli_sambar': 'Soak urad dal and rice separately for 4-6 hours. Grind into smooth batter, ferment overnight. Steam in idli plates for 12-15 minutes. For sambar: cook dal with vegetables, add tamarind water, temper with spices.',
+    'dosa_chutney': 'Use fermented dosa batter. Heat non-stick pan, spread batter thinly, cook until golden. For chutney: grind coconut with green chilies, ginger, and salt.',
+    'roti_dal_sabzi': 'Knead wheat flour with water and salt. Roll into circles, cook on hot tawa until puffed. For dal: pressure cook lentils, temper with cumin and spices. Prepare vegetables with minimal oil.',
+    'smoothie_bowl': 'Blend frozen fruits with yogurt or milk. Pour into bowl, top with nuts, seeds, and fresh fruits. Serve immediately.',
+    'quinoa_bowl': 'Rinse quinoa, cook with water (1:2 ratio) for 15 minutes. Add cooked vegetables, protein, and dressing. Garnish with herbs.'
+}
+
+MEAL_INGREDIENTS = {
+    'idli_sambar': ('Idli rice', 'Urad dal', 'Tur dal', 'Mixed vegetables', 'Tamarind', 'Sambar powder', 'Curry leaves'),
+    'dosa_chutney': ('Dosa batter', 'Coconut', 'Green chilies', 'Ginger', 'Curry leaves', 'Oil'),
+    'roti_dal_sabzi': ('Whole wheat flour', 'Tur dal', 'Seasonal vegetables', 'Onions', 'Tomatoes', 'Spices'),
+    'smoothie_bowl': ('Mixed berries', 'Banana', 'Yogurt', 'Honey', 'Nuts', 'Seeds'),
+    'quinoa_bowl': ('Quinoa', 'Mixed vegetables', 'Olive oil', 'Lemon', 'Herbs', 'Protein of choice')
+}
+
+SERVING_SIZES = {
+    'rice': '150g cooked',
+    'roti': '2 medium pieces',
+    'dal': '100g',
+    'vegetables': '150g',
+    'salad': '200g',
+    'smoothie': '250ml',
+    'soup': '200ml'
+}
+
+PREP_TIME_KEYWORDS = (
+    ('instant', ('tea', 'coffee', 'milk', 'juice', 'fruit')),
+    ('5-10 mins', ('smoothie', 'salad', 'sandwich', 'toast')),
+    ('15-20 mins', ('eggs', 'pasta', 'noodles', 'upma', 'poha')),
+    ('20-30 mins', ('rice', 'dal', 'vegetables', 'soup')),
+    ('30-45 mins', ('biryani', 'curry', 'sambar', 'rasam')),
+    ('45+ mins', ('idli', 'dosa', 'fermented items'))
+)
+
+DIFFICULTY_KEYWORDS = (
+    ('easy', ('tea', 'coffee', 'smoothie', 'salad', 'sandwich', 'toast', 'boiled')),
+    ('medium', ('rice', 'dal', 'vegetables', 'pasta', 'eggs', 'soup')),
+    ('hard', ('biryani', 'idli', 'dosa', 'complex curry', 'fermented'))
+)
+
+BENEFIT_KEYWORDS = {
+    'dal': ('High protein', 'Rich in folate', 'Good for heart health'),
+    'vegetables': ('High fiber', 'Antioxidants', 'Vitamins and minerals'),
+    'fruits': ('Vitamin C', 'Natural sugars', 'Digestive health'),
+    'whole_grains': ('Complex carbs', 'B vitamins', 'Sustained energy'),
+    'yogurt': ('Probiotics', 'Calcium', 'Digestive health')
+}
+BLOOD_SUGAR_KEYWORDS = ('fiber', 'whole', 'complex')
+BLOOD_PRESSURE_KEYWORDS = ('potassium', 'vegetable', 'fruit')
+
+INGREDIENT_CATEGORY_KEYWORDS = (
+    ('grains_cereals', ('rice', 'wheat', 'flour', 'quinoa', 'oats', 'millet', 'bread')),
+    ('vegetables', ('onion', 'tomato', 'potato', 'carrot', 'beans', 'spinach', 'cabbage', 'broccoli', 'pepper', 'vegetable')),
+    ('fruits', ('apple', 'banana', 'orange', 'mango', 'berries', 'lemon', 'lime', 'fruit')),
+    ('dairy', ('milk', 'yogurt', 'cheese', 'paneer', 'butter', 'ghee')),
+    ('proteins', ('dal', 'lentil', 'chicken', 'fish', 'eggs', 'nuts', 'seeds', 'tofu')),
+    ('spices_condiments', ('salt', 'pepper', 'turmeric', 'cumin', 'coriander', 'ginger', 'garlic', 'chili', 'spice', 'oil', 'powder'))
+)
+
+
+def _collect_keywords():
+    """Every keyword used by the classifiers"""
+    keywords = set(SERVING_SIZES) | set(BENEFIT_KEYWORDS)
+    keywords.update(BLOOD_SUGAR_KEYWORDS, BLOOD_PRESSURE_KEYWORDS)
+    for table in (HEALTH_RESTRICTION_KEYWORDS, SEASONAL_KEYWORDS):
+        for words in table.values():
+            keywords.update(words)
+    for groups in (COST_KEYWORDS, STORAGE_KEYWORDS, PREP_TIME_KEYWORDS,
+                   DIFFICULTY_KEYWORDS, INGREDIENT_CATEGORY_KEYWORDS):
+        for _, words in groups:
+            keywords.update(words)
+    return keywords
+
+
+MEAL_KEYWORD_MATCHER = KeywordMatcher(_collect_keywords())
+
+
+def _first_match(keywords, groups, default):
+    """Tag of the first group with a matched keyword"""
+    for tag, words in groups:
+        if not keywords.isdisjoint(words):
+            return tag
+    return default
+
+
+@lru_cache(maxsize=4096)
+def classify_meal_name(meal_name):
+    """Classify a meal or ingredient name with a single automaton pass"""
+    keywords = frozenset(MEAL_KEYWORD_MATCHER.find_all(meal_name.lower()))
+    storage_key = _first_match(keywords, STORAGE_KEYWORDS, None)
+    return MappingProxyType({
+        'keywords': keywords,
+        'health_restrictions': tuple(
+            condition for condition, words in HEALTH_RESTRICTION_KEYWORDS.items()
+            if not keywords.isdisjoint(words)
+        ),
+        'cost': _first_match(keywords, COST_KEYWORDS, 'low'),
+        'seasonal_matches': MappingProxyType({
+            season: len(keywords.intersection(words))
+            for season, words in SEASONAL_KEYWORDS.items()
+        }),
+        'storage': STORAGE_GUIDELINES.get(
+            storage_key,
+            'Store in refrigerator and consume within 2-3 days. Reheat properly before serving.'
+        ),
+        'serving_size': next(
+            (size for food, size in SERVING_SIZES.items() if food in keywords), '1 portion'
+        ),
+        'prep_time': _first_match(keywords, PREP_TIME_KEYWORDS, '20-25 mins'),
+        'difficulty': _first_match(keywords, DIFFICULTY_KEYWORDS, 'medium'),
+        'benefits': tuple(
+            benefit for food_category, benefit_list in BENEFIT_KEYWORDS.items()
+            if food_category in keywords for benefit in benefit_list
+        ),
+        'ingredient_category': _first_match(keywords, INGREDIENT_CATEGORY_KEYWORDS, 'others')
+    })
 
 class DietEngine:
-    def __init__(self):
-        """Initialize the enhanced diet engine"""
-        self.load_nutrition_data()
-        self.load_meal_templates()
-    
-    def load_nutrition_data(self):
-        """Load enhanced nutrition data"""
-        try:
-            with open('data/nutrition_data.json', 'r') as f:
-                self.nutrition_data = json.load(f)
-        except FileNotFoundError:
-            self.nutrition_data = self.get_default_enhanced_nutrition_data()
-    
-    def load_meal_templates(self):
-        """Load meal templates"""
-        try:
-            with open('data/meals.json', 'r') as f:
-                self.meal_templates = json.load(f)
-        except FileNotFoundError:
-            self.meal_templates = self.get_default_meal_templates()
-    
-    def get_default_enhanced_nutrition_data(self):
-        """Default enhanced nutrition data with seasonal and style info"""
-        return {
-            "rice": {
-                "dietary_type": "vegetarian",
-                "macros": {"protein": 2.7, "carbs": 28, "fats": 0.3},
-                "vitamins": {"B1": 0.07, "B3": 1.6, "folate": 8},
-                "minerals": {"iron": 0.8, "magnesium": 25, "phosphorus": 115},
-                "food_style": "traditional",
-                "seasonal_availability": ["spring", "summer", "monsoon", "autumn"],
-                "preparation_methods": ["boiled", "steamed", "fried rice"],
-                "storage": "Store in airtight container, consume within 2 days if cooked",
-                "serving_size": "150g cooked"
-            },
-            "quinoa": {
-                "dietary_type": "vegetarian",
-                "macros": {"protein": 4.4, "carbs": 22, "fats": 1.9},
-                "vitamins": {"B6": 0.2, "folate": 42, "E": 0.6},
-                "minerals": {"iron": 1.5, "magnesium": 64, "zinc": 1.1},
-                "food_style": "modern",
-                "seasonal_availability": ["spring", "summer", "monsoon", "autumn"],
-                "preparation_methods": ["boiled", "quinoa salad", "quinoa bowl"],
-                "storage": "Store dry quinoa in sealed container, cooked quinoa 3-4 days refrigerated",
-                "serving_size": "100g cooked"
-            },
-            "dal": {
-                "dietary_type": "vegetarian",
-                "macros": {"protein": 9, "carbs": 20, "fats": 0.5},
-                "vitamins": {"B1": 0.37, "B6": 0.21, "folate": 181},
-                "minerals": {"iron": 3.3, "magnesium": 47, "potassium": 367},
-                "food_style": "traditional",
-                "seasonal_availability": ["spring", "summer", "monsoon", "autumn"],
-                "preparation_methods": ["pressure cooked", "boiled with tempering"],
-                "storage": "Refrigerate cooked dal for up to 3 days, reheat before serving",
-                "serving_size": "100g"
-            }
-        }
+    DAYS = list(PLAN_DAYS)
+    MEAL_CALORIE_SHARES = {'breakfast': 0.25, 'lunch': 0.35, 'snacks': 0.15, 'dinner': 0.25}
+    SOLVERS = ('greedy', 'optimize')
+    # Enriched meals kept per (meal, portion, user context)
+    ENRICHMENT_CACHE_SIZE = 16384
     
-    def get_default_meal_templates(self):
+    def __init__(self, catalog=None, meal_templates=None):
+        """Initialize the enhanced diet engine"""
+        self.load_nutrition_data(catalog)
+        self.load_meal_templates(meal_templates)
+    
+    def load_nutrition_data(self, catalog=None):
+        """Attach the shared food catalog"""
+        self.catalog = catalog if catalog is not None else get_food_catalog()
+    
+    def load_meal_templates(self, meal_templates=None):
+        """Load meal templates (from meals.json unless given) and build the indexes over them"""
+        if meal_templates is None:
+            meal_templates = load_data_file('meals.json', self.get_default_meal_templates)
+        self.meal_templates = meal_templates
+        self.meal_index = MealIndex(
+            self.meal_templates, self.catalog, self.get_meal_data,
+            self.is_meal_suitable, self.get_meal_health_restrictions
+        )
+        self.nutrient_axis = NutrientAxis.from_catalog(self.catalog, self.meal_index.meals)
+        # Changes whenever the food catalog or the meal templates change
+        self.data_version = content_version([self.catalog.version, self.meal_templates])
+        self.plan_optimizer = WeeklyPlanOptimizer(self)
+        self.meal_enrichment = LRUCache(self.ENRICHMENT_CACHE_SIZE)
+    
+    @staticmethod
+    def get_default_meal_templates():
         """Default meal templates for different styles and regions"""
         return {
             "south_indian_traditional": {
@@ -93,41 +246,102 @@ class DietEngine:
         )
     
     def generate_enhanced_weekly_plan(self, user_data, nutrition_summary, health_conditions=[], 
-                                    cost_preference='medium', food_style='both', current_season='spring'):
-        """Generate comprehensive weekly meal plan with all enhancements"""
-        
-        weekly_plan = {}
-        days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+                                    cost_preference='medium', food_style='both', current_season='spring',
+                                    seed=None, solver='greedy', time_budget_ms=None):
+        """Generate comprehensive weekly meal plan with all enhancements
+        
+        The same profile and seed always produce the same plan; pass a seed
+        from new_plan_seed() to be able to reproduce it. solver='optimize'
+        picks and portions the whole week against the summary's calorie,
+        macro and micronutrient targets instead of choosing meal by meal.
+        """
+        if seed is None:
+            seed = self.new_plan_seed()
+        if solver not in self.SOLVERS:
+            raise ValueError(f"Unknown solver: {solver}")
+        
+        if solver == 'optimize':
+            weekly_plan = self.generate_optimized_weekly_plan(
+                user_data, nutrition_summary, health_conditions, cost_preference,
+                food_style, current_season, seed, time_budget_ms
+            )
+            self.assign_daily_totals(weekly_plan)
+            return weekly_plan
+        
+        weekly_plan = WeeklyPlan()
+        for day in self.DAYS:
+            weekly_plan[day] = self.generate_enhanced_day_plan(
+                day, user_data, nutrition_summary, health_conditions,
+                cost_preference, food_style, current_season, seed
+            )
+        
+        self.assign_daily_totals(weekly_plan)
+        return weekly_plan
+    
+    def generate_enhanced_day_plan(self, day, user_data, nutrition_summary, health_conditions=[],
+                                   cost_preference='medium', food_style='both', current_season='spring',
+                                   seed=0):
+        """Generate one day's meals (without totals) from that day's own seeded RNG"""
+        rng = self.get_plan_rng(seed, day)
         
- 
         daily_calories = nutrition_summary['daily_calories']
-        meal_calorie_distribution = {
-            'breakfast': daily_calories * 0.25,
-            'lunch': daily_calories * 0.35,
-            'snacks': daily_calories * 0.15,
-            'dinner': daily_calories * 0.25
-        }
         
-        for day in days:
-            daily_plan = {}
-            for meal_type, target_calories in meal_calorie_distribution.items():
-                daily_plan[meal_type] = self.generate_enhanced_meal(
-                    meal_type, user_data, target_calories, 
-                    food_style, current_season, health_conditions, cost_preference
-                )
-            daily_plan['totals'] = self.calculate_daily_totals(daily_plan)
-            
-            weekly_plan[day] = daily_plan
+        daily_plan = DayPlan()
+        for meal_type, share in self.MEAL_CALORIE_SHARES.items():
+            daily_plan[meal_type] = self.generate_enhanced_meal(
+                meal_type, user_data, daily_calories * share, 
+                food_style, current_season, health_conditions, cost_preference, rng
+            )
+        return daily_plan
+    
+    def generate_optimized_weekly_plan(self, user_data, nutrition_summary, health_conditions=[],
+                                       cost_preference='medium', food_style='both', current_season='spring',
+                                       seed=0, time_budget_ms=None):
+        """Generate the week's meals (without totals) with the local-search solver"""
+        rng = self.get_plan_rng(seed, 'optimize')
+        choices, complete = self.plan_optimizer.solve(
+            user_data, nutrition_summary, health_conditions, cost_preference,
+            food_style, current_season, rng, time_budget_ms
+        )
         
+        daily_calories = nutrition_summary['daily_calories']
+        weekly_plan = WeeklyPlan(complete=complete)
+        for day, slots in choices.items():
+            weekly_plan[day] = DayPlan()
+            for meal_type, choice in slots.items():
+                if choice is None:
+                    weekly_plan[day][meal_type] = self.create_fallback_meal(
+                        meal_type, daily_calories * self.MEAL_CALORIE_SHARES[meal_type], user_data
+                    )
+                    continue
+                meal, portion = choice
+                weekly_plan[day][meal_type] = self.get_enriched_meal(
+                    meal, user_data, food_style, current_season, health_conditions, cost_preference, portion
+                )
         return weekly_plan
     
+    def assign_daily_totals(self, weekly_plan):
+        """Fill in each day's totals; all days come from one matrix product"""
+        vectors = self.calculate_weekly_total_vectors(weekly_plan.values())
+        for day_plan, vector in zip(weekly_plan.values(), vectors):
+            day_plan['totals'] = self.nutrient_axis.totals(vector)
+        return weekly_plan
+    
+    def new_plan_seed(self):
+        """Draw a fresh plan seed (independent of the global random state)"""
+        return random.SystemRandom().getrandbits(63)
+    
+    def get_plan_rng(self, seed, day):
+        """Per-day RNG so days can be generated in any order or process"""
+        return random.Random(f"{seed}:{day}")
+    
     def generate_enhanced_meal(self, meal_type, user_data, target_calories, 
-                              food_style, current_season, health_conditions, cost_preference):
+                              food_style, current_season, health_conditions, cost_preference, rng=None):
         """Generate enhanced meal with all new features"""
         
        
         suitable_meals = self.get_suitable_meals(
-            meal_type, user_data, food_style, current_season, health_conditions
+            meal_type, user_data, food_style, current_season, health_conditions, rng
         )
         
         if not suitable_meals:
@@ -136,54 +350,82 @@ class DietEngine:
         
         
         selected_meal = self.select_optimal_meal(suitable_meals, cost_preference, target_calories)
-        
+        return self.get_enriched_meal(
+            selected_meal, user_data, food_style, current_season, health_conditions, cost_preference
+        )
     
-        enhanced_meal = {
-            'name': selected_meal['name'],
-            'calories': selected_meal['calories'],
-            'macros': selected_meal['macros'],
-            'vitamins': selected_meal.get('vitamins', {}),
-            'minerals': selected_meal.get('minerals', {}),
-            'food_style': selected_meal.get('food_style', food_style),
-            'dietary_type': selected_meal.get('dietary_type', user_data['food_preference']),
-            'seasonal_suitability': self.check_seasonal_suitability(selected_meal['name'], current_season),
-            'preparation_method': self.get_preparation_method(selected_meal['name'], user_data['region']),
-            'storage_guidelines': self.get_storage_guidelines(selected_meal['name']),
-            'serving_size': self.get_serving_size(selected_meal['name'], user_data),
-            'prep_time': self.get_prep_time(selected_meal['name']),
-            'difficulty_level': self.get_difficulty_level(selected_meal['name']),
-            'cost_category': self.get_cost_category(selected_meal['name'], cost_preference),
-            'health_benefits': self.get_health_benefits(selected_meal['name'], health_conditions),
-            'ingredients': self.get_meal_ingredients(selected_meal['name']),
-            'nutritional_highlights': self.get_nutritional_highlights(selected_meal)
-        }
+    @stage_timings.timed('meal_enrichment')
+    def get_enriched_meal(self, meal, user_data, food_style, current_season, health_conditions, cost_preference,
+                          portion=None):
+        """Enriched meal for a chosen meal and optional portion, memoized for meal-index meals
+        
+        The derived fields depend only on the meal, the portion and the user
+        context in the key, so each combination is enriched once and the
+        (read-only, shared) result is reused by every later plan.
+        """
+        meal_id = self.meal_index.meal_id(meal)
+        if meal_id is None:
+            return self.enhance_meal(
+                scale_meal(meal, portion) if portion is not None else meal, user_data, food_style,
+                current_season, health_conditions, cost_preference, portion
+            )
+        
+        key = (
+            meal_id, portion, user_data['region'], user_data.get('goal', 'maintain'),
+            user_data['food_preference'], food_style, current_season,
+            frozenset(health_conditions or ()), cost_preference
+        )
+        enriched = self.meal_enrichment.get(key)
+        if enriched is None:
+            enriched = self.enhance_meal(
+                scale_meal(meal, portion) if portion is not None else meal, user_data, food_style,
+                current_season, health_conditions, cost_preference, portion
+            )
+            self.meal_enrichment.put(key, enriched)
+        return enriched
+    
+    def enhance_meal(self, selected_meal, user_data, food_style, current_season, health_conditions, cost_preference,
+                     portion=None):
+        """Build the full meal entry (guidance, storage, benefits, ...) for a chosen meal"""
+        fields = dict(
+            name=selected_meal['name'],
+            calories=selected_meal['calories'],
+            macros=selected_meal['macros'],
+            vitamins=selected_meal.get('vitamins', {}),
+            minerals=selected_meal.get('minerals', {}),
+            food_style=selected_meal.get('food_style', food_style),
+            dietary_type=selected_meal.get('dietary_type', user_data['food_preference']),
+            seasonal_suitability=self.check_seasonal_suitability(selected_meal['name'], current_season),
+            preparation_method=self.get_preparation_method(selected_meal['name'], user_data['region']),
+            storage_guidelines=self.get_storage_guidelines(selected_meal['name']),
+            serving_size=self.get_serving_size(selected_meal['name'], user_data),
+            prep_time=self.get_prep_time(selected_meal['name']),
+            difficulty_level=self.get_difficulty_level(selected_meal['name']),
+            cost_category=self.get_cost_category(selected_meal['name'], cost_preference),
+            health_benefits=self.get_health_benefits(selected_meal['name'], health_conditions),
+            ingredients=self.get_meal_ingredients(selected_meal['name']),
+            nutritional_highlights=self.get_nutritional_highlights(selected_meal)
+        )
+        if portion is not None:
+            fields['portion'] = portion
         
-        return enhanced_meal
+        return Meal(**fields)
     
-    def get_suitable_meals(self, meal_type, user_data, food_style, current_season, health_conditions):
+    @stage_timings.timed('candidate_filtering')
+    def get_suitable_meals(self, meal_type, user_data, food_style, current_season, health_conditions, rng=None):
         """Get meals suitable for all criteria"""
-        suitable_meals = []
-        
-    
-        template_key = self.get_template_key(user_data['region'], food_style)
-        meal_options = self.meal_templates.get(template_key, {}).get(meal_type, [])
-        
-        for meal_name in meal_options:
-            meal_data = self.get_meal_data(meal_name)
-            
-            if self.is_meal_suitable(meal_data, user_data, current_season, health_conditions):
-                suitable_meals.append(meal_data)
-        
-        return suitable_meals
+        template_style = self.get_template_key(user_data['region'], food_style, rng)
+        return self.meal_index.get_candidates(
+            user_data['region'], template_style, current_season,
+            meal_type, user_data['food_preference'], health_conditions
+        )
     
-    def get_template_key(self, region, food_style):
-        """Get appropriate meal template key"""
-        if food_style == 'traditional':
-            return f"{region}_traditional"
-        elif food_style == 'modern':
-            return "modern_fusion"
+    def get_template_key(self, region, food_style, rng=None):
+        """Get appropriate meal template style for the candidate index"""
+        if food_style in ('traditional', 'modern'):
+            return food_style
         else:  
-            return random.choice([f"{region}_traditional", "modern_fusion"])
+            return (rng or random).choice(['traditional', 'modern'])
     
     def get_meal_data(self, meal_name):
         """Get comprehensive meal data"""
@@ -230,10 +472,6 @@ class DietEngine:
         
         if user_dietary == 'vegetarian' and meal_dietary == 'non_vegetarian':
             return False
-        elif user_dietary == 'non_vegetarian' and meal_dietary == 'vegetarian':
-            return True 
-        elif user_dietary == 'both':
-            return True  
         
         meal_seasons = meal_data.get('seasonal_availability', [])
         if meal_seasons and current_season not in meal_seasons:
@@ -252,23 +490,9 @@ class DietEngine:
     
     def get_meal_health_restrictions(self, meal_name):
         """Get health conditions that should avoid this meal"""
-        restrictions = {
-            'diabetes': ['sweet', 'sugar', 'jaggery', 'honey', 'fruit_juice'],
-            'hypertension': ['salt', 'pickle', 'papad', 'processed'],
-            'kidney_stones': ['spinach', 'tomato', 'chocolate', 'nuts'],
-            'lactose_intolerance': ['milk', 'curd', 'cheese', 'paneer'],
-            'gluten_intolerance': ['wheat', 'bread', 'pasta', 'roti']
-        }
-        
-        meal_lower = meal_name.lower()
-        restricted_conditions = []
-        
-        for condition, restricted_foods in restrictions.items():
-            if any(food in meal_lower for food in restricted_foods):
-                restricted_conditions.append(condition)
-        
-        return restricted_conditions
+        return list(classify_meal_name(meal_name)['health_restrictions'])
     
+    @stage_timings.timed('meal_scoring')
     def select_optimal_meal(self, suitable_meals, cost_preference, target_calories):
         """Select the best meal based on cost and nutritional fit"""
         if not suitable_meals:
@@ -300,18 +524,7 @@ class DietEngine:
     
     def estimate_meal_cost(self, meal_name):
         """Estimate meal cost category"""
-        expensive_ingredients = ['paneer', 'cashew', 'almond', 'quinoa', 'avocado', 'salmon', 'chicken']
-        moderate_ingredients = ['dal', 'vegetables', 'rice', 'eggs', 'yogurt']
-        cheap_ingredients = ['roti', 'bread', 'potato', 'onion', 'tomato']
-        
-        meal_lower = meal_name.lower()
-        
-        if any(ingredient in meal_lower for ingredient in expensive_ingredients):
-            return 'high'
-        elif any(ingredient in meal_lower for ingredient in moderate_ingredients):
-            return 'medium'
-        else:
-            return 'low'
+        return classify_meal_name(meal_name)['cost']
     
     def get_cost_preference_score(self, meal_cost, cost_preference):
         """Score meal based on cost preference match"""
@@ -345,30 +558,16 @@ class DietEngine:
     
     def create_fallback_meal(self, meal_type, target_calories, user_data):
         """Create fallback meal when no suitable meals found"""
-        fallback_meals = {
-            'breakfast': {
-                'name': 'Simple Breakfast',
-                'calories': target_calories,
-                'macros': {'protein': target_calories * 0.15 / 4, 'carbs': target_calories * 0.55 / 4, 'fats': target_calories * 0.30 / 9}
-            },
-            'lunch': {
-                'name': 'Balanced Lunch',
-                'calories': target_calories,
-                'macros': {'protein': target_calories * 0.20 / 4, 'carbs': target_calories * 0.50 / 4, 'fats': target_calories * 0.30 / 9}
-            },
-            'dinner': {
-                'name': 'Light Dinner',
-                'calories': target_calories,
-                'macros': {'protein': target_calories * 0.25 / 4, 'carbs': target_calories * 0.45 / 4, 'fats': target_calories * 0.30 / 9}
-            },
-            'snacks': {
-                'name': 'Healthy Snack',
-                'calories': target_calories,
-                'macros': {'protein': target_calories * 0.20 / 4, 'carbs': target_calories * 0.50 / 4, 'fats': target_calories * 0.30 / 9}
+        name, (protein, carbs, fats) = FALLBACK_MEALS.get(meal_type, FALLBACK_MEALS['breakfast'])
+        base_meal = {
+            'name': name,
+            'calories': target_calories,
+            'macros': {
+                'protein': target_calories * protein / 4,
+                'carbs': target_calories * carbs / 4,
+                'fats': target_calories * fats / 9
             }
         }
-        
-        base_meal = fallback_meals.get(meal_type, fallback_meals['breakfast']).copy()
         base_meal.update({
             'vitamins': {},
             'minerals': {},
@@ -378,21 +577,11 @@ class DietEngine:
             'serving_size': '1 portion'
         })
         
-        return base_meal
+        return Meal.from_dict(base_meal)
     
     def check_seasonal_suitability(self, meal_name, current_season):
         """Check seasonal suitability of meal"""
-        seasonal_preferences = {
-            'winter': ['warm', 'hot', 'soup', 'tea', 'ginger', 'jaggery'],
-            'spring': ['fresh', 'light', 'detox', 'green', 'bitter'],
-            'monsoon': ['immunity', 'ginger', 'turmeric', 'warm', 'steamed'],
-            'autumn': ['balanced', 'cooked', 'moderate', 'warming']
-        }
-        
-        meal_lower = meal_name.lower()
-        season_foods = seasonal_preferences.get(current_season, [])
-        
-        matches = sum(1 for food in season_foods if food in meal_lower)
+        matches = classify_meal_name(meal_name)['seasonal_matches'].get(current_season, 0)
         
         if matches >= 2:
             return 'high'
@@ -403,15 +592,7 @@ class DietEngine:
     
     def get_preparation_method(self, meal_name, region):
         """Get detailed preparation method"""
-        preparation_database = {
-            'idli_sambar': 'Soak urad dal and rice separately for 4-6 hours. Grind into smooth batter, ferment overnight. Steam in idli plates for 12-15 minutes. For sambar: cook dal with vegetables, add tamarind water, temper with spices.',
-            'dosa_chutney': 'Use fermented dosa batter. Heat non-stick pan, spread batter thinly, cook until golden. For chutney: grind coconut with green chilies, ginger, and salt.',
-            'roti_dal_sabzi': 'Knead wheat flour with water and salt. Roll into circles, cook on hot tawa until puffed. For dal: pressure cook lentils, temper with cumin and spices. Prepare vegetables with minimal oil.',
-            'smoothie_bowl': 'Blend frozen fruits with yogurt or milk. Pour into bowl, top with nuts, seeds, and fresh fruits. Serve immediately.',
-            'quinoa_bowl': 'Rinse quinoa, cook with water (1:2 ratio) for 15 minutes. Add cooked vegetables, protein, and dressing. Garnish with herbs.'
-        }
-        
-        method = preparation_database.get(meal_name.lower().replace(' ', '_'), 
+        method = PREPARATION_METHODS.get(meal_name.lower().replace(' ', '_'), 
                                         'Cook ingredients properly with minimal oil and appropriate spices.')
         
        
@@ -424,54 +605,11 @@ class DietEngine:
     
     def get_storage_guidelines(self, meal_name):
         """Get storage guidelines for meal"""
-        storage_database = {
-            'cooked_rice': 'Store in refrigerator for up to 3 days. Reheat thoroughly before serving.',
-            'dal': 'Refrigerate for up to 3 days. Add water if too thick when reheating.',
-            'vegetables': 'Best consumed fresh. Refrigerate for maximum 2 days.',
-            'bread_items': 'Store at room temperature for 1 day, refrigerate for up to 3 days.',
-            'smoothie': 'Consume immediately. Do not store.',
-            'salad': 'Prepare fresh. Dress just before serving.',
-            'soup': 'Cool completely before refrigerating. Store for up to 4 days.'
-        }
-        
-        meal_lower = meal_name.lower()
-        
-        
-        if any(word in meal_lower for word in ['rice', 'biryani', 'pulao']):
-            return storage_database['cooked_rice']
-        elif any(word in meal_lower for word in ['dal', 'lentil', 'sambar', 'rasam']):
-            return storage_database['dal']
-        elif any(word in meal_lower for word in ['smoothie', 'juice']):
-            return storage_database['smoothie']
-        elif any(word in meal_lower for word in ['salad', 'raw']):
-            return storage_database['salad']
-        elif any(word in meal_lower for word in ['soup', 'broth']):
-            return storage_database['soup']
-        elif any(word in meal_lower for word in ['roti', 'bread', 'chapati']):
-            return storage_database['bread_items']
-        else:
-            return 'Store in refrigerator and consume within 2-3 days. Reheat properly before serving.'
+        return classify_meal_name(meal_name)['storage']
     
     def get_serving_size(self, meal_name, user_data):
         """Get appropriate serving size based on meal and user goals"""
-        base_serving_sizes = {
-            'rice': '150g cooked',
-            'roti': '2 medium pieces',
-            'dal': '100g',
-            'vegetables': '150g',
-            'salad': '200g',
-            'smoothie': '250ml',
-            'soup': '200ml'
-        }
-        
-        meal_lower = meal_name.lower()
-        
-     
-        serving_size = '1 portion'
-        for food, size in base_serving_sizes.items():
-            if food in meal_lower:
-                serving_size = size
-                break
+        serving_size = classify_meal_name(meal_name)['serving_size']
         
        
         goal = user_data.get('goal', 'maintain')
@@ -484,38 +622,11 @@ class DietEngine:
     
     def get_prep_time(self, meal_name):
         """Get preparation time for meal"""
-        prep_times = {
-            'instant': ['tea', 'coffee', 'milk', 'juice', 'fruit'],
-            '5-10 mins': ['smoothie', 'salad', 'sandwich', 'toast'],
-            '15-20 mins': ['eggs', 'pasta', 'noodles', 'upma', 'poha'],
-            '20-30 mins': ['rice', 'dal', 'vegetables', 'soup'],
-            '30-45 mins': ['biryani', 'curry', 'sambar', 'rasam'],
-            '45+ mins': ['idli', 'dosa', 'fermented items']
-        }
-        
-        meal_lower = meal_name.lower()
-        
-        for time_range, foods in prep_times.items():
-            if any(food in meal_lower for food in foods):
-                return time_range
-        
-        return '20-25 mins'
+        return classify_meal_name(meal_name)['prep_time']
     
     def get_difficulty_level(self, meal_name):
         """Get cooking difficulty level"""
-        difficulty_levels = {
-            'easy': ['tea', 'coffee', 'smoothie', 'salad', 'sandwich', 'toast', 'boiled'],
-            'medium': ['rice', 'dal', 'vegetables', 'pasta', 'eggs', 'soup'],
-            'hard': ['biryani', 'idli', 'dosa', 'complex curry', 'fermented']
-        }
-        
-        meal_lower = meal_name.lower()
-        
-        for level, foods in difficulty_levels.items():
-            if any(food in meal_lower for food in foods):
-                return level
-        
-        return 'medium'
+        return classify_meal_name(meal_name)['difficulty']
     
     def get_cost_category(self, meal_name, cost_preference):
         """Get cost category for meal"""
@@ -523,44 +634,25 @@ class DietEngine:
     
     def get_health_benefits(self, meal_name, health_conditions):
         """Get health benefits specific to user's conditions"""
-        benefits_database = {
-            'dal': ['High protein', 'Rich in folate', 'Good for heart health'],
-            'vegetables': ['High fiber', 'Antioxidants', 'Vitamins and minerals'],
-            'fruits': ['Vitamin C', 'Natural sugars', 'Digestive health'],
-            'whole_grains': ['Complex carbs', 'B vitamins', 'Sustained energy'],
-            'yogurt': ['Probiotics', 'Calcium', 'Digestive health']
-        }
-        
-        meal_lower = meal_name.lower()
-        benefits = []
-        
-        for food_category, benefit_list in benefits_database.items():
-            if food_category in meal_lower:
-                benefits.extend(benefit_list)
+        classification = classify_meal_name(meal_name)
+        keywords = classification['keywords']
+        benefits = list(classification['benefits'])
         
         
         if 'diabetes' in health_conditions:
-            if any(word in meal_lower for word in ['fiber', 'whole', 'complex']):
+            if not keywords.isdisjoint(BLOOD_SUGAR_KEYWORDS):
                 benefits.append('Helps regulate blood sugar')
         
         if 'hypertension' in health_conditions:
-            if any(word in meal_lower for word in ['potassium', 'vegetable', 'fruit']):
+            if not keywords.isdisjoint(BLOOD_PRESSURE_KEYWORDS):
                 benefits.append('May help lower blood pressure')
         
         return benefits[:3]  
     
     def get_meal_ingredients(self, meal_name):
         """Get ingredients list for meal"""
-        ingredient_database = {
-            'idli_sambar': ['Idli rice', 'Urad dal', 'Tur dal', 'Mixed vegetables', 'Tamarind', 'Sambar powder', 'Curry leaves'],
-            'dosa_chutney': ['Dosa batter', 'Coconut', 'Green chilies', 'Ginger', 'Curry leaves', 'Oil'],
-            'roti_dal_sabzi': ['Whole wheat flour', 'Tur dal', 'Seasonal vegetables', 'Onions', 'Tomatoes', 'Spices'],
-            'smoothie_bowl': ['Mixed berries', 'Banana', 'Yogurt', 'Honey', 'Nuts', 'Seeds'],
-            'quinoa_bowl': ['Quinoa', 'Mixed vegetables', 'Olive oil', 'Lemon', 'Herbs', 'Protein of choice']
-        }
-        
         key = meal_name.lower().replace(' ', '_')
-        return ingredient_database.get(key, ['Basic ingredients as per recipe'])
+        return list(MEAL_INGREDIENTS.get(key, ('Basic ingredients as per recipe',)))
     
     def get_nutritional_highlights(self, meal_data):
         """Get key nutritional highlights"""
@@ -589,47 +681,35 @@ class DietEngine:
         return highlights[:3]  
     def calculate_daily_totals(self, daily_plan):
         """Calculate daily nutrition totals"""
-        totals = {
-            'calories': 0,
-            'protein': 0,
-            'carbs': 0,
-            'fats': 0,
-            'vitamins': {},
-            'minerals': {},
-            'fiber': 0
-        }
-        
+        return self.calculate_weekly_totals([daily_plan])[0]
+    
+    def calculate_weekly_totals(self, day_plans):
+        """Calculate nutrition totals for several days at once"""
+        # Nutrients missing from the axis (client-supplied meals) get columns for this call only
+        extra = {}
+        vectors = self.calculate_weekly_total_vectors(day_plans, extra)
+        return [self.nutrient_axis.to_dict(vector, extra) for vector in vectors]
+    
+    @stage_timings.timed('daily_totals')
+    def calculate_weekly_total_vectors(self, day_plans, extra=None):
+        """Totals of several days as rows of one (days x nutrients) matrix"""
         meal_types = ['breakfast', 'lunch', 'snacks', 'dinner']
         
-        for meal_type in meal_types:
-            if meal_type in daily_plan:
-                meal = daily_plan[meal_type]
-                
-                
-                totals['calories'] += meal.get('calories', 0)
-                macros = meal.get('macros', {})
-                totals['protein'] += macros.get('protein', 0)
-                totals['carbs'] += macros.get('carbs', 0)
-                totals['fats'] += macros.get('fats', 0)
-                
-            
-                for vitamin, amount in meal.get('vitamins', {}).items():
-                    if vitamin not in totals['vitamins']:
-                        totals['vitamins'][vitamin] = 0
-                    totals['vitamins'][vitamin] += amount
-                
-                
-                for mineral, amount in meal.get('minerals', {}).items():
-                    if mineral not in totals['minerals']:
-                        totals['minerals'][mineral] = 0
-                    totals['minerals'][mineral] += amount
+        meals = []
+        meals_per_day = []
+        for daily_plan in day_plans:
+            day_meals = [daily_plan[meal_type] for meal_type in meal_types if meal_type in daily_plan]
+            meals.extend(day_meals)
+            meals_per_day.append(len(day_meals))
         
-        return totals
+        matrix = self.nutrient_axis.meal_matrix(meals, extra)
+        return self.nutrient_axis.group_totals(matrix, meals_per_day)
     
     def get_health_recommendations(self, user_data, nutrition_summary, health_conditions=[]):
         """Get basic health recommendations (for backward compatibility)"""
         return self.get_enhanced_health_recommendations(user_data, nutrition_summary, health_conditions)
     
+    @stage_timings.timed('recommendations')
     def get_enhanced_health_recommendations(self, user_data, nutrition_summary, health_conditions=[]):
         """Generate comprehensive health recommendations"""
         recommendations = []
@@ -709,6 +789,7 @@ class DietEngine:
         
         return recommendations[:8]  
     
+    @stage_timings.timed('grocery_list')
     def generate_grocery_list(self, weekly_plan):
         """Generate comprehensive grocery list from weekly meal plan"""
         grocery_list = {
@@ -724,7 +805,7 @@ class DietEngine:
         
         for day, day_plan in weekly_plan.items():
             for meal_type, meal_data in day_plan.items():
-                if meal_type != 'totals' and isinstance(meal_data, dict):
+                if meal_type != 'totals' and isinstance(meal_data, Mapping):
                     ingredients = meal_data.get('ingredients', [])
                     
                     for ingredient in ingredients:
@@ -739,26 +820,203 @@ class DietEngine:
     
     def categorize_ingredient(self, ingredient):
         """Categorize ingredient into grocery categories"""
-        ingredient_lower = ingredient.lower()
-        
-        grains = ['rice', 'wheat', 'flour', 'quinoa', 'oats', 'millet', 'bread']
-        vegetables = ['onion', 'tomato', 'potato', 'carrot', 'beans', 'spinach', 'cabbage', 'broccoli', 'pepper', 'vegetable']
-        fruits = ['apple', 'banana', 'orange', 'mango', 'berries', 'lemon', 'lime', 'fruit']
-        dairy = ['milk', 'yogurt', 'cheese', 'paneer', 'butter', 'ghee']
-        proteins = ['dal', 'lentil', 'chicken', 'fish', 'eggs', 'nuts', 'seeds', 'tofu']
-        spices = ['salt', 'pepper', 'turmeric', 'cumin', 'coriander', 'ginger', 'garlic', 'chili', 'spice', 'oil', 'powder']
-        
-        if any(grain in ingredient_lower for grain in grains):
-            return 'grains_cereals'
-        elif any(veg in ingredient_lower for veg in vegetables):
-            return 'vegetables'
-        elif any(fruit in ingredient_lower for fruit in fruits):
-            return 'fruits'
-        elif any(dairy_item in ingredient_lower for dairy_item in dairy):
-            return 'dairy'
-        elif any(protein in ingredient_lower for protein in proteins):
-            return 'proteins'
-        elif any(spice in ingredient_lower for spice in spices):
-            return 'spices_condiments'
+        return classify_meal_name(ingredient)['ingredient_category']
+    
+    def swap_meal(self, weekly_plan, day, meal_type, constraints=None, user_data=None,
+                  nutrition_summary=None, grocery_list=None, rebalance=False):
+        """Replace one slot of a plan in place, updating only what it touches
+        
+        constraints may give 'exclude' (meal names), 'max_calories',
+        'min_protein', 'cost' (category or list), 'dietary_type' and
+        'food_style'. The day's totals and the grocery list are adjusted by
+        deltas; with rebalance=True the neighbouring slots of the same day are
+        re-portioned to bring the day back towards its calorie target.
+        
+        Returns the patch: the changed meals, the day's totals and the
+        grocery list with its delta.
+        """
+        constraints = constraints or {}
+        day_plan = weekly_plan.get(day)
+        if day_plan is None or meal_type not in self.MEAL_CALORIE_SHARES:
+            raise ValueError(f"Unknown plan slot: {day} {meal_type}")
+        
+        old_meal = day_plan.get(meal_type) or {}
+        other_meals = [
+            meal for slot, meal in day_plan.items()
+            if slot in self.MEAL_CALORIE_SHARES and slot != meal_type and isinstance(meal, Mapping)
+        ]
+        daily_calories = nutrition_summary['daily_calories']
+        
+        # Aim for whatever keeps the day on target, within sensible bounds for the slot
+        share_calories = daily_calories * self.MEAL_CALORIE_SHARES[meal_type]
+        target_calories = daily_calories - sum(meal.get('calories', 0) for meal in other_meals)
+        target_calories = min(max(target_calories, share_calories * 0.5), share_calories * 1.5)
+        
+        candidates = self.get_swap_candidates(meal_type, user_data, constraints, [old_meal] + other_meals)
+        if not candidates:
+            raise ValueError('No alternative meal matches the constraints')
+        
+        selected_meal = self.select_optimal_meal(
+            candidates, user_data.get('cost_preference', 'medium'), target_calories
+        )
+        new_meal = self.get_enriched_meal(
+            selected_meal, user_data, user_data.get('food_style', 'both'),
+            user_data.get('current_season', 'spring'), user_data.get('health_conditions', []),
+            user_data.get('cost_preference', 'medium')
+        )
+        day_plan[meal_type] = new_meal
+        
+        changed = {meal_type: (old_meal, new_meal)}
+        if rebalance:
+            changed.update(self.rebalance_adjacent_slots(day_plan, meal_type, daily_calories))
+        
+        removed = [old for old, new in changed.values()]
+        added = [new for old, new in changed.values()]
+        totals = day_plan.get('totals')
+        if totals is None:
+            totals = self.calculate_daily_totals(day_plan)
         else:
-            return 'others'
\ No newline at end of file
+            totals = self.adjust_daily_totals(totals, removed, added, day_plan)
+        day_plan['totals'] = totals
+        
+        if grocery_list is None:
+            grocery_list = self.generate_grocery_list(weekly_plan)
+            grocery_delta = None
+        else:
+            grocery_delta = self.update_grocery_list(
+                grocery_list, weekly_plan,
+                old_meal.get('ingredients', []), new_meal.get('ingredients', [])
+            )
+        
+        return {
+            'day': day,
+            'meals': {slot: new for slot, (old, new) in changed.items()},
+            'totals': totals,
+            'grocery_list': grocery_list,
+            'grocery_delta': grocery_delta
+        }
+    
+    def get_swap_candidates(self, meal_type, user_data, constraints, day_meals):
+        """Suitable meals for a slot that satisfy the swap constraints"""
+        candidates = self.meal_index.get_candidates(
+            user_data['region'],
+            constraints.get('food_style', user_data.get('food_style', 'both')),
+            user_data.get('current_season', 'spring'),
+            meal_type,
+            user_data['food_preference'],
+            user_data.get('health_conditions', [])
+        )
+        
+        excluded = {meal.get('name') for meal in day_meals}
+        excluded.update(constraints.get('exclude', []))
+        costs = constraints.get('cost')
+        if isinstance(costs, str):
+            costs = [costs]
+        max_calories = constraints.get('max_calories')
+        min_protein = constraints.get('min_protein')
+        dietary_type = constraints.get('dietary_type')
+        
+        return [
+            meal for meal in candidates
+            if meal['name'] not in excluded
+            and (max_calories is None or meal['calories'] <= max_calories)
+            and (min_protein is None or meal['macros'].get('protein', 0) >= min_protein)
+            and (dietary_type is None or meal.get('dietary_type') == dietary_type)
+            and (not costs or self.estimate_meal_cost(meal['name']) in costs)
+        ]
+    
+    def rebalance_adjacent_slots(self, day_plan, meal_type, daily_calories):
+        """Re-portion the slots next to meal_type so the day's calories approach the target"""
+        meal_types = list(self.MEAL_CALORIE_SHARES)
+        position = meal_types.index(meal_type)
+        adjacent = [
+            slot for slot in meal_types[max(0, position - 1):position + 2]
+            if slot != meal_type and isinstance(day_plan.get(slot), Mapping)
+        ]
+        if not adjacent:
+            return {}
+        
+        fixed_calories = sum(
+            day_plan[slot].get('calories', 0) for slot in meal_types
+            if slot not in adjacent and isinstance(day_plan.get(slot), Mapping)
+        )
+        base_calories = {
+            slot: day_plan[slot].get('calories', 0) / day_plan[slot].get('portion', 1)
+            for slot in adjacent
+        }
+        
+        # Few slots and portions: try every combination, preferring small changes on ties
+        portions = [float(portion) for portion in self.plan_optimizer.portions]
+        best = min(
+            itertools.product(portions, repeat=len(adjacent)),
+            key=lambda combo: (
+                abs(fixed_calories + sum(base_calories[slot] * portion for slot, portion in zip(adjacent, combo))
+                    - daily_calories),
+                sum(abs(portion - day_plan[slot].get('portion', 1)) for slot, portion in zip(adjacent, combo))
+            )
+        )
+        
+        changed = {}
+        for slot, portion in zip(adjacent, best):
+            old_meal = day_plan[slot]
+            if portion == old_meal.get('portion', 1):
+                continue
+            new_meal = dict(scale_meal(old_meal, portion / old_meal.get('portion', 1)), portion=portion)
+            if isinstance(old_meal, Meal):
+                new_meal = Meal.from_dict(new_meal)
+            day_plan[slot] = new_meal
+            changed[slot] = (old_meal, new_meal)
+        return changed
+    
+    def adjust_daily_totals(self, totals, removed_meals, added_meals, day_plan):
+        """Apply meal changes to a day's totals without re-summing the day"""
+        totals = dict(totals, vitamins=dict(totals.get('vitamins', {})), minerals=dict(totals.get('minerals', {})))
+        for meals, sign in ((removed_meals, -1), (added_meals, 1)):
+            for meal in meals:
+                macros = meal.get('macros', {})
+                for name in MACRO_KEYS:
+                    amount = meal.get('calories', 0) if name == 'calories' else macros.get(name, 0)
+                    totals[name] = totals.get(name, 0) + sign * amount
+                for group in MICRO_GROUPS:
+                    for name, amount in meal.get(group, {}).items():
+                        totals[group][name] = totals[group].get(name, 0) + sign * amount
+        
+        # Totals only list micronutrients some meal of the day provides
+        for group in MICRO_GROUPS:
+            listed = set()
+            for slot in self.MEAL_CALORIE_SHARES:
+                if isinstance(day_plan.get(slot), Mapping):
+                    listed.update(day_plan[slot].get(group, {}))
+            for name in list(totals[group]):
+                if name not in listed:
+                    del totals[group][name]
+        return totals
+    
+    def update_grocery_list(self, grocery_list, weekly_plan, removed_ingredients, added_ingredients):
+        """Apply one meal's ingredient change to a grocery list in place; returns the delta"""
+        removed = set(removed_ingredients) - set(added_ingredients)
+        added = set(added_ingredients) - set(removed_ingredients)
+        
+        # An ingredient leaves the list only if no other meal still needs it
+        if removed:
+            for day_plan in weekly_plan.values():
+                for slot, meal in day_plan.items():
+                    if slot != 'totals' and isinstance(meal, Mapping):
+                        removed.difference_update(meal.get('ingredients', []))
+                        if not removed:
+                            break
+        
+        delta = {'added': {}, 'removed': {}}
+        for ingredient in sorted(removed):
+            category = self.categorize_ingredient(ingredient)
+            items = grocery_list.get(category, [])
+            if ingredient in items:
+                items.remove(ingredient)
+                delta['removed'].setdefault(category, []).append(ingredient)
+        for ingredient in sorted(added):
+            category = self.categorize_ingredient(ingredient)
+            items = grocery_list.setdefault(category, [])
+            if ingredient not in items:
+                bisect.insort(items, ingredient)
+                delta['added'].setdefault(category, []).append(ingredient)
+        return delta
@@ -0,0 +1,473 @@
+import argparse
+import base64
+import json
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: builds are only serialized between threads
+    fcntl = None
+
+from models.catalog import DATA_DIR, FoodCatalog, get_default_nutrition_data, load_data_file, split_nutrient_key
+from models.diet_engine import DietEngine
+
+DEFAULT_FOOD_DB_PATH = os.path.join(DATA_DIR, 'foods.db')
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Filterable text columns of the foods table
+TEXT_FIELDS = ('kind', 'name', 'category', 'dietary_type', 'food_style', 'cost')
+# Multi-valued attributes, stored one row per value in food_tags
+TAG_FIELDS = ('season', 'meal_type', 'health_benefit')
+# Fields whose values can be used on their own ("vegetarian and winter")
+KEYWORD_FIELDS = ('dietary_type', 'food_style', 'cost', 'kind', 'category', 'season', 'meal_type')
+
+OPERATORS = ('>=', '<=', '!=', '=', '>', '<', '~')
+CLAUSE_PATTERN = re.compile(r'^([A-Za-z][A-Za-z0-9_]*)\s*(>=|<=|!=|=|>|<|~)\s*(.+)$')
+AND_PATTERN = re.compile(r'\s+and\s+|\s*&\s*', re.IGNORECASE)
+NUTRIENT_NAME = re.compile(r'^[A-Za-z0-9_]+$')
+# Sort keys for nullable columns: meals have no glycemic index and sort below every food
+NULL_SORT_VALUES = {'glycemic_index': -1}
+
+
+def nutrient_column(name):
+    return f"n_{name}"
+
+
+def slug(text):
+    return re.sub(r'[^a-z0-9]+', '_', text.lower()).strip('_')
+
+
+def encode_cursor(value, row_id):
+    return base64.urlsafe_b64encode(json.dumps([value, row_id]).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        value, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return value, int(row_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def iter_food_rows(engine):
+    """(food_id, kind, columns, nutrients, tags, record) for every catalog food and indexed meal"""
+    catalog = engine.catalog
+    for food_id in catalog.food_ids:
+        food = catalog.get(food_id)
+        nutrients = catalog.get_nutrients(food_id)
+        columns = {
+            'name': food['name'], 'category': food['category'], 'dietary_type': food['dietary_type'],
+            'food_style': food['food_style'], 'cost': food['cost'], 'glycemic_index': food['glycemic_index']
+        }
+        seasons = food['seasonal_availability'] or ('year_round',)
+        tags = [('season', season) for season in seasons]
+        tags += [('health_benefit', benefit) for benefit in food['health_benefits']]
+        record = dict(food, kind='food', nutrients=nutrients)
+        yield food_id, 'food', columns, nutrients, tags, record
+
+    meal_types = {}
+    for (_, _, meal_type), meal_ids in engine.meal_index.placements.items():
+        for meal_id in meal_ids:
+            meal_types.setdefault(meal_id, set()).add(meal_type)
+
+    seen = set()
+    for meal_id, meal in enumerate(engine.meal_index.meals):
+        food_id = slug(meal['name'])
+        if food_id in seen:
+            continue
+        seen.add(food_id)
+        nutrients = {
+            'macros': dict(meal.get('macros', {}), calories=meal.get('calories', 0)),
+            'vitamins': dict(meal.get('vitamins', {})),
+            'minerals': dict(meal.get('minerals', {}))
+        }
+        columns = {
+            'name': meal['name'], 'category': None, 'dietary_type': meal.get('dietary_type'),
+            'food_style': meal.get('food_style'), 'cost': None, 'glycemic_index': None
+        }
+        seasons = meal.get('seasonal_availability') or ('year_round',)
+        types = sorted(meal_types.get(meal_id, ()))
+        tags = [('season', season) for season in seasons]
+        tags += [('meal_type', meal_type) for meal_type in types]
+        tags += [('health_benefit', benefit) for benefit in meal.get('health_benefits', [])]
+        record = {
+            'id': food_id, 'kind': 'meal', 'name': meal['name'],
+            'dietary_type': meal.get('dietary_type'), 'food_style': meal.get('food_style'),
+            'seasonal_availability': list(meal.get('seasonal_availability', [])), 'meal_types': types,
+            'ingredients': meal.get('ingredients', {}), 'preparation_method': meal.get('preparation_method'),
+            'preparation_time': meal.get('preparation_time'), 'storage': meal.get('storage'),
+            'health_benefits': list(meal.get('health_benefits', [])), 'nutrients': nutrients
+        }
+        yield food_id, 'meal', columns, nutrients, tags, record
+
+
+def build_food_db(path, engine):
+    """Write the foods and meals of an engine's catalog to a SQLite database at path
+
+    Rows are streamed into a uniquely named file in the same directory that
+    is renamed into place when complete; open readers keep the previous
+    file until they reconnect.
+    """
+    nutrient_names = list(engine.catalog.nutrient_names)
+    for meal in engine.meal_index.meals:
+        for group in ('macros', 'vitamins', 'minerals'):
+            for name in meal.get(group, {}):
+                if name not in nutrient_names:
+                    nutrient_names.append(name)
+    for name in nutrient_names:
+        if not NUTRIENT_NAME.match(name):
+            raise ValueError(f"Unsupported nutrient name: {name}")
+
+    fd, partial = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(path)), prefix=os.path.basename(path) + '.', suffix='.tmp'
+    )
+    os.close(fd)
+    try:
+        # mkstemp creates the file private to its owner
+        os.chmod(partial, 0o644)
+        build_food_tables(partial, engine, nutrient_names)
+        os.replace(partial, path)
+    except BaseException:
+        os.remove(partial)
+        raise
+
+
+def build_food_tables(path, engine, nutrient_names):
+    """Create and fill the tables of a new food database"""
+    nutrient_columns = [nutrient_column(name) for name in nutrient_names]
+    connection = sqlite3.connect(path)
+    try:
+        connection.execute('PRAGMA journal_mode=OFF')
+        connection.execute('PRAGMA synchronous=OFF')
+        connection.execute(f'''
+            CREATE TABLE foods (
+                id INTEGER PRIMARY KEY,
+                food_id TEXT NOT NULL,
+                kind TEXT NOT NULL COLLATE NOCASE,
+                name TEXT NOT NULL COLLATE NOCASE,
+                category TEXT COLLATE NOCASE,
+                dietary_type TEXT COLLATE NOCASE,
+                food_style TEXT COLLATE NOCASE,
+                cost TEXT COLLATE NOCASE,
+                glycemic_index REAL,
+                record TEXT NOT NULL,
+                {', '.join(f'{column} REAL NOT NULL DEFAULT 0' for column in nutrient_columns)}
+            )
+        ''')
+        connection.execute('''
+            CREATE TABLE food_tags (
+                field TEXT NOT NULL,
+                value TEXT NOT NULL COLLATE NOCASE,
+                food INTEGER NOT NULL,
+                PRIMARY KEY (field, value, food)
+            ) WITHOUT ROWID
+        ''')
+        connection.execute('CREATE TABLE catalog_info (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+
+        insert_food = (
+            f"INSERT INTO foods (id, food_id, kind, name, category, dietary_type, food_style, cost, "
+            f"glycemic_index, record, {', '.join(nutrient_columns)}) "
+            f"VALUES ({', '.join('?' * (10 + len(nutrient_columns)))})"
+        )
+        for row_id, (food_id, kind, columns, nutrients, tags, record) in enumerate(iter_food_rows(engine), 1):
+            values = {}
+            for group in nutrients.values():
+                values.update(group)
+            connection.execute(insert_food, (
+                row_id, food_id, kind, columns['name'], columns['category'], columns['dietary_type'],
+                columns['food_style'], columns['cost'], columns['glycemic_index'],
+                json.dumps(record, separators=(',', ':')),
+                *(float(values.get(name) or 0) for name in nutrient_names)
+            ))
+            connection.executemany(
+                'INSERT OR IGNORE INTO food_tags (field, value, food) VALUES (?, ?, ?)',
+                [(field, value, row_id) for field, value in tags]
+            )
+
+        # Built after loading, which is much faster than maintaining them per insert
+        for column in ('kind', 'name', 'category', 'dietary_type', 'food_style', 'cost', 'glycemic_index'):
+            connection.execute(f'CREATE INDEX foods_{column} ON foods ({column})')
+        for column, value in NULL_SORT_VALUES.items():
+            connection.execute(f'CREATE INDEX foods_{column}_sort ON foods (COALESCE({column}, {value}))')
+        for column in nutrient_columns:
+            connection.execute(f'CREATE INDEX foods_{column} ON foods ({column})')
+        connection.executemany('INSERT INTO catalog_info (key, value) VALUES (?, ?)', [
+            ('data_version', engine.data_version),
+            ('nutrients', json.dumps(nutrient_names)),
+            ('units', json.dumps(engine.catalog.units))
+        ])
+        connection.commit()
+        connection.execute('ANALYZE')
+    finally:
+        connection.close()
+
+
+class FileLock:
+    """Exclusive flock() on a lock file, held across processes (e.g. gunicorn workers)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'a')
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
+
+
+class FoodStore:
+    """Indexed, paginated search over the food catalog, kept in a SQLite file
+
+    Queries run against the database on disk, so memory use doesn't grow
+    with the catalog. Each thread reads through its own read-only
+    connection; after a rebuild the connections reopen on the new file.
+    Rebuilds hold a lock file next to the database, so of several processes
+    sharing it only one rebuilds and the rest pick up its file.
+    """
+
+    def __init__(self, path=DEFAULT_FOOD_DB_PATH):
+        self.path = path
+        self.generation = 0
+        self.version = None
+        self._local = threading.local()
+        self._build_lock = threading.Lock()
+        self._schema = None
+
+    def _connection(self):
+        """One read-only connection per thread, reopened after a rebuild"""
+        local = self._local
+        if getattr(local, 'generation', None) != self.generation:
+            if getattr(local, 'connection', None) is not None:
+                local.connection.close()
+            local.connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, timeout=10)
+            local.generation = self.generation
+        return local.connection
+
+    def data_version(self):
+        """Catalog data version of the file now at path, or None if there is none"""
+        if not os.path.exists(self.path):
+            return None
+        # Not the thread's connection: that may still be on a file another process replaced
+        try:
+            connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, timeout=10)
+        except sqlite3.DatabaseError:
+            return None
+        try:
+            row = connection.execute("SELECT value FROM catalog_info WHERE key = 'data_version'").fetchone()
+        except sqlite3.DatabaseError:
+            return None
+        finally:
+            connection.close()
+        return row[0] if row else None
+
+    def refresh(self, engine):
+        """Rebuild the database if it is missing or was built from other catalog data
+
+        Returns True if readers moved to a different file, whether this
+        process built it or another one did.
+        """
+        with self._build_lock, FileLock(self.path + '.lock'):
+            version = self.data_version()
+            if version != engine.data_version:
+                build_food_db(self.path, engine)
+                version = engine.data_version
+            if version == self.version:
+                return False
+            self.version = version
+            self._schema = None
+            self.generation += 1
+            return True
+
+    def schema(self):
+        """Nutrient columns, units and the field of every keyword value"""
+        schema = self._schema
+        if schema is None:
+            connection = self._connection()
+            info = dict(connection.execute('SELECT key, value FROM catalog_info'))
+            nutrients = json.loads(info['nutrients'])
+            keywords = {}
+            for field in KEYWORD_FIELDS:
+                if field in TAG_FIELDS:
+                    values = connection.execute('SELECT DISTINCT value FROM food_tags WHERE field = ?', (field,))
+                else:
+                    values = connection.execute(f'SELECT DISTINCT {field} FROM foods WHERE {field} IS NOT NULL')
+                for (value,) in values:
+                    keywords.setdefault(value.lower(), []).append((field, value))
+            schema = self._schema = {
+                'nutrients': {name.lower(): name for name in nutrients},
+                'units': json.loads(info['units']),
+                'keywords': keywords
+            }
+        return schema
+
+    def resolve_field(self, field):
+        """('text' | 'tag' | 'number', column) for a filter field such as iron_mg or season"""
+        lowered = field.lower()
+        if lowered in TEXT_FIELDS:
+            return 'text', lowered
+        if lowered in TAG_FIELDS:
+            return 'tag', lowered
+        if lowered == 'glycemic_index':
+            return 'number', lowered
+        name, _ = split_nutrient_key(field)
+        name = FoodCatalog.MACRO_ALIASES.get(name.lower(), name)
+        nutrient = self.schema()['nutrients'].get(name.lower())
+        if nutrient is None:
+            raise ValueError(f"Unknown filter field: {field}")
+        return 'number', nutrient_column(nutrient)
+
+    def parse_query(self, query):
+        """Parse "iron_mg > 3 and vegetarian and season=winter" into (field, op, value) filters"""
+        filters = []
+        for clause in AND_PATTERN.split(query.strip()):
+            clause = clause.strip()
+            if not clause:
+                continue
+            match = CLAUSE_PATTERN.match(clause)
+            if match:
+                field, op, value = match.groups()
+                filters.append((field, op, value.strip().strip('\'"')))
+                continue
+            fields = self.schema()['keywords'].get(clause.strip('\'"').lower())
+            if not fields:
+                raise ValueError(f"Cannot parse filter: {clause}")
+            if len(fields) > 1:
+                names = ', '.join(f"{field}={value}" for field, value in fields)
+                raise ValueError(f"Ambiguous filter {clause}: use one of {names}")
+            filters.append((fields[0][0], '=', fields[0][1]))
+        return filters
+
+    def where_clause(self, filters):
+        """SQL conditions and parameters for a list of (field, op, value) filters"""
+        conditions, params = [], []
+        for field, op, value in filters:
+            if op not in OPERATORS:
+                raise ValueError(f"Unknown operator: {op}")
+            kind, column = self.resolve_field(field)
+            if kind == 'number':
+                if op == '~':
+                    raise ValueError(f"{field} is numeric; use =, !=, <, <=, > or >=")
+                try:
+                    number = float(value)
+                except (TypeError, ValueError):
+                    raise ValueError(f"{field} needs a number, got {value!r}")
+                conditions.append(f"{column} {op} ?")
+                params.append(number)
+            elif kind == 'tag':
+                if op not in ('=', '!='):
+                    raise ValueError(f"{field} supports only = and !=")
+                values = [value]
+                if column == 'season' and value != 'year_round':
+                    # Year-round foods are available in every season
+                    values.append('year_round')
+                exists = (
+                    f"EXISTS (SELECT 1 FROM food_tags WHERE field = ? AND food = foods.id "
+                    f"AND value IN ({', '.join('?' * len(values))}))"
+                )
+                conditions.append(exists if op == '=' else f"NOT {exists}")
+                params += [column] + values
+            elif op == '~':
+                conditions.append(f"{column} LIKE ? ESCAPE '\\'")
+                params.append('%' + re.sub(r'([%_\\])', r'\\\1', value) + '%')
+            elif op in ('=', '!='):
+                conditions.append(f"{column} {op} ?")
+                params.append(value)
+            else:
+                raise ValueError(f"{field} supports only =, != and ~")
+        return conditions, params
+
+    def search(self, filters=(), sort=None, limit=DEFAULT_PAGE_SIZE, cursor=None):
+        """One page of matching foods and the cursor of the next page (None on the last page)
+
+        sort is a nutrient, glycemic_index or name, prefixed with '-' for
+        descending order; pages follow on from the cursor's (sort value, id),
+        so deep pages cost the same as the first. Meals, which have no
+        glycemic index, sort on it as -1.
+        """
+        try:
+            limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        except (TypeError, ValueError):
+            raise ValueError(f"limit must be an integer, got {limit!r}")
+        conditions, params = self.where_clause(filters)
+
+        descending = bool(sort) and sort.startswith('-')
+        if not sort:
+            column = None
+        elif sort.lstrip('-').lower() == 'name':
+            column = 'name'
+        else:
+            kind, column = self.resolve_field(sort.lstrip('-'))
+            if kind != 'number':
+                raise ValueError(f"Cannot sort by {sort.lstrip('-')}")
+        if column in NULL_SORT_VALUES:
+            column = f"COALESCE({column}, {NULL_SORT_VALUES[column]})"
+        direction = 'DESC' if descending else 'ASC'
+        comparison = '<' if descending else '>'
+
+        if cursor:
+            value, row_id = decode_cursor(cursor)
+            if column is None:
+                conditions.append(f"id {comparison} ?")
+                params.append(row_id)
+            else:
+                conditions.append(f"({column}, id) {comparison} (?, ?)")
+                params += [value, row_id]
+        order = f"id {direction}" if column is None else f"{column} {direction}, id {direction}"
+
+        sql = f"SELECT id, {column or 'id'}, record FROM foods"
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += f" ORDER BY {order} LIMIT ?"
+        rows = self._connection().execute(sql, params + [limit + 1]).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][1], rows[-1][0])
+        return [json.loads(record) for _, _, record in rows], next_cursor
+
+    def category_counts(self):
+        """{category: number of foods} over the catalog's foods"""
+        return dict(self._connection().execute(
+            "SELECT category, COUNT(*) FROM foods WHERE kind = 'food' GROUP BY category ORDER BY category"
+        ))
+
+
+def create_food_store(engine):
+    """Food search database at FOOD_DB_PATH (empty to disable), rebuilt if stale"""
+    path = os.environ.get('FOOD_DB_PATH', DEFAULT_FOOD_DB_PATH)
+    if not path:
+        return None
+    store = FoodStore(path)
+    store.refresh(engine)
+    return store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the food search database')
+    parser.add_argument('--data-dir', default=DATA_DIR, help='directory holding nutrition_data.json and meals.json')
+    parser.add_argument('--output', default=DEFAULT_FOOD_DB_PATH)
+    args = parser.parse_args(argv)
+
+    nutrition_data = load_data_file('nutrition_data.json', get_default_nutrition_data, args.data_dir)
+    meal_templates = load_data_file('meals.json', DietEngine.get_default_meal_templates, args.data_dir)
+    engine = DietEngine(FoodCatalog(nutrition_data), meal_templates)
+    build_food_db(args.output, engine)
+    print(f"Built {args.output} from catalog data {engine.data_version}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
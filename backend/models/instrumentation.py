@@ -0,0 +1,153 @@
+import functools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+
+import numpy as np
+
+# Upper bounds (seconds) of the histogram buckets, from per-meal steps to whole requests
+DEFAULT_BUCKETS = (
+    0.00001, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+
+# Samples queued per histogram before they are bucketed
+FOLD_BATCH = 1024
+
+_DISABLED = nullcontext()
+
+
+class Histogram:
+    """Latency histogram with fixed buckets (Prometheus histogram semantics)
+
+    observe() only appends to a queue; samples are bucketed in vectorized
+    batches, every FOLD_BATCH samples and whenever a snapshot is taken, so
+    a timed call costs little more than its two clock reads.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = np.array(sorted(buckets), dtype=float)
+        self.counts = np.zeros(len(self.buckets) + 1, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self._pending = deque()
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        self._pending.append(seconds)
+        if len(self._pending) >= FOLD_BATCH:
+            self._fold()
+
+    def _fold(self):
+        with self._lock:
+            pending = self._pending
+            batch = [pending.popleft() for _ in range(len(pending))]
+            if not batch:
+                return
+            samples = np.array(batch, dtype=float)
+            # side='left' puts a sample equal to a bound in that bucket (le is inclusive)
+            indices = np.searchsorted(self.buckets, samples, side='left')
+            self.counts += np.bincount(indices, minlength=len(self.counts))
+            self.count += len(batch)
+            self.total += float(samples.sum())
+
+    def snapshot(self):
+        """Cumulative bucket counts, sum and count"""
+        self._fold()
+        with self._lock:
+            counts, count, total = self.counts.tolist(), self.count, self.total
+        buckets, running = [], 0
+        for bound, amount in zip(self.buckets.tolist() + ['+Inf'], counts):
+            running += amount
+            buckets.append((bound, running))
+        return {'buckets': buckets, 'sum': total, 'count': count}
+
+
+class _Timer:
+    """Context manager that records its wall time into a histogram"""
+
+    __slots__ = ('histogram', 'started')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+
+class StageTimings:
+    """Histograms keyed by label values, fed by context-manager or decorator timers
+
+        with stage_timings.stage('grocery_list'):
+            ...
+
+        @stage_timings.timed('daily_totals')
+        def calculate_weekly_total_vectors(...):
+
+    When disabled, stage() hands back a shared no-op context and timed()
+    returns the function itself, so instrumented code runs as if it were
+    not instrumented.
+    """
+
+    def __init__(self, label_names=('stage',), enabled=True, buckets=DEFAULT_BUCKETS):
+        self.label_names = tuple(label_names)
+        self.enabled = enabled
+        self.buckets = buckets
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, *labels):
+        histogram = self._histograms.get(labels)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(labels, Histogram(self.buckets))
+        return histogram
+
+    def stage(self, *labels):
+        """Context manager timing one stage"""
+        if not self.enabled:
+            return _DISABLED
+        return _Timer(self.histogram(*labels))
+
+    def timed(self, *labels):
+        """Decorator timing every call of a function"""
+        def decorate(func):
+            if not self.enabled:
+                return func
+            observe = self.histogram(*labels).observe
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    observe(time.perf_counter() - started)
+            return wrapper
+        return decorate
+
+    def observe(self, labels, seconds):
+        if self.enabled:
+            self.histogram(*labels).observe(seconds)
+
+    def snapshot(self):
+        """{label values: histogram snapshot} for the /metrics endpoint"""
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+        return {labels: histogram.snapshot() for labels, histogram in histograms}
+
+
+def metrics_enabled():
+    """Stage timing switch (STAGE_METRICS=0 turns instrumentation off)"""
+    return os.environ.get('STAGE_METRICS', '1') != '0'
+
+
+# Hot-path stages of plan generation and response building
+stage_timings = StageTimings(('stage',), enabled=metrics_enabled())
@@ -0,0 +1,191 @@
+from models.catalog import KNOWN_SEASONS
+
+# Regions offered by the chat flow; region-less templates apply to all of them
+KNOWN_REGIONS = ('south_indian', 'north_indian')
+KNOWN_DIETS = ('vegetarian', 'non_vegetarian', 'both')
+
+# Health condition codes exposed by /api/health-conditions, in bit order
+KNOWN_CONDITIONS = (
+    'diabetes', 'hypertension', 'kidney_stones', 'heart_disease',
+    'lactose_intolerance', 'gluten_intolerance', 'nut_allergy',
+    'egg_allergy', 'fish_allergy', 'shellfish_allergy', 'celiac_disease'
+)
+
+VITAMIN_PREFIX = 'vitamin_'
+MINERAL_NAMES = (
+    'calcium', 'iron', 'magnesium', 'phosphorus', 'potassium', 'sodium',
+    'zinc', 'copper', 'manganese', 'selenium', 'iodine', 'chromium'
+)
+
+
+class MealIndex:
+    """Precompiled meal candidates keyed by (region, style, season, meal_type, diet)
+
+    Meals are normalized once at load. Diet and season suitability are
+    resolved per key at build time; health-condition exclusions are stored
+    per meal as a bitmask so filtering a candidate list is a single AND.
+    """
+
+    def __init__(self, meal_templates, catalog, meal_lookup, is_suitable, get_restrictions):
+        self.catalog = catalog
+        self.meal_lookup = meal_lookup
+        self.is_suitable = is_suitable
+        self.get_restrictions = get_restrictions
+
+        self.condition_bits = {}
+        for condition in KNOWN_CONDITIONS:
+            self._condition_bit(condition)
+
+        self.meals = []
+        # id() of each indexed meal dict -> its meal id
+        self.meal_ids = {}
+        self.exclusion_masks = []
+        self.placements = {}
+        self.candidates = {}
+        self._load_templates(meal_templates)
+        self._build()
+
+    def _condition_bit(self, condition):
+        """Get (assigning if new) the bit for a health condition"""
+        if condition not in self.condition_bits:
+            self.condition_bits[condition] = 1 << len(self.condition_bits)
+        return self.condition_bits[condition]
+
+    def condition_mask(self, health_conditions):
+        """Combine health conditions into one bitmask; unknown codes exclude nothing"""
+        mask = 0
+        for condition in health_conditions or []:
+            mask |= self.condition_bits.get(condition, 0)
+        return mask
+
+    def _add_meal(self, meal, regions, styles, meal_type):
+        """Register a normalized meal under its regions, styles and meal type"""
+        meal_id = len(self.meals)
+        self.meals.append(meal)
+        self.meal_ids[id(meal)] = meal_id
+
+        mask = 0
+        for condition in self.get_restrictions(meal['name']):
+            mask |= self._condition_bit(condition)
+        for ingredient in meal.get('ingredients', {}):
+            food = self.catalog.get(ingredient)
+            if food:
+                for condition in food['avoid_in_conditions']:
+                    mask |= self._condition_bit(condition)
+        self.exclusion_masks.append(mask)
+
+        for region in regions:
+            for style in styles:
+                self.placements.setdefault((region, style, meal_type), []).append(meal_id)
+
+    def _load_templates(self, meal_templates):
+        """Normalize meals from meals.json or the legacy name-based templates"""
+        if 'meal_templates' in meal_templates:
+            for group, seasons in meal_templates['meal_templates'].items():
+                for season_group, meal_types in seasons.items():
+                    if isinstance(meal_types, list):
+                        # e.g. combination_meals/fusion_breakfast: [...]
+                        meal_types = {season_group.replace('fusion_', ''): meal_types}
+                    for meal_type, entries in meal_types.items():
+                        for entry in entries:
+                            meal = self.normalize_template_meal(entry)
+                            styles = self._styles_for(meal['food_style'])
+                            self._add_meal(meal, KNOWN_REGIONS, styles, meal_type)
+            return
+
+        for template_key, meal_types in meal_templates.items():
+            if template_key.endswith('_traditional'):
+                regions = (template_key[:-len('_traditional')],)
+                styles = ('traditional', 'both')
+            else:
+                regions = KNOWN_REGIONS
+                styles = ('modern', 'both')
+            for meal_type, meal_names in meal_types.items():
+                for meal_name in meal_names:
+                    self._add_meal(self.meal_lookup(meal_name), regions, styles, meal_type)
+
+    def _styles_for(self, food_style):
+        """Index styles a meal belongs to"""
+        if food_style in ('traditional', 'modern'):
+            return (food_style, 'both')
+        # Fusion meals suit either preference
+        return ('traditional', 'modern', 'both')
+
+    def normalize_template_meal(self, entry):
+        """Convert a meals.json entry into the engine's meal shape"""
+        nutrition = entry.get('total_nutrition', {})
+        vitamins = {}
+        minerals = {}
+        for key, amount in nutrition.items():
+            if key.startswith(VITAMIN_PREFIX):
+                vitamins[key[len(VITAMIN_PREFIX):].upper()] = amount
+            elif key == 'folate':
+                vitamins['folate'] = amount
+            elif key in MINERAL_NAMES:
+                minerals[key] = amount
+
+        season = entry.get('season', 'year_round')
+        return {
+            'name': entry['name'],
+            'calories': nutrition.get('calories', 0),
+            'macros': {
+                'protein': nutrition.get('protein', 0),
+                'carbs': nutrition.get('carbs', 0),
+                'fats': nutrition.get('fat', 0),
+                'fiber': nutrition.get('fiber', 0)
+            },
+            'vitamins': vitamins,
+            'minerals': minerals,
+            'food_style': entry.get('food_style', 'traditional'),
+            'dietary_type': entry.get('dietary_type', 'vegetarian'),
+            'seasonal_availability': [] if season == 'year_round' else [season],
+            'ingredients': entry.get('ingredients', {}),
+            'preparation_method': entry.get('preparation_method'),
+            'preparation_time': entry.get('preparation_time'),
+            'storage': entry.get('storage'),
+            'health_benefits': entry.get('health_benefits', [])
+        }
+
+    def _compile(self, region, style, season, meal_type, diet):
+        """Resolve the diet/season-suitable meal ids for one key"""
+        user_data = {'food_preference': diet, 'region': region}
+        return tuple(
+            meal_id for meal_id in self.placements.get((region, style, meal_type), ())
+            if self.is_suitable(self.meals[meal_id], user_data, season, [])
+        )
+
+    def _build(self):
+        """Precompute candidates for every known key combination"""
+        for region, style, meal_type in self.placements:
+            for season in KNOWN_SEASONS:
+                for diet in KNOWN_DIETS:
+                    key = (region, style, season, meal_type, diet)
+                    self.candidates[key] = self._compile(*key)
+
+    def get_candidate_ids(self, region, food_style, season, meal_type, food_preference, health_conditions=None):
+        """Get the ids (positions in self.meals) of suitable meals for a profile slot"""
+        key = (region, food_style, season, meal_type, food_preference)
+        meal_ids = self.candidates.get(key)
+        if meal_ids is None:
+            # Unknown values come straight from requests; don't grow the index
+            meal_ids = self._compile(*key)
+
+        mask = self.condition_mask(health_conditions)
+        if not mask:
+            return list(meal_ids)
+        return [meal_id for meal_id in meal_ids if not self.exclusion_masks[meal_id] & mask]
+
+    def meal_id(self, meal):
+        """Id of a meal dict held by the index, or None for any other meal"""
+        meal_id = self.meal_ids.get(id(meal))
+        if meal_id is None or self.meals[meal_id] is not meal:
+            return None
+        return meal_id
+
+    def get_candidates(self, region, food_style, season, meal_type, food_preference, health_conditions=None):
+        """Get suitable meals for a profile slot"""
+        return [
+            self.meals[meal_id] for meal_id in self.get_candidate_ids(
+                region, food_style, season, meal_type, food_preference, health_conditions
+            )
+        ]
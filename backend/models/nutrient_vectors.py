@@ -0,0 +1,166 @@
+import itertools
+import math
+from collections.abc import Mapping
+
+import numpy as np
+
+MACRO_KEYS = ('calories', 'protein', 'carbs', 'fats', 'fiber')
+MICRO_GROUPS = ('vitamins', 'minerals')
+
+
+class NutrientAxis:
+    """Fixed ordering of nutrients shared by every nutrient vector
+
+    Macros always come first, followed by vitamins and minerals. The axis
+    is frozen once built, so vectors built against it can be stacked and
+    summed directly, and concurrent requests only ever read it.
+    """
+
+    def __init__(self, vitamins=(), minerals=()):
+        self.keys = []
+        self.positions = {}
+        self.frozen = False
+        for name in MACRO_KEYS:
+            self.add('macros', name)
+        for name in vitamins:
+            self.add('vitamins', name)
+        for name in minerals:
+            self.add('minerals', name)
+
+    @classmethod
+    def from_catalog(cls, catalog, meals=()):
+        """Build the frozen axis from catalog columns plus any nutrients the meals use"""
+        axis = cls(catalog.nutrient_groups['vitamins'], catalog.nutrient_groups['minerals'])
+        for meal in meals:
+            for group in MICRO_GROUPS:
+                for name in meal.get(group, {}):
+                    axis.add(group, name)
+        axis.freeze()
+        return axis
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, group, name):
+        """Column of a nutrient, appending it to the axis if unseen"""
+        key = (group, name)
+        column = self.positions.get(key)
+        if column is None:
+            if self.frozen:
+                raise ValueError(f"Nutrient axis is frozen, cannot add {group}.{name}")
+            column = self.positions[key] = len(self.keys)
+            self.keys.append(key)
+        return column
+
+    def freeze(self):
+        """Stop adding nutrients; later lookups of unknown ones return None"""
+        self.keys = tuple(self.keys)
+        self.frozen = True
+
+    def position(self, group, name):
+        """Column of a nutrient, or None if it is not on the axis"""
+        return self.positions.get((group, name))
+
+    def meal_matrix(self, meals, extra=None):
+        """Stack meal dicts into a (meals x nutrients) matrix
+
+        Macros default to 0; vitamins and minerals a meal doesn't list are
+        NaN so totals can tell "absent" from "zero". Nutrients that are not
+        on the axis (e.g. in client-supplied meals) are dropped, or given
+        columns past the axis if an extra dict is passed; it is filled with
+        {(group, name): offset} for this call only.
+        """
+        rows, columns, values = [], [], []
+        for row, meal in enumerate(meals):
+            macros = meal.get('macros', {})
+            for name in MACRO_KEYS:
+                amount = meal.get('calories', 0) if name == 'calories' else macros.get(name, 0)
+                rows.append(row)
+                columns.append(self.positions[('macros', name)])
+                values.append(amount)
+            for group in MICRO_GROUPS:
+                for name, amount in meal.get(group, {}).items():
+                    column = self.positions.get((group, name))
+                    if column is None:
+                        if extra is None:
+                            continue
+                        column = len(self) + extra.setdefault((group, name), len(extra))
+                    rows.append(row)
+                    columns.append(column)
+                    values.append(amount)
+
+        matrix = np.full((len(meals), len(self) + len(extra or ())), np.nan)
+        if rows:
+            matrix[rows, columns] = values
+        return matrix
+
+    def group_totals(self, matrix, group_sizes):
+        """Sum consecutive row groups (e.g. meals per day) in one matrix product"""
+        indicator = np.zeros((len(group_sizes), matrix.shape[0]))
+        start = 0
+        for group, size in enumerate(group_sizes):
+            indicator[group, start:start + size] = 1
+            start += size
+
+        present = indicator @ ~np.isnan(matrix)
+        totals = indicator @ np.nan_to_num(matrix)
+        totals[present == 0] = np.nan
+        return totals
+
+    def to_dict(self, vector, extra=()):
+        """Convert a totals vector (with any extra columns from meal_matrix) back to the JSON totals shape"""
+        totals = {name: 0 for name in MACRO_KEYS}
+        totals.update({'vitamins': {}, 'minerals': {}})
+        for (group, name), amount in zip(itertools.chain(self.keys, extra), vector.tolist()):
+            if math.isnan(amount):
+                continue
+            if group == 'macros':
+                totals[name] = amount
+            else:
+                totals[group][name] = amount
+        return totals
+
+    def totals(self, vector):
+        """Compact, read-only totals backed by a copy of the vector"""
+        return NutrientTotals(self, np.array(vector, dtype=float))
+
+
+class NutrientTotals(Mapping):
+    """A day's totals kept as one float vector on the shared axis
+
+    Reads like the totals dict (totals['calories'], totals['vitamins'])
+    without holding a dict per nutrient; to_dict() gives the JSON shape.
+    """
+
+    __slots__ = ('axis', 'vector')
+
+    def __init__(self, axis, vector):
+        self.axis = axis
+        self.vector = vector
+
+    def __getitem__(self, key):
+        if key in MACRO_KEYS:
+            amount = float(self.vector[self.axis.positions[('macros', key)]])
+            return 0 if math.isnan(amount) else amount
+        if key in MICRO_GROUPS:
+            return self.to_dict()[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield from MACRO_KEYS
+        yield from MICRO_GROUPS
+
+    def __len__(self):
+        return len(MACRO_KEYS) + len(MICRO_GROUPS)
+
+    def __repr__(self):
+        return f"NutrientTotals({self.to_dict()!r})"
+
+    def __reduce__(self):
+        # The axis stays in its process; elsewhere the totals travel as the plain dict
+        return (dict, (self.to_dict(),))
+
+    def to_dict(self):
+        return self.axis.to_dict(self.vector)
+
+    to_json = to_dict
@@ -1,46 +1,169 @@
-import json
-import math
+import bisect
+
+import numpy as np
+
+from models.catalog import get_food_catalog
+from models.result_cache import freeze
+
+# Calorie (TDEE) and water multipliers per activity level; unknown levels use moderate
+ACTIVITY_MULTIPLIERS = {
+    'sedentary': 1.2,
+    'light': 1.375,
+    'moderate': 1.55,
+    'active': 1.725,
+    'very_active': 1.9
+}
+WATER_ACTIVITY_MULTIPLIERS = {
+    'sedentary': 1.0,
+    'light': 1.1,
+    'moderate': 1.2,
+    'active': 1.3,
+    'very_active': 1.4
+}
+
+# Daily calorie adjustment per goal and timeline (maintain is 0)
+GOAL_CALORIE_ADJUSTMENTS = {
+    'weight_loss': {'short_term': -500, 'mid_term': -350, 'long_term': -250},
+    'weight_gain': {'short_term': 500, 'mid_term': 350, 'long_term': 250}
+}
+
+# Goal-specific scaling of vitamin and mineral requirements
+VITAMIN_GOAL_FACTORS = {
+    'weight_gain': {'B1': 1.15, 'B2': 1.15, 'B3': 1.15, 'B6': 1.15, 'C': 1.2},
+    'weight_loss': {'C': 1.1, 'E': 1.1}
+}
+MINERAL_GOAL_FACTORS = {
+    'weight_gain': {'magnesium': 1.1, 'zinc': 1.15, 'phosphorus': 1.1},
+    'weight_loss': {'calcium': 1.05, 'magnesium': 1.05}
+}
+
+BMI_CATEGORIES = ((18.5, "Underweight"), (25, "Normal weight"), (30, "Overweight"))
+
+# Vitamin/mineral requirements only change at these ages, with gender and with goal
+AGE_BAND_LIMITS = (50, 70)
+AGE_BAND_STARTS = (0,) + AGE_BAND_LIMITS
+REQUIREMENT_GENDERS = ('male', 'female')
+REQUIREMENT_GOALS = ('weight_loss', 'weight_gain', 'maintain')
+
+
+def build_daily_vitamins(age, gender, goal):
+    """Calculate daily vitamin requirements"""
+    
+    vitamins = {
+        'A': 900 if gender == 'male' else 700,  
+        'B1': 1.2 if gender == 'male' else 1.1,  
+        'B2': 1.3 if gender == 'male' else 1.1,  
+        'B3': 16 if gender == 'male' else 14,   
+        'B6': 1.3 if age < 50 else (1.7 if gender == 'male' else 1.5),  
+        'B12': 2.4, 
+        'C': 90 if gender == 'male' else 75,   
+        'D': 15 if age < 70 else 20,           
+        'E': 15,     
+        'K': 120 if gender == 'male' else 90,  
+        'folate': 400,  
+        'biotin': 30,   
+        'pantothenic_acid': 5  
+    }
+    
+    for vitamin, factor in VITAMIN_GOAL_FACTORS.get(goal, {}).items():
+        vitamins[vitamin] *= factor
+    
+    return vitamins
+
+
+def build_daily_minerals(age, gender, goal):
+    """Calculate daily mineral requirements"""
+    
+    minerals = {
+        'calcium': 1000 if age < 50 else 1200, 
+        'iron': get_iron_requirement(age, gender),  
+        'magnesium': 400 if gender == 'male' else 310,   
+        'zinc': 11 if gender == 'male' else 8,           
+        'potassium': 3500,    
+        'phosphorus': 700,    
+        'sodium': 1500,       
+        'selenium': 55,       
+        'copper': 0.9,        
+        'manganese': 2.3 if gender == 'male' else 1.8,  
+        'chromium': 35 if gender == 'male' else 25,     
+        'molybdenum': 45,     
+        'iodine': 150         
+    }
+    
+    for mineral, factor in MINERAL_GOAL_FACTORS.get(goal, {}).items():
+        minerals[mineral] *= factor
+    
+    return minerals
+
+
+def get_iron_requirement(age, gender):
+    """Calculate iron requirement based on age and gender"""
+    if gender == 'male':
+        return 8  
+        if age < 50:
+            return 18  
+        else:
+            return 8   
+
+
+def requirement_key(age, gender, goal):
+    """(age band, gender, goal) key of the precomputed requirement tables"""
+    return (
+        bisect.bisect_right(AGE_BAND_LIMITS, age),
+        'male' if gender == 'male' else 'female',
+        goal if goal in REQUIREMENT_GOALS else 'maintain'
+    )
+
+
+def build_requirement_tables(builder):
+    """Frozen builder output for every (age band, gender, goal) key"""
+    return {
+        (band, gender, goal): freeze(builder(age, gender, goal))
+        for band, age in enumerate(AGE_BAND_STARTS)
+        for gender in REQUIREMENT_GENDERS
+        for goal in REQUIREMENT_GOALS
+    }
+
+
+# Built once at import and shared read-only by every summary
+VITAMIN_TABLES = build_requirement_tables(build_daily_vitamins)
+MINERAL_TABLES = build_requirement_tables(build_daily_minerals)
+NUTRITION_DENSITY_TARGETS = freeze({
+    'protein_per_1000_cal': 50,      
+    'fiber_per_1000_cal': 14,       
+    'vitamin_c_per_1000_cal': 45,   
+    'calcium_per_1000_cal': 500,     
+    'iron_per_1000_cal': 9,          
+    'folate_per_1000_cal': 200,      
+    'magnesium_per_1000_cal': 200,   
+    'potassium_per_1000_cal': 1750   
+})
+
+
+def round_half_even(values, digits=0):
+    """Element-wise round() for float arrays that agrees exactly with Python's round()
+
+    np.round scales by 10**digits before rounding, so values within float
+    error of a .5 boundary can land on the other side; those few are
+    re-rounded with round() itself.
+    """
+    values = np.asarray(values, dtype=float)
+    rounded = np.round(values, digits)
+    if digits:
+        scaled = values * 10.0 ** digits
+        suspect = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+        if len(suspect):
+            rounded[suspect] = [round(value, digits) for value in values[suspect].tolist()]
+    return rounded
 
 class NutritionCalculator:
-    def __init__(self):
+    def __init__(self, catalog=None):
         """Initialize the enhanced nutrition calculator"""
-        self.load_nutrition_data()
-    
-    def load_nutrition_data(self):
-        """Load enhanced nutrition data with vitamins and minerals"""
-        try:
-            with open('data/nutrition_data.json', 'r') as f:
-                self.nutrition_data = json.load(f)
-        except FileNotFoundError:
-        
-            self.nutrition_data = self.get_default_enhanced_nutrition_data()
+        self.load_nutrition_data(catalog)
     
-    def get_default_enhanced_nutrition_data(self):
-        """Default enhanced nutrition data with vitamins/minerals"""
-        return {
-            "rice": {
-                "dietary_type": "vegetarian",
-                "macros": {"protein": 2.7, "carbs": 28, "fats": 0.3},
-                "vitamins": {"B1": 0.07, "B3": 1.6, "folate": 8},
-                "minerals": {"iron": 0.8, "magnesium": 25, "phosphorus": 115},
-                "food_style": "traditional",
-                "seasonal_availability": ["spring", "summer", "fall", "winter"],
-                "preparation_methods": ["boiled", "steamed", "fried"],
-                "storage": "Store in airtight container in cool, dry place",
-                "serving_size": "150g cooked"
-            },
-            "dal": {
-                "dietary_type": "vegetarian",
-                "macros": {"protein": 9, "carbs": 20, "fats": 0.5},
-                "vitamins": {"B1": 0.37, "B6": 0.21, "folate": 181},
-                "minerals": {"iron": 3.3, "magnesium": 47, "potassium": 367},
-                "food_style": "traditional",
-                "seasonal_availability": ["spring", "summer", "fall", "winter"],
-                "preparation_methods": ["pressure_cooked", "boiled", "tempering"],
-                "storage": "Store dry lentils in sealed container, cooked dal refrigerate 3 days",
-                "serving_size": "100g cooked"
-            }
-        }
+    def load_nutrition_data(self, catalog=None):
+        """Attach the shared food catalog (vitamins and minerals per food)"""
+        self.catalog = catalog if catalog is not None else get_food_catalog()
     
     def calculate_bmr(self, weight, height, age, gender):
         """Calculate Basal Metabolic Rate using Mifflin-St Jeor Equation"""
@@ -58,43 +181,19 @@ class NutritionCalculator:
     
     def get_bmi_category(self, bmi):
         """Get BMI category"""
-        if bmi < 18.5:
-            return "Underweight"
-        elif bmi < 25:
-            return "Normal weight"
-        elif bmi < 30:
-            return "Overweight"
-        else:
-            return "Obese"
+        for upper_bound, category in BMI_CATEGORIES:
+            if bmi < upper_bound:
+                return category
+        return "Obese"
     
     def calculate_daily_calories(self, bmr, goal, timeline, activity_level='moderate'):
         """Calculate daily calorie needs based on goal and timeline"""
-        activity_multipliers = {
-            'sedentary': 1.2,
-            'light': 1.375,
-            'moderate': 1.55,
-            'active': 1.725,
-            'very_active': 1.9
-        }
-        
-        
-        base_calories = bmr * activity_multipliers.get(activity_level, 1.55)
+        base_calories = bmr * ACTIVITY_MULTIPLIERS.get(activity_level, 1.55)
         
-
-        if goal == 'weight_loss':
-            if timeline == 'short_term':
-                calories = base_calories - 500  
-            elif timeline == 'mid_term':
-                calories = base_calories - 350  
-            else:
-                calories = base_calories - 250  
-        elif goal == 'weight_gain':
-            if timeline == 'short_term':
-                calories = base_calories + 500  
-            elif timeline == 'mid_term':
-                calories = base_calories + 350  
-            else:
-                calories = base_calories + 250  
+        adjustments = GOAL_CALORIE_ADJUSTMENTS.get(goal)
+        if adjustments:
+            # Timelines other than short/mid term get the gentlest adjustment
+            calories = base_calories + adjustments.get(timeline, adjustments['long_term'])
         else:
             calories = base_calories  
         
@@ -129,77 +228,16 @@ class NutritionCalculator:
         }
     
     def calculate_daily_vitamins(self, age, gender, goal):
-        """Calculate daily vitamin requirements"""
-        
-        vitamins = {
-            'A': 900 if gender == 'male' else 700,  
-            'B1': 1.2 if gender == 'male' else 1.1,  
-            'B2': 1.3 if gender == 'male' else 1.1,  
-            'B3': 16 if gender == 'male' else 14,   
-            'B6': 1.3 if age < 50 else (1.7 if gender == 'male' else 1.5),  
-            'B12': 2.4, 
-            'C': 90 if gender == 'male' else 75,   
-            'D': 15 if age < 70 else 20,           
-            'E': 15,     
-            'K': 120 if gender == 'male' else 90,  
-            'folate': 400,  
-            'biotin': 30,   
-            'pantothenic_acid': 5  
-        }
-        
-       
-        if goal == 'weight_gain':
-           
-            for vitamin in ['B1', 'B2', 'B3', 'B6']:
-                vitamins[vitamin] *= 1.15
-            vitamins['C'] *= 1.2 
-        elif goal == 'weight_loss':
-            
-            vitamins['C'] *= 1.1
-            vitamins['E'] *= 1.1
-        
-        return vitamins
+        """Daily vitamin requirements (shared, read-only table)"""
+        return VITAMIN_TABLES[requirement_key(age, gender, goal)]
     
     def calculate_daily_minerals(self, age, gender, goal):
-        """Calculate daily mineral requirements"""
-        
-        minerals = {
-            'calcium': 1000 if age < 50 else 1200, 
-            'iron': self._get_iron_requirement(age, gender),  
-            'magnesium': 400 if gender == 'male' else 310,   
-            'zinc': 11 if gender == 'male' else 8,           
-            'potassium': 3500,    
-            'phosphorus': 700,    
-            'sodium': 1500,       
-            'selenium': 55,       
-            'copper': 0.9,        
-            'manganese': 2.3 if gender == 'male' else 1.8,  
-            'chromium': 35 if gender == 'male' else 25,     #
-            'molybdenum': 45,     
-            'iodine': 150         
-        }
-        
-
-        if goal == 'weight_gain':
-            
-            minerals['magnesium'] *= 1.1
-            minerals['zinc'] *= 1.15
-            minerals['phosphorus'] *= 1.1
-        elif goal == 'weight_loss':
-
-            minerals['calcium'] *= 1.05
-            minerals['magnesium'] *= 1.05
-        
-        return minerals
+        """Daily mineral requirements (shared, read-only table)"""
+        return MINERAL_TABLES[requirement_key(age, gender, goal)]
     
     def _get_iron_requirement(self, age, gender):
         """Calculate iron requirement based on age and gender"""
-        if gender == 'male':
-            return 8  
-            if age < 50:
-                return 18  
-            else:
-                return 8   
+        return get_iron_requirement(age, gender)
     
     def calculate_fiber_requirement(self, age, gender, daily_calories):
         """Calculate daily fiber requirement"""
@@ -218,16 +256,8 @@ class NutritionCalculator:
         """Calculate daily water requirement"""
         
         base_water = weight * 35  
-    
-        activity_multipliers = {
-            'sedentary': 1.0,
-            'light': 1.1,
-            'moderate': 1.2,
-            'active': 1.3,
-            'very_active': 1.4
-        }
         
-        total_water = base_water * activity_multipliers.get(activity_level, 1.2)
+        total_water = base_water * WATER_ACTIVITY_MULTIPLIERS.get(activity_level, 1.2)
         return round(total_water / 1000, 1) 
     
     def get_nutrition_summary(self, weight, height, age, gender, goal, timeline):
@@ -274,18 +304,21 @@ class NutritionCalculator:
         
         return enhanced_summary
     
-    def get_nutrition_density_targets(self):
-        """Get nutrition density targets per 1000 calories"""
-        return {
-            'protein_per_1000_cal': 50,      
-            'fiber_per_1000_cal': 14,       
-            'vitamin_c_per_1000_cal': 45,   
-            'calcium_per_1000_cal': 500,     
-            'iron_per_1000_cal': 9,          
-            'folate_per_1000_cal': 200,      
-            'magnesium_per_1000_cal': 200,   
-            'potassium_per_1000_cal': 1750   
+    def get_enhanced_nutrition_summaries(self, profiles):
+        """Get enhanced nutrition summaries for many profiles, vectorized across the batch"""
+        if not profiles:
+            return []
+        
+        columns = {
+            name: [profile[name] for profile in profiles]
+            for name in ('weight', 'height', 'age', 'gender', 'goal')
         }
+        columns['timeline'] = [profile.get('timeline', 'short_term') for profile in profiles]
+        return CohortNutritionCalculator(self).summaries(columns)
+    
+    def get_nutrition_density_targets(self):
+        """Get nutrition density targets per 1000 calories (shared, read-only)"""
+        return NUTRITION_DENSITY_TARGETS
     
     def calculate_health_metrics(self, weight, height, age, gender):
         """Calculate additional health metrics"""
@@ -328,45 +361,34 @@ class NutritionCalculator:
     
     def analyze_meal_nutrition(self, meal_items):
         """Analyze nutrition content of a meal"""
-        total_nutrition = {
-            'calories': 0,
-            'protein': 0,
-            'carbs': 0,
-            'fats': 0,
-            'vitamins': {},
-            'minerals': {},
-            'fiber': 0
-        }
-        
-        for item_name, quantity in meal_items.items():
-            if item_name in self.nutrition_data:
-                item_data = self.nutrition_data[item_name]
-                
-                
-                scale_factor = quantity / 100
-                
+        return self.analyze_meals_nutrition([meal_items])[0]
     
-                total_nutrition['calories'] += item_data['macros'].get('protein', 0) * 4 * scale_factor
-                total_nutrition['calories'] += item_data['macros'].get('carbs', 0) * 4 * scale_factor
-                total_nutrition['calories'] += item_data['macros'].get('fats', 0) * 9 * scale_factor
-                
-                total_nutrition['protein'] += item_data['macros'].get('protein', 0) * scale_factor
-                total_nutrition['carbs'] += item_data['macros'].get('carbs', 0) * scale_factor
-                total_nutrition['fats'] += item_data['macros'].get('fats', 0) * scale_factor
-                
-            
-                for vitamin, amount in item_data.get('vitamins', {}).items():
-                    if vitamin not in total_nutrition['vitamins']:
-                        total_nutrition['vitamins'][vitamin] = 0
-                    total_nutrition['vitamins'][vitamin] += amount * scale_factor
-                
+    def analyze_meals_nutrition(self, meals):
+        """Analyze many meals ({food_id: grams}) with one matrix product"""
+        totals = self.analyze_meals_matrix(meals)
+        return [self.nutrient_vector_to_dict(vector) for vector in totals]
+    
+    def analyze_meals_matrix(self, meals):
+        """Per-meal nutrient totals as a (meals x nutrients) array on the catalog axis"""
+        return self.catalog.quantity_matrix(meals) @ self.catalog.nutrient_matrix()
     
-                for mineral, amount in item_data.get('minerals', {}).items():
-                    if mineral not in total_nutrition['minerals']:
-                        total_nutrition['minerals'][mineral] = 0
-                    total_nutrition['minerals'][mineral] += amount * scale_factor
+    def nutrient_vector_to_dict(self, vector):
+        """Convert a catalog-axis nutrient vector to the meal nutrition dict"""
+        values = dict(zip(self.catalog.nutrient_names, vector.tolist()))
+        groups = self.catalog.nutrient_groups
+        protein = values.get('protein', 0)
+        carbs = values.get('carbs', 0)
+        fats = values.get('fats', 0)
         
-        return total_nutrition
+        return {
+            'calories': protein * 4 + carbs * 4 + fats * 9,
+            'protein': protein,
+            'carbs': carbs,
+            'fats': fats,
+            'vitamins': {name: values[name] for name in groups['vitamins']},
+            'minerals': {name: values[name] for name in groups['minerals']},
+            'fiber': values.get('fiber', 0)
+        }
     
     def get_nutritional_adequacy_score(self, actual_nutrition, target_nutrition):
         """Calculate how well actual nutrition meets targets"""
@@ -392,4 +414,215 @@ class NutritionCalculator:
         all_scores = list(scores.values())
         scores['overall_adequacy'] = sum(all_scores) / len(all_scores) if all_scores else 0
         
-        return scores
\ No newline at end of file
+        return scores
+
+
+def requirement_matrix(tables):
+    """Requirement tables as (names, keys x nutrients array); missing values are NaN"""
+    rows = list(tables.values())
+    names = list(rows[0])
+    matrix = np.array([[np.nan if row[name] is None else row[name] for name in names] for row in rows])
+    return names, matrix
+
+
+class CohortNutritionCalculator:
+    """Nutrition summaries for whole cohorts at once, as columnar arrays
+
+    Takes columns (a dict of sequences/arrays or a pandas DataFrame) named
+    weight, height, age, gender, goal and optionally timeline (default
+    short_term) and activity_level (default moderate). Every summary field
+    is computed for all rows with array masks and agrees exactly with the
+    scalar NutritionCalculator methods.
+    """
+
+    def __init__(self, calculator=None):
+        self.calculator = calculator if calculator is not None else NutritionCalculator()
+        self.vitamin_names, self.vitamin_matrix = requirement_matrix(VITAMIN_TABLES)
+        self.mineral_names, self.mineral_matrix = requirement_matrix(MINERAL_TABLES)
+
+    @staticmethod
+    def _numeric(columns, name):
+        return np.asarray(columns[name], dtype=float)
+
+    @staticmethod
+    def _labels(columns, name, size, default=None):
+        if default is not None and name not in columns:
+            return np.full(size, default)
+        return np.asarray(columns[name]).astype(str)
+
+    @staticmethod
+    def _lookup(labels, table, default):
+        """Map a label array through a dict with one mask per table entry"""
+        values = np.full(len(labels), default, dtype=float)
+        for label, value in table.items():
+            values[labels == label] = value
+        return values
+
+    @staticmethod
+    def requirement_index(age, is_male, goal):
+        """Row of each profile in the requirement matrices (build_requirement_tables order)"""
+        band = np.searchsorted(AGE_BAND_LIMITS, age, side='right')
+        goal_index = CohortNutritionCalculator._lookup(
+            goal, {name: index for index, name in enumerate(REQUIREMENT_GOALS)},
+            REQUIREMENT_GOALS.index('maintain')
+        ).astype(int)
+        return (band * len(REQUIREMENT_GENDERS) + np.where(is_male, 0, 1)) * len(REQUIREMENT_GOALS) + goal_index
+
+    def calculate(self, columns):
+        """Every summary field as an array (dicts of arrays for nested groups)"""
+        weight = self._numeric(columns, 'weight')
+        height = self._numeric(columns, 'height')
+        age = self._numeric(columns, 'age')
+        size = len(weight)
+        gender = self._labels(columns, 'gender', size)
+        goal = self._labels(columns, 'goal', size)
+        timeline = self._labels(columns, 'timeline', size, 'short_term')
+        activity_level = self._labels(columns, 'activity_level', size, 'moderate')
+
+        # calculate_bmr compares gender case-insensitively, everything else exactly
+        is_male = gender == 'male'
+        is_male_bmr = is_male.copy()
+        other = np.flatnonzero(~is_male & (gender != 'female'))
+        if len(other):
+            is_male_bmr[other] = np.char.lower(gender[other]) == 'male'
+
+        base_bmr = 10 * weight + 6.25 * height - 5 * age
+        bmr = np.rint(np.where(is_male_bmr, base_bmr + 5, base_bmr - 161))
+
+        height_m = height / 100
+        bmi = round_half_even(weight / (height_m ** 2), 1)
+        bmi_category = np.select(
+            [bmi < upper_bound for upper_bound, _ in BMI_CATEGORIES],
+            [category for _, category in BMI_CATEGORIES],
+            "Obese"
+        )
+
+        adjustment = np.zeros(size)
+        for goal_name, adjustments in GOAL_CALORIE_ADJUSTMENTS.items():
+            goal_adjustment = np.where(
+                timeline == 'short_term', adjustments['short_term'],
+                np.where(timeline == 'mid_term', adjustments['mid_term'], adjustments['long_term'])
+            )
+            adjustment = np.where(goal == goal_name, goal_adjustment, adjustment)
+        daily_calories = np.rint(bmr * self._lookup(activity_level, ACTIVITY_MULTIPLIERS, 1.55) + adjustment)
+
+        loss = goal == 'weight_loss'
+        gain = goal == 'weight_gain'
+        protein_percent = np.where(loss, 0.30, 0.25)
+        fat_percent = np.where(gain, 0.30, 0.25)
+        carb_percent = np.where(loss | gain, 0.45, 0.50)
+        macronutrients = {
+            'protein': np.rint((daily_calories * protein_percent) / 4),
+            'carbs': np.rint((daily_calories * carb_percent) / 4),
+            'fat': np.rint((daily_calories * fat_percent) / 9)
+        }
+
+        under_50 = age < 50
+        requirement_rows = self.requirement_index(age, is_male, goal)
+        vitamins = dict(zip(self.vitamin_names, self.vitamin_matrix[requirement_rows].T))
+        minerals = dict(zip(self.mineral_names, self.mineral_matrix[requirement_rows].T))
+
+        fiber = np.where(is_male, np.where(under_50, 38, 30), np.where(under_50, 25, 21))
+        water = round_half_even(
+            weight * 35 * self._lookup(activity_level, WATER_ACTIVITY_MULTIPLIERS, 1.2) / 1000, 1
+        )
+
+        ideal_weight_min = round_half_even(18.5 * (height_m ** 2), 1)
+        ideal_weight_max = round_half_even(24.9 * (height_m ** 2), 1)
+        body_fat = round_half_even((1.20 * bmi) + (0.23 * age) - np.where(is_male, 16.2, 5.4), 1)
+
+        return {
+            'bmi': bmi,
+            'bmi_category': bmi_category,
+            'bmr': bmr,
+            'daily_calories': daily_calories,
+            'macronutrients': macronutrients,
+            'vitamins': vitamins,
+            'minerals': minerals,
+            'fiber_requirement': fiber,
+            'water_requirement': water,
+            'health_metrics': {
+                'ideal_weight_min': ideal_weight_min,
+                'ideal_weight_max': ideal_weight_max,
+                # -1 below the ideal range, 1 above it, 0 within
+                'weight_position': np.where(weight < ideal_weight_min, -1, np.where(weight > ideal_weight_max, 1, 0)),
+                # Distance (kg) outside the ideal range, negative below it
+                'weight_deviation': np.where(
+                    weight < ideal_weight_min, round_half_even(weight - ideal_weight_min, 1),
+                    np.where(weight > ideal_weight_max, round_half_even(weight - ideal_weight_max, 1), 0.0)
+                ),
+                'body_fat_estimate': np.clip(body_fat, 5, 50)
+            },
+            'metabolic_info': {
+                'bmr_per_kg': round_half_even(bmr / weight, 1),
+                'calories_per_kg': round_half_even(daily_calories / weight, 1),
+                'protein_per_kg': round_half_even(macronutrients['protein'] / weight, 2)
+            }
+        }
+
+    def summaries(self, columns):
+        """Per-row summary dicts, identical to get_enhanced_nutrition_summary"""
+        cohort = self.calculate(columns)
+        weight = self._numeric(columns, 'weight')
+        age = self._numeric(columns, 'age')
+        gender = self._labels(columns, 'gender', len(weight))
+        goal = self._labels(columns, 'goal', len(weight))
+        calculator = self.calculator
+        # Rows share the frozen requirement tables instead of rebuilding them
+        requirement_keys = list(VITAMIN_TABLES)
+        requirement_rows = [
+            requirement_keys[index] for index in self.requirement_index(age, gender == 'male', goal).tolist()
+        ]
+
+        health = cohort['health_metrics']
+        metabolic = cohort['metabolic_info']
+        macros = cohort['macronutrients']
+        rows = zip(
+            weight.tolist(), age.tolist(), gender.tolist(),
+            cohort['bmi'].tolist(), cohort['bmi_category'].tolist(), cohort['bmr'].tolist(),
+            cohort['daily_calories'].tolist(),
+            macros['protein'].tolist(), macros['carbs'].tolist(), macros['fat'].tolist(),
+            requirement_rows,
+            cohort['fiber_requirement'].tolist(), cohort['water_requirement'].tolist(),
+            health['ideal_weight_min'].tolist(), health['ideal_weight_max'].tolist(),
+            health['weight_position'].tolist(), health['weight_deviation'].tolist(),
+            health['body_fat_estimate'].tolist(),
+            metabolic['bmr_per_kg'].tolist(), metabolic['calories_per_kg'].tolist(),
+            metabolic['protein_per_kg'].tolist()
+        )
+
+        summaries = []
+        for (row_weight, row_age, row_gender, bmi, bmi_category, bmr, calories, protein, carbs, fat,
+             requirement, fiber, water, ideal_min, ideal_max, position, deviation, body_fat,
+             bmr_per_kg, calories_per_kg, protein_per_kg) in rows:
+            if position < 0:
+                weight_status = f"Below ideal range by {-deviation} kg"
+            elif position > 0:
+                weight_status = f"Above ideal range by {deviation} kg"
+            else:
+                weight_status = "Within ideal range"
+            summaries.append({
+                'bmi': bmi,
+                'bmi_category': bmi_category,
+                'bmr': int(bmr),
+                'daily_calories': int(calories),
+                'macronutrients': {'protein': int(protein), 'carbs': int(carbs), 'fat': int(fat)},
+                'vitamins': VITAMIN_TABLES[requirement],
+                'minerals': MINERAL_TABLES[requirement],
+                'fiber_requirement': int(fiber),
+                'water_requirement': water,
+                'nutrition_density_targets': NUTRITION_DENSITY_TARGETS,
+                'health_metrics': {
+                    'ideal_weight_range': f"{ideal_min}-{ideal_max} kg",
+                    'weight_status': weight_status,
+                    # max(5, min(50, x)) keeps the int bound when clipped
+                    'body_fat_estimate': f"{int(body_fat) if body_fat in (5, 50) else body_fat}%",
+                    'muscle_mass_importance': calculator.get_muscle_mass_guidance(row_age, row_gender)
+                },
+                'metabolic_info': {
+                    'bmr_per_kg': bmr_per_kg,
+                    'calories_per_kg': calories_per_kg,
+                    'protein_per_kg': protein_per_kg
+                }
+            })
+        return summaries
@@ -0,0 +1,159 @@
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from models.catalog import FoodCatalog, get_food_catalog
+from models.diet_engine import DietEngine
+from models.instrumentation import stage_timings
+from models.plan_model import WeeklyPlan
+
+# Engine owned by each pool worker, created once by the initializer
+_worker_engine = None
+
+
+def _init_worker(data=None):
+    """Preload the catalog and meal index in a pool worker
+
+    data is (catalog, meal_templates) when the pool serves a specific catalog
+    version, the catalog being a FoodCatalog (a compiled one stays mapped,
+    not copied, in forked workers) or raw nutrition data; otherwise the
+    bundled data files are loaded.
+    """
+    global _worker_engine
+    if data is None:
+        get_food_catalog()
+        _worker_engine = DietEngine()
+    else:
+        catalog, meal_templates = data
+        if not isinstance(catalog, FoodCatalog):
+            catalog = FoodCatalog(catalog)
+        _worker_engine = DietEngine(catalog, meal_templates)
+
+
+def _generate_day(job):
+    """Pool task: one day of one plan"""
+    day, user_data, nutrition_summary, options, seed = job
+    return _worker_engine.generate_enhanced_day_plan(
+        day, user_data, nutrition_summary, seed=seed, **options
+    )
+
+
+def _generate_week(job):
+    """Pool task: a full weekly plan"""
+    user_data, nutrition_summary, options, seed = job
+    return _worker_engine.generate_enhanced_weekly_plan(
+        user_data, nutrition_summary, seed=seed, **options
+    )
+
+
+def plan_options(data):
+    """Plan generation options taken from a profile/request body"""
+    options = {
+        'health_conditions': data.get('health_conditions', []),
+        'cost_preference': data.get('cost_preference', 'medium'),
+        'food_style': data.get('food_style', 'both'),
+        'current_season': data.get('current_season', 'spring')
+    }
+    if data.get('solver', 'greedy') != 'greedy':
+        options['solver'] = data['solver']
+        options['time_budget_ms'] = data.get('time_budget_ms')
+    return options
+
+
+class PlanExecutor:
+    """Fans plan generation out over a process pool
+
+    Every plan is driven by its own seed (and every day by an RNG derived
+    from it), so a profile and seed give the same plan whether it is built
+    serially, day-parallel or profile-parallel. With max_workers <= 1 work
+    runs in-process on the given engine.
+    """
+
+    def __init__(self, engine, max_workers=0, worker_data=None):
+        self.engine = engine
+        self.max_workers = max_workers
+        # (catalog, meal_templates) the workers build their engine from
+        self.worker_data = worker_data
+        self._pool = None
+
+    @property
+    def parallel(self):
+        return self.max_workers > 1
+
+    def _get_pool(self):
+        """Start the worker pool on first use"""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers, initializer=_init_worker, initargs=(self.worker_data,)
+            )
+        return self._pool
+
+    @stage_timings.timed('plan_generation')
+    def generate_weekly_plan(self, user_data, nutrition_summary, seed, **options):
+        """Generate one weekly plan, one day per worker"""
+        if not self.parallel:
+            return self.engine.generate_enhanced_weekly_plan(
+                user_data, nutrition_summary, seed=seed, **options
+            )
+        if options.get('solver', 'greedy') != 'greedy':
+            # The solver balances the whole week at once, so it runs as one task
+            job = (user_data, nutrition_summary, options, seed)
+            return self._get_pool().submit(_generate_week, job).result()
+
+        days = self.engine.DAYS
+        jobs = [(day, user_data, nutrition_summary, options, seed) for day in days]
+        weekly_plan = WeeklyPlan(zip(days, self._get_pool().map(_generate_day, jobs)))
+        return self.engine.assign_daily_totals(weekly_plan)
+
+    def iter_weekly_plan(self, user_data, nutrition_summary, seed, **options):
+        """Yield (day, day_plan) for one weekly plan as each day is ready, in order"""
+        days = self.engine.DAYS
+        if options.get('solver', 'greedy') != 'greedy':
+            # Solver plans are balanced across the week, so they only exist whole
+            weekly_plan = self.generate_weekly_plan(user_data, nutrition_summary, seed, **options)
+            yield from weekly_plan.items()
+            return
+
+        if self.parallel:
+            jobs = [(day, user_data, nutrition_summary, options, seed) for day in days]
+            day_plans = self._get_pool().map(_generate_day, jobs)
+        else:
+            day_plans = (
+                self.engine.generate_enhanced_day_plan(day, user_data, nutrition_summary, seed=seed, **options)
+                for day in days
+            )
+        for day, day_plan in zip(days, day_plans):
+            self.engine.assign_daily_totals({day: day_plan})
+            yield day, day_plan
+
+    def submit_weekly_plans(self, jobs):
+        """Start weekly plans for (user_data, nutrition_summary, options, seed) jobs
+
+        Returns one zero-argument callable per job, in order, that gives its
+        plan. A failing job raises only from its own callable, so one bad
+        profile doesn't affect the rest. Pool jobs are all submitted at once;
+        in-process jobs run when their callable is called.
+        """
+        if not self.parallel:
+            return [
+                functools.partial(
+                    self.engine.generate_enhanced_weekly_plan, user_data, nutrition_summary, seed=seed, **options
+                )
+                for user_data, nutrition_summary, options, seed in jobs
+            ]
+        pool = self._get_pool()
+        return [pool.submit(_generate_week, job).result for job in jobs]
+
+    def shutdown(self):
+        """Stop the worker pool"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+def get_default_workers():
+    """Worker count from PLAN_WORKERS (0 = generate in-process)"""
+    try:
+        return int(os.environ.get('PLAN_WORKERS', '0'))
+    except ValueError:
+        return 0
@@ -0,0 +1,266 @@
+import json
+from collections.abc import Mapping, MutableMapping
+
+from models.nutrient_vectors import NutrientTotals
+from models.result_cache import FrozenDict, LRUCache, freeze
+
+PLAN_DAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+PLAN_SLOTS = ('breakfast', 'lunch', 'snacks', 'dinner', 'totals')
+
+# Meal fields in their JSON order; a meal only serializes the fields it has
+MEAL_FIELDS = (
+    'name', 'calories', 'macros', 'vitamins', 'minerals', 'food_style', 'dietary_type',
+    'seasonal_suitability', 'preparation_method', 'storage_guidelines', 'serving_size',
+    'prep_time', 'difficulty_level', 'cost_category', 'health_benefits', 'ingredients',
+    'nutritional_highlights', 'portion'
+)
+SEQUENCE_FIELDS = frozenset(('health_benefits', 'ingredients', 'nutritional_highlights'))
+NUTRIENT_FIELDS = frozenset(('macros', 'vitamins', 'minerals'))
+
+# Distinct meals kept for sharing; least recently planned ones are dropped first
+MAX_SHARED_MEALS = 16384
+
+
+def freeze_field(name, value):
+    """Read-only storage for one meal field"""
+    if name in SEQUENCE_FIELDS:
+        return tuple(value)
+    if name in NUTRIENT_FIELDS:
+        return freeze(value)
+    return value
+
+
+class Meal(Mapping):
+    """One planned meal; read-only and shared by every plan that contains it
+
+    Reads like the meal dict it replaces (meal['name'], meal.get(...)).
+    Constructing a meal equal to one already planned returns that instance
+    from shared_meals, so a popular meal costs one object per process rather
+    than one per plan. to_dict() gives the JSON shape.
+    """
+
+    __slots__ = MEAL_FIELDS + ('_json',)
+
+    def __new__(cls, **fields):
+        # The JSON text is an exact equality key (1, 1.0 and True stay distinct) and cheap to build
+        key = json.dumps(fields)
+        meal = shared_meals.get(key)
+        if meal is None:
+            meal = object.__new__(cls)
+            for name, value in fields.items():
+                object.__setattr__(meal, name, freeze_field(name, value))
+            shared_meals.put(key, meal)
+        return meal
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{name: data[name] for name in MEAL_FIELDS if name in data})
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Meals are shared and read-only')
+
+    __delattr__ = __setattr__
+
+    def __getitem__(self, key):
+        if key in MEAL_FIELDS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                pass
+        raise KeyError(key)
+
+    def __iter__(self):
+        for name in MEAL_FIELDS:
+            if hasattr(self, name):
+                yield name
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"Meal({self.get('name')!r})"
+
+    def __reduce__(self):
+        # Unpickling (e.g. a plan returned by a pool worker) goes through the shared pool again
+        return (Meal.from_dict, (dict(self),))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def to_dict(self):
+        meal = {}
+        for name in self:
+            value = getattr(self, name)
+            if name in SEQUENCE_FIELDS:
+                value = list(value)
+            elif name in NUTRIENT_FIELDS:
+                value = dict(value)
+            meal[name] = value
+        return meal
+
+    def to_json(self):
+        """Read-only JSON view sharing the meal's values; built once per meal"""
+        try:
+            return self._json
+        except AttributeError:
+            view = FrozenDict((name, getattr(self, name)) for name in self)
+            object.__setattr__(self, '_json', view)
+            return view
+
+
+shared_meals = LRUCache(MAX_SHARED_MEALS)
+
+
+class DayPlan(MutableMapping):
+    """One day's meals plus its totals, keyed like the day dict it replaces"""
+
+    __slots__ = PLAN_SLOTS
+
+    def __init__(self, meals=()):
+        for slot, meal in dict(meals).items():
+            self[slot] = meal
+
+    def __getitem__(self, key):
+        if key in PLAN_SLOTS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                pass
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key not in PLAN_SLOTS:
+            raise KeyError(f"Unknown plan slot: {key}")
+        setattr(self, key, value)
+
+    def __delitem__(self, key):
+        if key not in PLAN_SLOTS or not hasattr(self, key):
+            raise KeyError(key)
+        delattr(self, key)
+
+    def __iter__(self):
+        for slot in PLAN_SLOTS:
+            if hasattr(self, slot):
+                yield slot
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"DayPlan({dict(self)!r})"
+
+    def __reduce__(self):
+        return (DayPlan, (dict(self),))
+
+    def to_dict(self):
+        return {slot: to_plain(value) for slot, value in self.items()}
+
+    def to_json(self):
+        return {slot: getattr(self, slot) for slot in self}
+
+
+class WeeklyPlan(MutableMapping):
+    """Day plans of one week, in calendar order
+
+    complete is False when a time budget cut generation short, in which case
+    the plan may not be reproducible from its seed.
+    """
+
+    __slots__ = ('days', 'complete')
+
+    def __init__(self, days=(), complete=True):
+        self.days = [None] * len(PLAN_DAYS)
+        self.complete = complete
+        for day, day_plan in dict(days).items():
+            self[day] = day_plan
+
+    def _index(self, day):
+        try:
+            return PLAN_DAYS.index(day)
+        except ValueError:
+            raise KeyError(day)
+
+    def __getitem__(self, day):
+        day_plan = self.days[self._index(day)]
+        if day_plan is None:
+            raise KeyError(day)
+        return day_plan
+
+    def __setitem__(self, day, day_plan):
+        self.days[self._index(day)] = day_plan
+
+    def __delitem__(self, day):
+        self[day]
+        self.days[self._index(day)] = None
+
+    def __iter__(self):
+        for day, day_plan in zip(PLAN_DAYS, self.days):
+            if day_plan is not None:
+                yield day
+
+    def __len__(self):
+        return sum(1 for day_plan in self.days if day_plan is not None)
+
+    def __repr__(self):
+        return f"WeeklyPlan({list(self)!r})"
+
+    def __reduce__(self):
+        return (WeeklyPlan, (dict(self), self.complete))
+
+    def to_dict(self):
+        return {day: to_plain(day_plan) for day, day_plan in self.items()}
+
+    def to_json(self):
+        return {day: day_plan for day, day_plan in zip(PLAN_DAYS, self.days) if day_plan is not None}
+
+
+PLAN_TYPES = (Meal, DayPlan, WeeklyPlan, NutrientTotals)
+
+
+def to_plain(value):
+    """JSON shape of a plan object; other values are returned unchanged"""
+    return value.to_dict() if isinstance(value, PLAN_TYPES) else value
+
+
+def plan_json_default(value):
+    """`default` hook for json.dumps: serialize plan objects to their JSON shape"""
+    if isinstance(value, PLAN_TYPES):
+        return value.to_json()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def to_columnar(weekly_plan):
+    """Columnar JSON shape of a weekly plan: every distinct meal is listed once
+
+    meal_ids[d][s] indexes `meals` for day days[d] and slot slots[s] (None
+    for an empty slot); totals[d] is that day's totals. Interned meals are
+    matched by identity, plain meal dicts by content.
+    """
+    slots = PLAN_SLOTS[:-1]
+    meals, positions = [], {}
+    days, meal_ids, totals = [], [], []
+    for day, day_plan in weekly_plan.items():
+        row = []
+        for slot in slots:
+            meal = day_plan.get(slot)
+            if meal is None:
+                row.append(None)
+                continue
+            key = id(meal) if isinstance(meal, Meal) else json.dumps(meal, sort_keys=True, default=str)
+            if key not in positions:
+                positions[key] = len(meals)
+                meals.append(meal)
+            row.append(positions[key])
+        days.append(day)
+        meal_ids.append(row)
+        totals.append(day_plan.get('totals'))
+    return {
+        'days': days,
+        'slots': list(slots),
+        'meals': meals,
+        'meal_ids': meal_ids,
+        'totals': totals
+    }
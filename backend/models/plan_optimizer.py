@@ -0,0 +1,281 @@
+import time
+
+import numpy as np
+
+from models.instrumentation import stage_timings
+
+# Safety cap on one solve; the search normally finishes well within it
+DEFAULT_TIME_BUDGET_MS = 500
+DEFAULT_PORTIONS = (0.75, 1.0, 1.25, 1.5)
+
+# Relative weights of the objective terms
+OBJECTIVE_WEIGHTS = {
+    'calories': 4.0,        # squared relative deviation, per day
+    'protein': 1.0,
+    'carbs': 1.0,
+    'fats': 1.0,
+    'fiber': 0.5,           # shortfall only, per day
+    'micronutrients': 2.0,  # weekly shortfall, shared across targeted vitamins/minerals
+    'cost': 0.05,           # per meal, scaled by cost-preference mismatch
+    'repeat': 0.25          # per serving of a meal beyond max_repeats in the week
+}
+
+# Daily targets from the nutrition summary, keyed by their nutrient-axis macro name
+MACRO_TARGETS = (('protein', 'protein'), ('carbs', 'carbs'), ('fats', 'fat'))
+
+
+def scale_meal(meal, portion):
+    """Copy of a meal with its nutrients scaled to a portion multiplier"""
+    if portion == 1:
+        return meal
+    scaled = dict(meal)
+    scaled['calories'] = round(meal['calories'] * portion, 1)
+    for group in ('macros', 'vitamins', 'minerals'):
+        scaled[group] = {name: round(amount * portion, 2) for name, amount in meal.get(group, {}).items()}
+    return scaled
+
+
+class WeeklyPlanOptimizer:
+    """Picks and portions all meals of a week together by local search
+
+    Each slot (day x meal type) chooses a (meal, portion) option. The
+    objective is the deviation of each day's calories and macros from the
+    summary targets, the weekly vitamin and mineral shortfall, a cost
+    preference penalty and a penalty for repeating meals too often.
+
+    Search is steepest descent one slot at a time: every option of a slot is
+    scored in a single vectorized step against incrementally maintained day
+    and week totals. At a local optimum a few slots are perturbed and the
+    descent restarts, max_restarts times; the best plan found wins. The
+    amount of search is fixed, so a given seed always gives the same plan;
+    the time budget is only a safety cap, and solve() reports when it
+    stopped the search early.
+    """
+
+    def __init__(self, engine, portions=DEFAULT_PORTIONS, weights=None, max_repeats=2,
+                 max_restarts=8, perturb_slots=3):
+        self.engine = engine
+        self.axis = engine.nutrient_axis
+        self.portions = np.array(portions, dtype=float)
+        self.weights = dict(OBJECTIVE_WEIGHTS, **(weights or {}))
+        self.max_repeats = max_repeats
+        self.max_restarts = max_restarts
+        self.perturb_slots = perturb_slots
+        # One nutrient row per indexed meal; absent micronutrients count as 0
+        self.meal_vectors = np.nan_to_num(self.axis.meal_matrix(engine.meal_index.meals))
+
+    def build_targets(self, nutrition_summary):
+        """Objective columns, targets and weights for daily and weekly terms"""
+        macros = nutrition_summary['macronutrients']
+        day_columns = [self.axis.position('macros', 'calories')]
+        day_targets = [nutrition_summary['daily_calories']]
+        day_weights = [self.weights['calories']]
+        for axis_name, summary_name in MACRO_TARGETS:
+            day_columns.append(self.axis.position('macros', axis_name))
+            day_targets.append(macros[summary_name])
+            day_weights.append(self.weights[axis_name])
+
+        # Only micronutrients some meal can supply are worth optimizing
+        week_columns, week_targets = [], []
+        for group in ('vitamins', 'minerals'):
+            for name, amount in nutrition_summary.get(group, {}).items():
+                column = self.axis.positions.get((group, name))
+                if column is not None and amount:
+                    week_columns.append(column)
+                    week_targets.append(amount * len(self.engine.DAYS))
+
+        return {
+            'day_columns': np.array(day_columns),
+            'day_targets': np.array(day_targets, dtype=float),
+            'day_weights': np.array(day_weights),
+            'fiber_column': self.axis.position('macros', 'fiber'),
+            'fiber_target': float(nutrition_summary.get('fiber_requirement') or 0),
+            'week_columns': np.array(week_columns, dtype=int),
+            'week_targets': np.array(week_targets, dtype=float),
+            'week_weight': self.weights['micronutrients'] / max(1, len(week_columns))
+        }
+
+    def day_cost(self, totals, targets):
+        """Daily objective term for one or many day-total vectors"""
+        deviation = (totals[..., targets['day_columns']] - targets['day_targets']) / targets['day_targets']
+        cost = (deviation ** 2) @ targets['day_weights']
+        if targets['fiber_target']:
+            shortfall = np.maximum(0, 1 - totals[..., targets['fiber_column']] / targets['fiber_target'])
+            cost = cost + self.weights['fiber'] * shortfall ** 2
+        return cost
+
+    def week_cost(self, totals, targets):
+        """Weekly micronutrient shortfall for one or many week-total vectors"""
+        if not len(targets['week_columns']):
+            return np.zeros(totals.shape[:-1]) if totals.ndim > 1 else 0.0
+        shortfall = np.maximum(0, 1 - totals[..., targets['week_columns']] / targets['week_targets'])
+        return targets['week_weight'] * (shortfall ** 2).sum(axis=-1)
+
+    def build_slot_options(self, meal_type, user_data, food_style, current_season,
+                           health_conditions, cost_preference):
+        """Every (meal, portion) option for a meal type, as parallel arrays"""
+        meal_ids = self.engine.meal_index.get_candidate_ids(
+            user_data['region'], food_style, current_season,
+            meal_type, user_data['food_preference'], health_conditions
+        )
+        if not meal_ids:
+            return None
+
+        meal_ids = np.array(meal_ids)
+        portion_count = len(self.portions)
+        meals = self.engine.meal_index.meals
+        cost_penalty = np.array([
+            1 - self.engine.get_cost_preference_score(
+                self.engine.estimate_meal_cost(meals[meal_id]['name']), cost_preference
+            ) / 100
+            for meal_id in meal_ids
+        ]) * self.weights['cost']
+        vectors = self.meal_vectors[meal_ids][:, None, :] * self.portions[None, :, None]
+        return {
+            'meal_ids': np.repeat(meal_ids, portion_count),
+            'portions': np.tile(self.portions, len(meal_ids)),
+            'vectors': vectors.reshape(len(meal_ids) * portion_count, -1),
+            'cost_penalty': np.repeat(cost_penalty, portion_count),
+            'default': int(np.flatnonzero(self.portions == 1)[0]) if 1 in self.portions else 0
+        }
+
+    @stage_timings.timed('plan_solver')
+    def solve(self, user_data, nutrition_summary, health_conditions=(), cost_preference='medium',
+              food_style='both', current_season='spring', rng=None, time_budget_ms=None):
+        """Choose a (meal, portion) per slot
+
+        Returns ({day: {meal_type: (meal, portion) or None}}, complete); None
+        marks slots without any suitable meal, and complete is False if the
+        time budget ran out before the search finished.
+        """
+        started = time.perf_counter()
+        budget = (DEFAULT_TIME_BUDGET_MS if time_budget_ms is None else time_budget_ms) / 1000
+        deadline = started + budget
+
+        days = self.engine.DAYS
+        meal_types = list(self.engine.MEAL_CALORIE_SHARES)
+        targets = self.build_targets(nutrition_summary)
+        options = {
+            meal_type: self.build_slot_options(
+                meal_type, user_data, food_style, current_season, health_conditions, cost_preference
+            )
+            for meal_type in meal_types
+        }
+
+        # Slots with no candidates get the engine's fallback meal, a fixed contribution
+        fixed_totals = np.zeros((len(days), self.meal_vectors.shape[1]))
+        for meal_type, slot_options in options.items():
+            if slot_options is None:
+                share = self.engine.MEAL_CALORIE_SHARES[meal_type]
+                fallback = self.engine.create_fallback_meal(
+                    meal_type, nutrition_summary['daily_calories'] * share, user_data
+                )
+                fixed_totals += np.nan_to_num(self.axis.meal_matrix([fallback]))[0]
+
+        slots = [
+            (day_index, meal_type)
+            for day_index in range(len(days))
+            for meal_type in meal_types
+            if options[meal_type] is not None
+        ]
+        choice = {slot: options[slot[1]]['default'] for slot in slots}
+        if rng is not None:
+            for slot in slots:
+                slot_options = options[slot[1]]
+                meal_count = len(slot_options['meal_ids']) // len(self.portions)
+                choice[slot] = rng.randrange(meal_count) * len(self.portions) + slot_options['default']
+
+        day_totals = fixed_totals.copy()
+        counts = np.zeros(len(self.engine.meal_index.meals), dtype=int)
+        for (day_index, meal_type), option in choice.items():
+            day_totals[day_index] += options[meal_type]['vectors'][option]
+            counts[options[meal_type]['meal_ids'][option]] += 1
+        week_totals = day_totals.sum(axis=0)
+
+        def objective():
+            repeats = np.maximum(0, counts - self.max_repeats).sum()
+            cost = sum(options[meal_type]['cost_penalty'][option] for (_, meal_type), option in choice.items())
+            return (float(self.day_cost(day_totals, targets).sum()) + float(self.week_cost(week_totals, targets))
+                    + cost + self.weights['repeat'] * repeats)
+
+        def best_move(slot):
+            """Best option for a slot given everything else, and its objective change"""
+            day_index, meal_type = slot
+            slot_options = options[meal_type]
+            current = choice[slot]
+            change = slot_options['vectors'] - slot_options['vectors'][current]
+            meal_ids = slot_options['meal_ids']
+            current_meal = meal_ids[current]
+
+            delta = self.day_cost(day_totals[day_index] + change, targets) - self.day_cost(day_totals[day_index], targets)
+            delta += self.week_cost(week_totals + change, targets) - self.week_cost(week_totals, targets)
+            delta += slot_options['cost_penalty'] - slot_options['cost_penalty'][current]
+            other_meal = meal_ids != current_meal
+            repeat_change = (counts[meal_ids] >= self.max_repeats).astype(float)
+            repeat_change -= float(counts[current_meal] > self.max_repeats)
+            delta += self.weights['repeat'] * np.where(other_meal, repeat_change, 0)
+
+            option = int(np.argmin(delta))
+            return option, float(delta[option])
+
+        def apply(slot, option):
+            day_index, meal_type = slot
+            slot_options = options[meal_type]
+            current = choice[slot]
+            change = slot_options['vectors'][option] - slot_options['vectors'][current]
+            day_totals[day_index] += change
+            week_totals[:] += change
+            counts[slot_options['meal_ids'][current]] -= 1
+            counts[slot_options['meal_ids'][option]] += 1
+            choice[slot] = option
+
+        order = list(slots)
+        best_choice, best_score = dict(choice), objective()
+        restarts = 0
+        complete = True
+        while slots:
+            # Steepest descent, one slot at a time, until a full sweep finds nothing
+            improved = True
+            while improved:
+                if time.perf_counter() >= deadline:
+                    complete = False
+                    break
+                improved = False
+                if rng is not None:
+                    rng.shuffle(order)
+                for slot in order:
+                    option, delta = best_move(slot)
+                    if delta < -1e-9:
+                        apply(slot, option)
+                        improved = True
+
+            score = objective()
+            if score < best_score - 1e-12:
+                best_choice, best_score = dict(choice), score
+            restarts += 1
+            if not complete or rng is None or restarts > self.max_restarts:
+                break
+
+            # Perturb from the best plan and descend again
+            for slot in best_choice:
+                if choice[slot] != best_choice[slot]:
+                    apply(slot, best_choice[slot])
+            for slot in rng.sample(slots, min(self.perturb_slots, len(slots))):
+                apply(slot, rng.randrange(len(options[slot[1]]['meal_ids'])))
+
+        meals = self.engine.meal_index.meals
+        plan = {}
+        for day_index, day in enumerate(days):
+            plan[day] = {}
+            for meal_type in meal_types:
+                slot = (day_index, meal_type)
+                if slot not in best_choice:
+                    plan[day][meal_type] = None
+                    continue
+                slot_options = options[meal_type]
+                option = best_choice[slot]
+                plan[day][meal_type] = (
+                    meals[slot_options['meal_ids'][option]],
+                    float(slot_options['portions'][option])
+                )
+        return plan, complete
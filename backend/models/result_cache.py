@@ -0,0 +1,213 @@
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from models.instrumentation import stage_timings
+
+
+class FrozenDict(dict):
+    """Read-only dict that still serializes as a plain JSON object
+
+    Cached results are handed to many callers; freezing them makes
+    accidental mutation fail loudly instead of corrupting the cache.
+    Use thaw() for a private, mutable copy.
+    """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError('Cached results are read-only; use thaw() for a mutable copy')
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+    __ior__ = _readonly
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+def freeze(value):
+    """Recursively convert dicts/lists into read-only equivalents"""
+    if isinstance(value, FrozenDict):
+        # Already read-only all the way down (freeze built it); share it
+        return value
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    """Recursively copy frozen results back into mutable dicts/lists"""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(item) for item in value]
+    return value
+
+
+class LRUCache:
+    """Bounded, thread-safe LRU mapping with hit/miss counters"""
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Counters for the /metrics endpoint"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+
+class NutritionSummaryCache:
+    """Memoized enhanced nutrition summaries keyed by a quantized profile
+
+    Weight and height are rounded to weight_step/height_step and age to whole
+    years; the summary is computed from those quantized values so every cache
+    entry is a pure function of its key. Results are frozen.
+    """
+
+    def __init__(self, calculator, max_entries=4096, weight_step=0.5, height_step=0.5):
+        self.calculator = calculator
+        self.weight_step = weight_step
+        self.height_step = height_step
+        self.cache = LRUCache(max_entries)
+
+    def _quantize(self, value, step):
+        value = round(float(value) / step) * step
+        return int(value) if value == int(value) else value
+
+    def normalize(self, weight, height, age, gender, goal, timeline):
+        """Quantized profile tuple used both as cache key and as calculator input"""
+        return (
+            self._quantize(weight, self.weight_step),
+            self._quantize(height, self.height_step),
+            int(round(float(age))),
+            gender,
+            goal,
+            timeline
+        )
+
+    @stage_timings.timed('nutrition_summary')
+    def get(self, weight, height, age, gender, goal, timeline='short_term'):
+        """Get a (frozen) enhanced nutrition summary"""
+        key = self.normalize(weight, height, age, gender, goal, timeline)
+        summary = self.cache.get(key)
+        if summary is None:
+            summary = freeze(self.calculator.get_enhanced_nutrition_summary(*key))
+            self.cache.put(key, summary)
+        return summary
+
+    @stage_timings.timed('nutrition_summary')
+    def get_many(self, profiles):
+        """Summaries for many profile dicts; misses are computed in one vectorized batch"""
+        keys = [
+            self.normalize(p['weight'], p['height'], p['age'], p['gender'], p['goal'],
+                           p.get('timeline', 'short_term'))
+            for p in profiles
+        ]
+        summaries = [self.cache.get(key) for key in keys]
+
+        missing = {}
+        for key, summary in zip(keys, summaries):
+            if summary is None and key not in missing:
+                missing[key] = dict(zip(('weight', 'height', 'age', 'gender', 'goal', 'timeline'), key))
+        if missing:
+            computed = self.calculator.get_enhanced_nutrition_summaries(list(missing.values()))
+            fresh = {}
+            for key, summary in zip(missing, computed):
+                fresh[key] = freeze(summary)
+                self.cache.put(key, fresh[key])
+            summaries = [summary if summary is not None else fresh[key] for key, summary in zip(keys, summaries)]
+        return summaries
+
+    def stats(self):
+        return self.cache.stats()
+
+
+def canonical_hash(*parts):
+    """SHA-256 over the canonical JSON form of parts"""
+    canonical = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class PlanResponseCache:
+    """Content-addressed cache of serialized meal-plan responses
+
+    Entries are keyed by a hash of the request profile, the data version and
+    the plan seed. Plan generation is deterministic for that triple, so the
+    key doubles as the response ETag. Bodies are stored already serialized
+    and, if compress is on, gzip-compressed.
+    """
+
+    def __init__(self, max_entries=256, compress=True, compress_level=6):
+        self.compress = compress
+        self.compress_level = compress_level
+        self.cache = LRUCache(max_entries)
+
+    def key(self, profile, data_version, seed):
+        """Content address (and ETag) of a plan response"""
+        return canonical_hash(profile, data_version, seed)[:32]
+
+    def get(self, key, accept_gzip=False):
+        """Return (body, is_gzipped) for a cached response, or None"""
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        body, gzipped = entry
+        if gzipped and not accept_gzip:
+            return gzip.decompress(body), False
+        return body, gzipped
+
+    def clear(self):
+        """Drop every cached response (e.g. after a catalog swap)"""
+        self.cache.clear()
+
+    def put(self, key, body):
+        """Store a serialized response body"""
+        if self.compress:
+            self.cache.put(key, (gzip.compress(body, self.compress_level), True))
+        else:
+            self.cache.put(key, (body, False))
+
+    def stats(self):
+        return self.cache.stats()
@@ -0,0 +1,92 @@
+import gzip
+import json
+import os
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the standard library encoder
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip is offered
+    brotli = None
+
+DEFAULT_COMPRESS_LEVEL = 6
+DEFAULT_BROTLI_QUALITY = 5
+# Smaller bodies are sent as-is; compressing them costs more than it saves
+DEFAULT_COMPRESS_MIN_BYTES = 1024
+
+
+def encode(obj, default=None, sort_keys=False):
+    """Serialize obj to compact UTF-8 JSON bytes with the fastest available encoder"""
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=default, option=option)
+    return json.dumps(
+        obj, default=default, sort_keys=sort_keys, separators=(',', ':'), ensure_ascii=False
+    ).encode('utf-8')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes with encode() (orjson when installed)
+
+    Keeps the default provider's `default` hook and key sorting. Calls that
+    pass json.dumps options (indent, separators, ...) other than the compact
+    separators jsonify uses go to the standard library encoder.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if kwargs and kwargs != {'separators': (',', ':')}:
+            return super().dumps(obj, **kwargs)
+        return encode(obj, self.default, self.sort_keys).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        body = encode(self._prepare_response_obj(args, kwargs), self.default, self.sort_keys)
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
+
+def create_json_provider(app):
+    """JSON provider selected by JSON_ENCODER (auto, orjson or json)"""
+    choice = os.environ.get('JSON_ENCODER', 'auto').lower()
+    if choice == 'json' or (choice == 'auto' and orjson is None):
+        return DefaultJSONProvider(app)
+    if orjson is None:
+        raise ValueError('JSON_ENCODER=orjson needs the orjson package')
+    return FastJSONProvider(app)
+
+
+def available_encodings():
+    """Content codings this process can produce, most preferred first"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(accept_encodings, offered=None):
+    """Best offered content coding the client accepts (werkzeug MIMEAccept-style), or None"""
+    offered = available_encodings() if offered is None else offered
+    best, best_quality = None, 0
+    for encoding in offered:
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body, encoding, level=DEFAULT_COMPRESS_LEVEL):
+    """Compress a response body with the given content coding"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=DEFAULT_BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, level)
+    raise ValueError(f"Unsupported content coding: {encoding}")
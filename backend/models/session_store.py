@@ -0,0 +1,341 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+from models.plan_model import plan_json_default
+
+# diet_chatbot.db lives at the repository root, next to backend/
+DEFAULT_SQLITE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'diet_chatbot.db'
+)
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 10000
+
+
+def new_session():
+    """Fresh conversation state"""
+    return {'step': 'greeting', 'data': {}}
+
+
+class SessionStore:
+    """Interface for chat session persistence
+
+    Handlers load a session once, mutate it while processing the request and
+    write it back with a single save() at the end.
+    """
+
+    def get(self, session_id):
+        """Return the stored session, or None if missing or expired"""
+        raise NotImplementedError
+
+    def save(self, session_id, session, user_id=None):
+        """Persist a session, owned by user_id when the backend tracks owners"""
+        raise NotImplementedError
+
+    def delete(self, session_id):
+        """Remove a session"""
+        raise NotImplementedError
+
+    def get_or_create(self, session_id):
+        """Return the stored session or a fresh one (not saved until save())"""
+        session = self.get(session_id)
+        return session if session is not None else new_session()
+
+    def reset(self, session_id, user_id=None):
+        """Replace a session with fresh conversation state"""
+        self.save(session_id, new_session(), user_id)
+
+
+class MemorySessionStore(SessionStore):
+    """In-process LRU of sessions with TTL eviction"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            session, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._sessions[session_id]
+                return None
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def save(self, session_id, session, user_id=None):
+        with self._lock:
+            self._sessions[session_id] = (session, time.monotonic() + self.ttl)
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_entries:
+                self._sessions.popitem(last=False)
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions persisted in the `chats` table of diet_chatbot.db (WAL mode)
+
+    Chat rows are never removed: `messages` refers to them by chat_id. An
+    expired session reads as missing and the next save overwrites its
+    state in place. Rows are owned by the user_id passed to save(); chats
+    without one belong to a shared guest account in `users`.
+    """
+
+    CREATE_USERS_TABLE = '''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    '''
+
+    CREATE_TABLE = '''
+        CREATE TABLE IF NOT EXISTS chats (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            chat_id TEXT UNIQUE NOT NULL,
+            user_id INTEGER NOT NULL,
+            title TEXT NOT NULL,
+            step TEXT DEFAULT 'greeting',
+            user_data TEXT DEFAULT '{}',
+            plan_data TEXT DEFAULT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    '''
+
+    # (username, email, password_hash) of the guest account; '!' matches no password
+    GUEST_USER = ('guest', 'guest@localhost', '!')
+
+    def __init__(self, path=DEFAULT_SQLITE_PATH, ttl=DEFAULT_TTL, title='Diet Chat'):
+        self.path = path
+        self.ttl = ttl
+        self.title = title
+        self._guest_user_id = None
+        self._local = threading.local()
+        connection = self._connection()
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute(self.CREATE_USERS_TABLE)
+        connection.execute(self.CREATE_TABLE)
+        connection.commit()
+
+    def _connection(self):
+        """One connection per thread"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10)
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def get(self, session_id):
+        row = self._connection().execute(
+            "SELECT step, user_data, plan_data, "
+            "(julianday('now') - julianday(updated_at)) * 86400 "
+            "FROM chats WHERE chat_id = ?",
+            (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        step, user_data, plan_data, age_seconds = row
+        if self.ttl and age_seconds is not None and age_seconds > self.ttl:
+            # Start over, but keep the row (and the chat's messages) for the next save
+            return None
+
+        session = {'step': step or 'greeting', 'data': json.loads(user_data or '{}')}
+        if plan_data:
+            session['plan'] = json.loads(plan_data)
+        return session
+
+    def owner_id(self, user_id):
+        """users.id for a chat: the caller's user, or the guest account if there is none"""
+        connection = self._connection()
+        if user_id is not None:
+            try:
+                user_id = int(user_id)
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid user_id: {user_id!r}")
+            if connection.execute('SELECT 1 FROM users WHERE id = ?', (user_id,)).fetchone() is None:
+                raise ValueError(f"Unknown user_id: {user_id}")
+            return user_id
+        if self._guest_user_id is None:
+            username, email, password_hash = self.GUEST_USER
+            connection.execute(
+                'INSERT OR IGNORE INTO users (username, email, password_hash) VALUES (?, ?, ?)',
+                (username, email, password_hash)
+            )
+            connection.commit()
+            self._guest_user_id = connection.execute(
+                'SELECT id FROM users WHERE username = ?', (username,)
+            ).fetchone()[0]
+        return self._guest_user_id
+
+    def save(self, session_id, session, user_id=None):
+        plan = session.get('plan')
+        connection = self._connection()
+        connection.execute(
+            '''
+            INSERT INTO chats (chat_id, user_id, title, step, user_data, plan_data)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(chat_id) DO UPDATE SET
+                step = excluded.step,
+                user_data = excluded.user_data,
+                plan_data = excluded.plan_data,
+                updated_at = CURRENT_TIMESTAMP
+            ''',
+            (
+                session_id, self.owner_id(user_id), self.title, session.get('step', 'greeting'),
+                json.dumps(session.get('data', {})),
+                json.dumps(plan, default=plan_json_default) if plan is not None else None
+            )
+        )
+        connection.commit()
+
+    def delete(self, session_id):
+        """Clear the session's state; the chat row and its messages stay"""
+        connection = self._connection()
+        connection.execute(
+            "UPDATE chats SET step = 'greeting', user_data = '{}', plan_data = NULL, "
+            "updated_at = CURRENT_TIMESTAMP WHERE chat_id = ?",
+            (session_id,)
+        )
+        connection.commit()
+
+
+class RedisProtocolError(Exception):
+    """Error reply or malformed data from a Redis-protocol server"""
+
+
+class RespClient:
+    """Minimal RESP2 client (no third-party driver needed)"""
+
+    def __init__(self, host='localhost', port=6379, db=0, password=None, timeout=5):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        """Client for a redis://[:password@]host[:port][/db] URL"""
+        parsed = urlparse(url)
+        db = parsed.path.lstrip('/')
+        return cls(
+            host=parsed.hostname or 'localhost',
+            port=parsed.port or 6379,
+            db=int(db) if db else 0,
+            password=parsed.password,
+            **kwargs
+        )
+
+    def _file(self):
+        """Per-thread buffered connection, opened (and authenticated) lazily"""
+        conn = getattr(self._local, 'file', None)
+        if conn is None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            conn = self._local.file = sock.makefile('rwb')
+            if self.password:
+                self._command(conn, 'AUTH', self.password)
+            if self.db:
+                self._command(conn, 'SELECT', self.db)
+        return conn
+
+    def execute(self, *args):
+        """Send one command and return its reply"""
+        conn = self._file()
+        try:
+            return self._command(conn, *args)
+        except (OSError, RedisProtocolError):
+            self._local.file = None
+            conn.close()
+            raise
+
+    def _command(self, conn, *args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode('utf-8')
+            parts.append(b'$%d\r\n%s\r\n' % (len(data), data))
+        conn.write(b''.join(parts))
+        conn.flush()
+        return self._read_reply(conn)
+
+    def _read_reply(self, conn):
+        line = conn.readline()
+        if not line.endswith(b'\r\n'):
+            raise RedisProtocolError('Connection closed')
+        prefix, payload = line[:1], line[1:-2]
+        if prefix == b'+':
+            return payload.decode('utf-8')
+        if prefix == b'-':
+            raise RedisProtocolError(payload.decode('utf-8'))
+        if prefix == b':':
+            return int(payload)
+        if prefix == b'$':
+            length = int(payload)
+            if length < 0:
+                return None
+            data = conn.read(length + 2)
+            return data[:-2]
+        if prefix == b'*':
+            length = int(payload)
+            if length < 0:
+                return None
+            return [self._read_reply(conn) for _ in range(length)]
+        raise RedisProtocolError(f'Unknown reply type: {line!r}')
+
+
+class RedisSessionStore(SessionStore):
+    """Sessions stored as JSON strings in any Redis-protocol server"""
+
+    def __init__(self, url='redis://localhost:6379/0', ttl=DEFAULT_TTL, prefix='diet:session:', client=None):
+        if client is None:
+            client = RespClient.from_url(url)
+        # Anything with execute(*args) -> reply, e.g. a RespClient pointed at a local stand-in
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, session_id):
+        value = self.client.execute('GET', self.prefix + session_id)
+        return json.loads(value) if value is not None else None
+
+    def save(self, session_id, session, user_id=None):
+        args = ['SET', self.prefix + session_id, json.dumps(session, default=plan_json_default)]
+        if self.ttl:
+            args += ['EX', int(self.ttl)]
+        self.client.execute(*args)
+
+    def delete(self, session_id):
+        self.client.execute('DEL', self.prefix + session_id)
+
+
+def create_session_store():
+    """Build the session store selected by SESSION_BACKEND (memory, sqlite, redis)"""
+    backend = os.environ.get('SESSION_BACKEND', 'memory').lower()
+    ttl = int(os.environ.get('SESSION_TTL', DEFAULT_TTL))
+
+    if backend == 'sqlite':
+        return SQLiteSessionStore(os.environ.get('SESSION_DB_PATH', DEFAULT_SQLITE_PATH), ttl=ttl)
+    if backend == 'redis':
+        return RedisSessionStore(os.environ.get('REDIS_URL', 'redis://localhost:6379/0'), ttl=ttl)
+    return MemorySessionStore(int(os.environ.get('SESSION_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)), ttl=ttl)
@@ -0,0 +1,506 @@
+import io
+import json
+import os
+import queue
+import threading
+import time
+import wave
+from collections import deque, namedtuple
+
+from models.catalog import DATA_DIR
+
+DEFAULT_POOL_SIZE = 2
+DEFAULT_MAX_QUEUE = 8
+DEFAULT_QUEUE_TIMEOUT = 10
+DEFAULT_SPEECH_TIMEOUT = 15
+LATENCY_QUANTILES = (0.5, 0.95, 0.99)
+# A WAV data chunk of unknown length (written by streaming encoders)
+WAV_STREAMING_SIZES = (0, 0xFFFFFFFF)
+
+AudioFormat = namedtuple('AudioFormat', ['sample_rate', 'channels', 'sample_width'])
+
+
+class TranscriptionError(Exception):
+    """Base class for voice transcription failures"""
+
+
+class UnintelligibleAudioError(TranscriptionError):
+    """The audio was processed but no speech could be recognized"""
+
+
+class TranscriptionServiceError(TranscriptionError):
+    """The speech engine or remote service failed"""
+
+
+class TranscriberBusyError(TranscriptionError):
+    """Every engine is busy and the wait queue is full (or the wait timed out)"""
+
+
+class LatencyRecorder:
+    """Running count/sum plus quantiles over a window of recent samples"""
+
+    def __init__(self, window=1024):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self.samples.append(seconds)
+            self.count += 1
+            self.total += seconds
+
+    def summary(self, quantiles=LATENCY_QUANTILES):
+        """Quantiles, sum and count in the shape of a Prometheus summary"""
+        with self._lock:
+            ordered = sorted(self.samples)
+            count, total = self.count, self.total
+        values = {}
+        for q in quantiles:
+            values[q] = ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+        return {'quantiles': values, 'sum': total, 'count': count}
+
+
+class WavStreamParser:
+    """Incremental RIFF/WAVE parser for audio that arrives in arbitrary chunks
+
+    feed() returns the PCM payload bytes contained in the chunk (possibly
+    empty); `format` is set once the fmt chunk has been read. Only
+    uncompressed PCM is accepted.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.format = None
+        self.header_read = False
+        self.data_remaining = None
+        self.skip = 0
+
+    def feed(self, chunk):
+        if self.data_remaining is not None:
+            return self._payload(chunk)
+        self.buffer += chunk
+        while self.data_remaining is None:
+            if not self.header_read:
+                if len(self.buffer) < 12:
+                    return b''
+                if self.buffer[:4] != b'RIFF' or self.buffer[8:12] != b'WAVE':
+                    raise UnintelligibleAudioError('Unsupported audio: expected a RIFF/WAVE stream')
+                del self.buffer[:12]
+                self.header_read = True
+            if self.skip:
+                skipped = min(self.skip, len(self.buffer))
+                del self.buffer[:skipped]
+                self.skip -= skipped
+                if self.skip:
+                    return b''
+            if len(self.buffer) < 8:
+                return b''
+            chunk_id = bytes(self.buffer[:4])
+            size = int.from_bytes(self.buffer[4:8], 'little')
+            if chunk_id == b'data':
+                if self.format is None:
+                    raise UnintelligibleAudioError('Unsupported audio: data chunk before fmt chunk')
+                del self.buffer[:8]
+                self.data_remaining = -1 if size in WAV_STREAMING_SIZES else size
+                break
+            if chunk_id == b'fmt ':
+                if len(self.buffer) < 8 + size:
+                    return b''
+                self.format = self._parse_format(bytes(self.buffer[8:8 + size]))
+                del self.buffer[:8 + size + size % 2]
+            else:
+                # Skip LIST/fact/... chunks without holding them in memory
+                del self.buffer[:8]
+                self.skip = size + size % 2
+        rest, self.buffer = bytes(self.buffer), bytearray()
+        return self._payload(rest)
+
+    def _payload(self, chunk):
+        if self.data_remaining < 0:
+            return chunk
+        payload = chunk[:self.data_remaining]
+        self.data_remaining -= len(payload)
+        return payload
+
+    @staticmethod
+    def _parse_format(fmt):
+        if len(fmt) < 16:
+            raise UnintelligibleAudioError('Unsupported audio: truncated fmt chunk')
+        audio_format = int.from_bytes(fmt[0:2], 'little')
+        # WAVE_FORMAT_EXTENSIBLE carries the real format tag in its sub-format GUID
+        if audio_format == 0xFFFE and len(fmt) >= 26:
+            audio_format = int.from_bytes(fmt[24:26], 'little')
+        if audio_format != 1:
+            raise UnintelligibleAudioError('Unsupported audio: only PCM WAV can be streamed')
+        return AudioFormat(
+            sample_rate=int.from_bytes(fmt[4:8], 'little'),
+            channels=int.from_bytes(fmt[2:4], 'little'),
+            sample_width=int.from_bytes(fmt[14:16], 'little') // 8
+        )
+
+
+class BufferedAudioStream:
+    """Streaming session for engines that can only transcribe a whole recording
+
+    PCM is collected as it arrives and transcribed once at the end, so
+    there are no partial transcripts but the upload still skips base64 and
+    JSON decoding.
+    """
+
+    def __init__(self, engine, audio_format):
+        self.engine = engine
+        self.format = audio_format
+        self.pcm = bytearray()
+
+    def accept(self, pcm):
+        self.pcm += pcm
+        return None
+
+    def finish(self):
+        output = io.BytesIO()
+        with wave.open(output, 'wb') as wav:
+            wav.setnchannels(self.format.channels)
+            wav.setsampwidth(self.format.sample_width)
+            wav.setframerate(self.format.sample_rate)
+            wav.writeframes(self.pcm)
+        self.pcm = bytearray()
+        return self.engine.transcribe(output.getvalue())
+
+
+def open_audio_stream(engine, audio_format):
+    """Incremental session on an engine, buffered if it has no streaming API"""
+    if hasattr(engine, 'open_stream'):
+        return engine.open_stream(audio_format)
+    return BufferedAudioStream(engine, audio_format)
+
+
+class GoogleTranscriber:
+    """Web Speech API via speech_recognition (needs network access)"""
+
+    name = 'google'
+
+    def __init__(self, operation_timeout=DEFAULT_SPEECH_TIMEOUT):
+        import speech_recognition as sr
+
+        self.sr = sr
+        self.recognizer = sr.Recognizer()
+        self.recognizer.operation_timeout = operation_timeout
+
+    def transcribe(self, audio_bytes):
+        with self.sr.AudioFile(io.BytesIO(audio_bytes)) as source:
+            audio = self.recognizer.record(source)
+        try:
+            return self.recognizer.recognize_google(audio)
+        except self.sr.UnknownValueError:
+            raise UnintelligibleAudioError('Could not understand audio')
+        except self.sr.RequestError as e:
+            raise TranscriptionServiceError(str(e))
+
+
+class VoskTranscriber:
+    """Offline recognition with a Vosk (Kaldi) model, CPU only
+
+    The model is loaded once per process and shared; each transcription
+    uses its own lightweight recognizer.
+    """
+
+    name = 'vosk'
+    _models = {}
+    _models_lock = threading.Lock()
+
+    def __init__(self, model_path):
+        import vosk
+
+        self.vosk = vosk
+        with self._models_lock:
+            if model_path not in self._models:
+                vosk.SetLogLevel(-1)
+                self._models[model_path] = vosk.Model(model_path)
+        self.model = self._models[model_path]
+
+    def transcribe(self, audio_bytes, chunk_frames=4000):
+        try:
+            wav = wave.open(io.BytesIO(audio_bytes), 'rb')
+        except (wave.Error, EOFError) as e:
+            raise UnintelligibleAudioError(f'Unsupported audio: {e}')
+        with wav:
+            if wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+                raise UnintelligibleAudioError('Audio must be mono 16-bit PCM WAV')
+            recognizer = self.vosk.KaldiRecognizer(self.model, wav.getframerate())
+            while True:
+                frames = wav.readframes(chunk_frames)
+                if not frames:
+                    break
+                recognizer.AcceptWaveform(frames)
+        text = json.loads(recognizer.FinalResult()).get('text', '').strip()
+        if not text:
+            raise UnintelligibleAudioError('Could not understand audio')
+        return text
+
+    def open_stream(self, audio_format):
+        if audio_format.channels != 1 or audio_format.sample_width != 2:
+            raise UnintelligibleAudioError('Audio must be mono 16-bit PCM WAV')
+        return VoskAudioStream(self.vosk.KaldiRecognizer(self.model, audio_format.sample_rate))
+
+
+class VoskAudioStream:
+    """Feeds PCM to a Kaldi recognizer as it arrives and reports partial results"""
+
+    def __init__(self, recognizer):
+        self.recognizer = recognizer
+        self.segments = []
+
+    def accept(self, pcm):
+        """Transcript so far: finished utterances plus the current partial one"""
+        if self.recognizer.AcceptWaveform(bytes(pcm)):
+            segment = json.loads(self.recognizer.Result()).get('text', '').strip()
+            if segment:
+                self.segments.append(segment)
+            partial = ''
+        else:
+            partial = json.loads(self.recognizer.PartialResult()).get('partial', '').strip()
+        return ' '.join(self.segments + [partial] if partial else self.segments)
+
+    def finish(self):
+        segment = json.loads(self.recognizer.FinalResult()).get('text', '').strip()
+        text = ' '.join(self.segments + [segment] if segment else self.segments)
+        if not text:
+            raise UnintelligibleAudioError('Could not understand audio')
+        return text
+
+
+class WhisperTranscriber:
+    """Offline recognition with a Whisper model through faster-whisper (CTranslate2, int8 on CPU)"""
+
+    name = 'whisper'
+
+    def __init__(self, model='base.en', threads=1):
+        from faster_whisper import WhisperModel
+
+        self.model = WhisperModel(model, device='cpu', compute_type='int8', cpu_threads=threads)
+
+    def transcribe(self, audio_bytes):
+        try:
+            segments, _ = self.model.transcribe(io.BytesIO(audio_bytes), beam_size=1)
+            text = ' '.join(segment.text.strip() for segment in segments).strip()
+        except Exception as e:
+            raise TranscriptionServiceError(str(e))
+        if not text:
+            raise UnintelligibleAudioError('Could not understand audio')
+        return text
+
+
+class TranscriberPool:
+    """Bounded pool of speech engines with a bounded wait queue
+
+    At most `size` transcriptions run at once, each on its own engine
+    instance (created on first use, then reused for the life of the
+    worker). Up to `max_queue` further requests wait up to `queue_timeout`
+    seconds for an engine; anything beyond that is rejected immediately
+    with TranscriberBusyError so callers can shed load.
+    """
+
+    def __init__(self, factory, size=DEFAULT_POOL_SIZE, max_queue=DEFAULT_MAX_QUEUE,
+                 queue_timeout=DEFAULT_QUEUE_TIMEOUT):
+        self.factory = factory
+        self.size = size
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._admitted = 0
+        self._lock = threading.Lock()
+        self.latency = LatencyRecorder()
+        self.wait_time = LatencyRecorder()
+        self.outcomes = {'success': 0, 'unintelligible': 0, 'error': 0, 'rejected': 0}
+
+    @property
+    def engine_name(self):
+        return getattr(self.factory, 'name', 'custom')
+
+    def warmup(self):
+        """Load every engine up front instead of on first use"""
+        engines = [self._acquire(None) for _ in range(self.size)]
+        for engine in engines:
+            self._idle.put(engine)
+
+    def _count(self, outcome):
+        with self._lock:
+            self.outcomes[outcome] += 1
+
+    def _acquire(self, timeout):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = self._created < self.size
+            if create:
+                self._created += 1
+        if create:
+            try:
+                return self.factory()
+            except Exception as e:
+                with self._lock:
+                    self._created -= 1
+                raise TranscriptionServiceError(f'Could not load the speech engine: {e}')
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TranscriberBusyError('Timed out waiting for a speech engine')
+
+    def _checkout(self):
+        """Admit a request and hand it an engine; returns (engine, started)"""
+        with self._lock:
+            if self._admitted >= self.size + self.max_queue:
+                self.outcomes['rejected'] += 1
+                raise TranscriberBusyError('Too many voice requests in flight')
+            self._admitted += 1
+
+        started = time.perf_counter()
+        try:
+            engine = self._acquire(self.queue_timeout)
+        except TranscriptionError as e:
+            self._count('rejected' if isinstance(e, TranscriberBusyError) else 'error')
+            self._release(started)
+            raise
+        self.wait_time.record(time.perf_counter() - started)
+        return engine, started
+
+    def _checkin(self, engine, started, outcome):
+        """Return an engine to the pool; returns the request latency"""
+        self._idle.put(engine)
+        self._count(outcome)
+        return self._release(started)
+
+    def _release(self, started):
+        latency = time.perf_counter() - started
+        self.latency.record(latency)
+        with self._lock:
+            self._admitted -= 1
+        return latency
+
+    def transcribe(self, audio_bytes):
+        """Transcribe audio on a pooled engine; returns (text, latency_seconds)"""
+        engine, started = self._checkout()
+        outcome = 'error'
+        try:
+            text = engine.transcribe(audio_bytes)
+            outcome = 'success'
+        except UnintelligibleAudioError:
+            outcome = 'unintelligible'
+            raise
+        finally:
+            latency = self._checkin(engine, started, outcome)
+        return text, latency
+
+    def open_stream(self):
+        """Reserve an engine for a recording that arrives in chunks
+
+        Admission happens here, so TranscriberBusyError is raised before
+        any audio is read. The returned session must be finished or closed.
+        """
+        engine, started = self._checkout()
+        return StreamingTranscription(self, engine, started)
+
+    def stats(self):
+        """Counters and latency summaries for the /metrics endpoint"""
+        with self._lock:
+            in_flight = self._admitted
+        return {
+            'engine': self.engine_name,
+            'pool_size': self.size,
+            'in_flight': in_flight,
+            'queued': max(0, in_flight - self.size),
+            'outcomes': dict(self.outcomes),
+            'latency': self.latency.summary(),
+            'wait_time': self.wait_time.summary()
+        }
+
+
+class StreamingTranscription:
+    """One chunked upload on a pooled engine: WAV bytes in, partial transcripts out"""
+
+    def __init__(self, pool, engine, started):
+        self.pool = pool
+        self.engine = engine
+        self.started = started
+        self.parser = WavStreamParser()
+        self.stream = None
+        self.partial = None
+        self.closed = False
+
+    def feed(self, chunk):
+        """Feed raw upload bytes; returns the transcript so far when it changed"""
+        try:
+            pcm = self.parser.feed(chunk)
+            if self.stream is None and self.parser.format is not None:
+                self.stream = open_audio_stream(self.engine, self.parser.format)
+            if not pcm or self.stream is None:
+                return None
+            partial = self.stream.accept(pcm)
+        except UnintelligibleAudioError:
+            self.close('unintelligible')
+            raise
+        if partial and partial != self.partial:
+            self.partial = partial
+            return partial
+        return None
+
+    def finish(self):
+        """Final transcript once the upload is complete; returns (text, latency_seconds)"""
+        outcome = 'error'
+        try:
+            if self.stream is None:
+                raise UnintelligibleAudioError('No audio received')
+            text = self.stream.finish()
+            outcome = 'success'
+        except UnintelligibleAudioError:
+            outcome = 'unintelligible'
+            raise
+        finally:
+            latency = self.close(outcome)
+        return text, latency
+
+    def close(self, outcome='error'):
+        """Give the engine back to the pool (no-op once finished)"""
+        if self.closed:
+            return None
+        self.closed = True
+        return self.pool._checkin(self.engine, self.started, outcome)
+
+
+def create_transcriber():
+    """Build the transcription pool selected by SPEECH_BACKEND (google, vosk, whisper)"""
+    backend = os.environ.get('SPEECH_BACKEND', 'google').lower()
+    timeout = float(os.environ.get('SPEECH_TIMEOUT', DEFAULT_SPEECH_TIMEOUT))
+
+    if backend == 'vosk':
+        model_path = os.environ.get('SPEECH_MODEL_PATH', os.path.join(DATA_DIR, 'vosk-model'))
+
+        def factory():
+            return VoskTranscriber(model_path)
+    elif backend == 'whisper':
+        model = os.environ.get('SPEECH_MODEL', 'base.en')
+        threads = int(os.environ.get('SPEECH_THREADS', 1))
+
+        def factory():
+            return WhisperTranscriber(model, threads)
+    else:
+        backend = 'google'
+
+        def factory():
+            return GoogleTranscriber(timeout)
+    factory.name = backend
+
+    pool = TranscriberPool(
+        factory,
+        size=int(os.environ.get('SPEECH_POOL_SIZE', DEFAULT_POOL_SIZE)),
+        max_queue=int(os.environ.get('SPEECH_MAX_QUEUE', DEFAULT_MAX_QUEUE)),
+        queue_timeout=float(os.environ.get('SPEECH_QUEUE_TIMEOUT', DEFAULT_QUEUE_TIMEOUT))
+    )
+    if os.environ.get('SPEECH_PRELOAD', '0') == '1':
+        pool.warmup()
+    return pool
@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+# Tests import the app's modules the way app.py does (`from models.x import ...`)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.catalog import DATA_DIR, FoodCatalog, get_default_nutrition_data, load_data_file  # noqa: E402
+from models.diet_engine import DietEngine  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def engine():
+    """Engine over the bundled data files"""
+    nutrition_data = load_data_file('nutrition_data.json', get_default_nutrition_data, DATA_DIR)
+    meal_templates = load_data_file('meals.json', DietEngine.get_default_meal_templates, DATA_DIR)
+    return DietEngine(FoodCatalog(nutrition_data), meal_templates)
+
+
+@pytest.fixture(scope='session')
+def client():
+    """Test client of the Flask app, without the food search database or catalog watcher"""
+    os.environ.setdefault('FOOD_DB_PATH', '')
+    os.environ.setdefault('CATALOG_POLL_SECONDS', '0')
+    from app import app
+    return app.test_client()
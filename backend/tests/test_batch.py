@@ -0,0 +1,40 @@
+import json
+
+import pytest
+
+PROFILE = {
+    'weight': 70, 'height': 170, 'age': 30, 'gender': 'male', 'goal': 'maintain',
+    'food_preference': 'vegetarian', 'region': 'south_indian', 'seed': 1
+}
+
+
+def lines(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+@pytest.mark.parametrize('body', [5, 'abc', {'profiles': 3}, {'profiles': 'abc'}, None])
+def test_batch_body_must_hold_a_list(client, body):
+    response = client.post('/api/meal-plan/batch', data=json.dumps(body), content_type='application/json')
+    assert response.status_code == 400
+    assert response.get_json()['status'] == 'error'
+
+
+def test_batch_body_must_be_json(client):
+    response = client.post('/api/meal-plan/batch', data='not json', content_type='application/json')
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('wrap', [lambda profiles: profiles, lambda profiles: {'profiles': profiles}])
+def test_batch_streams_one_line_per_profile(client, wrap):
+    response = client.post('/api/meal-plan/batch', json=wrap([PROFILE, 'abc', dict(PROFILE, seed=2)]))
+    assert response.status_code == 200
+    results = lines(response)
+    assert [result['status'] for result in results] == ['error', 'success', 'success', 'complete']
+    assert results[-1]['plans'] == 2 and results[-1]['errors'] == 1
+
+
+def test_batch_ndjson(client):
+    body = '\n'.join([json.dumps(PROFILE), '{not json', json.dumps(dict(PROFILE, seed=2))])
+    response = client.post('/api/meal-plan/batch', data=body, content_type='application/x-ndjson')
+    assert response.status_code == 200
+    assert lines(response)[-1] == dict(lines(response)[-1], plans=2, errors=1)
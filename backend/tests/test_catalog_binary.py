@@ -0,0 +1,39 @@
+import os
+import shutil
+import struct
+
+import pytest
+
+from models.catalog import DATA_DIR
+from models.catalog_binary import HEADER, compile_catalog, load_compiled_catalog
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    for filename in ('nutrition_data.json', 'meals.json'):
+        source = os.path.join(DATA_DIR, filename)
+        if os.path.exists(source):
+            shutil.copy2(source, tmp_path)
+    return str(tmp_path)
+
+
+def test_loads_current_catalog(data_dir):
+    compile_catalog(data_dir)
+    assert load_compiled_catalog(data_dir) is not None
+
+
+@pytest.mark.parametrize('damage', [
+    lambda data: b'',
+    lambda data: data[:20],
+    lambda data: data[:len(data) // 2],
+    lambda data: b'NOTACAT\x00' + data[8:],
+    lambda data: data[:8] + struct.pack('<I', 0) + data[12:],
+    lambda data: data[:HEADER.size] + b'\xff' * (len(data) - HEADER.size),
+], ids=['empty', 'truncated-header', 'truncated', 'bad-magic', 'old-format', 'corrupt'])
+def test_unreadable_catalog_is_ignored(data_dir, damage):
+    path = compile_catalog(data_dir)
+    with open(path, 'rb') as f:
+        data = f.read()
+    with open(path, 'wb') as f:
+        f.write(damage(data))
+    assert load_compiled_catalog(data_dir) is None
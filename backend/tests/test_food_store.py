@@ -0,0 +1,67 @@
+import os
+import threading
+
+import pytest
+
+from models.food_store import FoodStore, build_food_db
+
+
+@pytest.fixture(scope='module')
+def store(engine, tmp_path_factory):
+    store = FoodStore(str(tmp_path_factory.mktemp('foods') / 'foods.db'))
+    store.refresh(engine)
+    return store
+
+
+def sort_keys(store):
+    keys = ['name', 'glycemic_index'] + sorted(store.schema()['nutrients'].values())
+    return keys + ['-' + key for key in keys]
+
+
+def test_pagination_returns_every_row_for_every_sort(store):
+    total = len(store.search(limit=100)[0])
+    assert total == 40
+    for sort in sort_keys(store):
+        ids, cursor = [], None
+        while True:
+            foods, cursor = store.search(sort=sort, limit=3, cursor=cursor)
+            ids += [food['id'] for food in foods]
+            if cursor is None:
+                break
+        assert len(ids) == total, sort
+        assert len(set(ids)) == total, sort
+
+
+def test_refresh_only_rebuilds_stale_database(engine, tmp_path):
+    path = str(tmp_path / 'foods.db')
+    first, second = FoodStore(path), FoodStore(path)
+    assert first.refresh(engine)
+    built_at = os.stat(path).st_mtime_ns
+
+    # Another process sharing the file picks it up instead of rebuilding
+    assert second.refresh(engine)
+    assert os.stat(path).st_mtime_ns == built_at
+    assert not first.refresh(engine)
+    assert second.search(limit=1)[0]
+
+
+def test_concurrent_builds_leave_one_complete_database(engine, tmp_path):
+    path = str(tmp_path / 'foods.db')
+    errors = []
+
+    def build():
+        try:
+            build_food_db(path, engine)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=build) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert sorted(os.listdir(tmp_path)) == ['foods.db']
+    store = FoodStore(path)
+    assert store.data_version() == engine.data_version
@@ -0,0 +1,122 @@
+import itertools
+
+import pytest
+
+from models.catalog import KNOWN_SEASONS
+from models.diet_engine import DietEngine
+from models.meal_index import KNOWN_CONDITIONS, KNOWN_DIETS, KNOWN_REGIONS
+
+MEAL_TYPES = ('breakfast', 'lunch', 'snacks', 'dinner')
+STYLES = ('traditional', 'modern', 'both')
+CONDITION_SETS = [[]] + [[condition] for condition in KNOWN_CONDITIONS] + [
+    ['diabetes', 'hypertension'], ['lactose_intolerance', 'nut_allergy', 'gluten_intolerance'], ['unknown']
+]
+
+# Two diets and two seasons the bundled data lacks: a non-vegetarian meal and an out-of-season one
+TEMPLATES = {'meal_templates': {
+    'traditional_meals': {
+        'winter': {
+            'lunch': [
+                {'name': 'Chicken Curry with Rice', 'food_style': 'traditional', 'dietary_type': 'non_vegetarian',
+                 'season': 'winter', 'total_nutrition': {'calories': 550, 'protein': 35}},
+                {'name': 'Palak Paneer with Roti', 'food_style': 'traditional', 'dietary_type': 'vegetarian',
+                 'season': 'winter', 'total_nutrition': {'calories': 480, 'protein': 20}},
+            ]
+        },
+        'summer': {
+            'lunch': [
+                {'name': 'Fish Curry with Rice', 'food_style': 'traditional', 'dietary_type': 'non_vegetarian',
+                 'season': 'summer', 'total_nutrition': {'calories': 500, 'protein': 30}},
+            ]
+        }
+    },
+    'combination_meals': {
+        'fusion_lunch': [
+            {'name': 'Egg Fried Millet', 'food_style': 'fusion', 'dietary_type': 'non_vegetarian',
+             'season': 'year_round', 'total_nutrition': {'calories': 450, 'protein': 22}},
+        ]
+    }
+}}
+
+
+def styles_for(food_style):
+    return (food_style, 'both') if food_style in ('traditional', 'modern') else STYLES
+
+
+def reference_candidates(engine, region, style, season, meal_type, diet, conditions):
+    """The per-request filter: walk every template meal and check it for this profile"""
+    if region not in KNOWN_REGIONS:
+        return []
+    user_data = {'region': region, 'food_preference': diet}
+    names = []
+    for seasons in engine.meal_templates['meal_templates'].values():
+        for season_group, meal_types in seasons.items():
+            if isinstance(meal_types, list):
+                meal_types = {season_group.replace('fusion_', ''): meal_types}
+            for entry in meal_types.get(meal_type, []):
+                meal = engine.meal_index.normalize_template_meal(entry)
+                if style not in styles_for(meal['food_style']):
+                    continue
+                if not engine.is_meal_suitable(meal, user_data, season, conditions):
+                    continue
+                avoided = set()
+                for ingredient in meal['ingredients']:
+                    food = engine.catalog.get(ingredient)
+                    if food:
+                        avoided.update(food['avoid_in_conditions'])
+                if avoided & set(conditions):
+                    continue
+                names.append(meal['name'])
+    return names
+
+
+def grid():
+    return itertools.product(
+        KNOWN_REGIONS + ('east_indian',), STYLES, KNOWN_SEASONS, MEAL_TYPES, KNOWN_DIETS, CONDITION_SETS
+    )
+
+
+@pytest.fixture(scope='module')
+def small_engine(engine):
+    return DietEngine(engine.catalog, TEMPLATES)
+
+
+@pytest.mark.parametrize('engine_name', ['engine', 'small_engine'])
+def test_index_matches_per_request_filter(request, engine_name):
+    engine = request.getfixturevalue(engine_name)
+    mismatches = []
+    for key in grid():
+        expected = reference_candidates(engine, *key)
+        actual = [meal['name'] for meal in engine.meal_index.get_candidates(*key)]
+        if actual != expected:
+            mismatches.append((key, actual, expected))
+    assert not mismatches, mismatches[:5]
+
+
+@pytest.mark.parametrize('season, diet, expected', [
+    ('winter', 'vegetarian', ['Palak Paneer with Roti']),
+    ('winter', 'non_vegetarian', ['Chicken Curry with Rice', 'Palak Paneer with Roti', 'Egg Fried Millet']),
+    ('winter', 'both', ['Chicken Curry with Rice', 'Palak Paneer with Roti', 'Egg Fried Millet']),
+    # Season applies to every diet, not just vegetarian
+    ('summer', 'non_vegetarian', ['Fish Curry with Rice', 'Egg Fried Millet']),
+    ('summer', 'both', ['Fish Curry with Rice', 'Egg Fried Millet']),
+    ('spring', 'vegetarian', []),
+])
+def test_candidate_sets(small_engine, season, diet, expected):
+    candidates = small_engine.meal_index.get_candidates('north_indian', 'traditional', season, 'lunch', diet)
+    assert [meal['name'] for meal in candidates] == expected
+
+
+def test_bundled_candidate_sets(engine):
+    def names(*key):
+        return [meal['name'] for meal in engine.meal_index.get_candidates(*key)]
+
+    assert names('north_indian', 'both', 'winter', 'lunch', 'both') == [
+        'Jowar Bhakri with Winter Vegetables', 'Quinoa Sambar Bowl'
+    ]
+    assert names('south_indian', 'traditional', 'summer', 'breakfast', 'non_vegetarian') == [
+        'Ragi Porridge with Buttermilk', 'Foxtail Millet Upma', 'Ragi Pancakes with Greek Yogurt'
+    ]
+    assert names('south_indian', 'traditional', 'summer', 'breakfast', 'both', ['lactose_intolerance']) == [
+        'Foxtail Millet Upma', 'Ragi Pancakes with Greek Yogurt'
+    ]
@@ -0,0 +1,32 @@
+import pickle
+
+from models.plan_model import WeeklyPlan
+
+PROFILE = {
+    'weight': 70, 'height': 170, 'age': 30, 'gender': 'male', 'goal': 'maintain',
+    'food_preference': 'vegetarian', 'region': 'south_indian', 'seed': 3, 'solver': 'optimize'
+}
+
+
+def test_optimized_plan_is_cached_behind_its_etag(client):
+    body = dict(PROFILE, time_budget_ms=60000)
+    first = client.post('/api/meal-plan', json=body)
+    assert first.status_code == 200 and first.headers['ETag']
+
+    again = client.post('/api/meal-plan', json=body, headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+
+
+def test_plan_cut_short_by_its_budget_is_not_cached(client):
+    body = dict(PROFILE, seed=4, time_budget_ms=1e-9)
+    for _ in range(2):
+        response = client.post('/api/meal-plan', json=body)
+        assert response.status_code == 200
+        assert 'ETag' not in response.headers
+        assert response.headers['Cache-Control'] == 'no-store'
+
+
+def test_weekly_plan_keeps_complete_flag_across_processes():
+    plan = pickle.loads(pickle.dumps(WeeklyPlan({'Monday': {}}, complete=False)))
+    assert not plan.complete
+    assert list(plan) == ['Monday']
@@ -0,0 +1,60 @@
+import threading
+
+import numpy as np
+import pytest
+
+from models.nutrient_vectors import NutrientAxis
+
+
+def test_axis_is_frozen_after_build(engine):
+    axis = engine.nutrient_axis
+    assert axis.frozen
+    assert axis.position('vitamins', 'not_a_vitamin') is None
+    with pytest.raises(ValueError):
+        axis.add('vitamins', 'not_a_vitamin')
+
+
+def test_unknown_nutrients_do_not_grow_the_axis(engine):
+    size = len(engine.nutrient_axis)
+    day = {
+        'breakfast': {'calories': 300, 'macros': {'protein': 10}, 'vitamins': {'made_up_1': 2, 'C': 5}},
+        'lunch': {'calories': 500, 'macros': {'protein': 20}, 'minerals': {'made_up_2': 1}, 'vitamins': {'made_up_1': 3}}
+    }
+
+    totals = engine.calculate_daily_totals(day)
+    assert len(engine.nutrient_axis) == size
+    assert totals['calories'] == 800
+    assert totals['protein'] == 30
+    # Unknown names are still totalled for the call that used them
+    assert totals['vitamins'] == {'C': 5, 'made_up_1': 5}
+    assert totals['minerals'] == {'made_up_2': 1}
+
+
+def test_concurrent_totals_with_unknown_nutrients(engine):
+    size = len(engine.nutrient_axis)
+    errors = []
+
+    def total(worker):
+        try:
+            for index in range(200):
+                day = {'dinner': {'calories': 100, 'vitamins': {f'v_{worker}_{index}': 1}}}
+                assert engine.calculate_daily_totals(day)['vitamins'] == {f'v_{worker}_{index}': 1}
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=total, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert len(engine.nutrient_axis) == size
+
+
+def test_meal_matrix_drops_unknown_nutrients_without_extra():
+    axis = NutrientAxis(vitamins=['C'])
+    axis.freeze()
+    matrix = axis.meal_matrix([{'calories': 10, 'vitamins': {'C': 1, 'Q': 2}}])
+    assert matrix.shape == (1, len(axis))
+    assert matrix[0, axis.position('vitamins', 'C')] == 1
+    assert np.nansum(matrix) == 11
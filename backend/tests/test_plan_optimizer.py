@@ -0,0 +1,48 @@
+import pytest
+
+from models.nutrition import NutritionCalculator
+
+PROFILES = [
+    {'weight': 70, 'height': 170, 'age': 30, 'gender': 'male', 'goal': 'maintain',
+     'food_preference': 'vegetarian', 'region': 'south_indian'},
+    {'weight': 82, 'height': 165, 'age': 45, 'gender': 'female', 'goal': 'weight_loss',
+     'food_preference': 'both', 'region': 'north_indian'},
+    {'weight': 60, 'height': 180, 'age': 22, 'gender': 'male', 'goal': 'weight_gain',
+     'food_preference': 'non_vegetarian', 'region': 'north_indian'},
+]
+
+
+def summary(profile):
+    return NutritionCalculator().get_enhanced_nutrition_summary(
+        profile['weight'], profile['height'], profile['age'], profile['gender'], profile['goal'], 'short_term'
+    )
+
+
+def meals(weekly_plan):
+    return [
+        (day, slot, meal['name'], meal.get('portion'))
+        for day, day_plan in weekly_plan.items()
+        for slot, meal in day_plan.items() if slot != 'totals'
+    ]
+
+
+@pytest.mark.parametrize('profile', PROFILES)
+@pytest.mark.parametrize('seed', [0, 7, 2 ** 62])
+def test_plan_does_not_depend_on_time_budget(engine, profile, seed):
+    plans = [
+        meals(engine.generate_enhanced_weekly_plan(
+            profile, summary(profile), seed=seed, solver='optimize', time_budget_ms=budget
+        ))
+        for budget in (2000, 60000)
+    ]
+    assert plans[0] == plans[1]
+
+
+def test_solve_reports_when_the_budget_runs_out(engine):
+    profile = PROFILES[0]
+    rng = engine.get_plan_rng(0, 'optimize')
+    _, complete = engine.plan_optimizer.solve(profile, summary(profile), rng=rng, time_budget_ms=60000)
+    assert complete
+    plan, complete = engine.plan_optimizer.solve(profile, summary(profile), rng=rng, time_budget_ms=1e-9)
+    assert not complete
+    assert list(plan) == list(engine.DAYS)
@@ -0,0 +1,148 @@
+import socketserver
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from models.session_store import RedisSessionStore, RespClient, SQLiteSessionStore
+
+
+class FakeRedisHandler(socketserver.StreamRequestHandler):
+    """Answers GET/SET [EX]/DEL/TTL/SELECT/AUTH/PING from an in-memory dict"""
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        assert line.startswith(b'*')
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        data = self.server.data
+        while True:
+            args = self.read_command()
+            if args is None:
+                return
+            command, args = args[0].upper(), args[1:]
+            self.server.commands.append([command] + args)
+            if command in (b'PING', b'AUTH', b'SELECT'):
+                self.wfile.write(b'+OK\r\n')
+            elif command == b'SET':
+                key, value = args[0], args[1]
+                expires_at = None
+                if len(args) == 4 and args[2].upper() == b'EX':
+                    expires_at = time.monotonic() + int(args[3])
+                data[key] = (value, expires_at)
+                self.wfile.write(b'+OK\r\n')
+            elif command == b'GET':
+                value, expires_at = data.get(args[0], (None, None))
+                if value is None or (expires_at is not None and expires_at <= time.monotonic()):
+                    self.wfile.write(b'$-1\r\n')
+                else:
+                    self.wfile.write(b'$%d\r\n%s\r\n' % (len(value), value))
+            elif command == b'DEL':
+                self.wfile.write(b':%d\r\n' % (data.pop(args[0], None) is not None))
+            elif command == b'TTL':
+                value, expires_at = data.get(args[0], (None, None))
+                ttl = -2 if value is None else -1 if expires_at is None else int(expires_at - time.monotonic() + 0.5)
+                self.wfile.write(b':%d\r\n' % ttl)
+            else:
+                self.wfile.write(b'-ERR unknown command\r\n')
+            self.wfile.flush()
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakeRedisHandler)
+        self.data = {}
+        self.commands = []
+
+
+@pytest.fixture
+def fake_redis():
+    server = FakeRedisServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_redis_store_round_trip(fake_redis):
+    host, port = fake_redis.server_address
+    store = RedisSessionStore(client=RespClient(host, port), ttl=60, prefix='test:')
+
+    assert store.get('abc') is None
+    store.save('abc', {'step': 'ask_age', 'data': {'weight': 70}})
+    assert store.get('abc') == {'step': 'ask_age', 'data': {'weight': 70}}
+    assert store.client.execute('TTL', 'test:abc') == 60
+
+    store.reset('abc')
+    assert store.get('abc') == {'step': 'greeting', 'data': {}}
+    store.delete('abc')
+    assert store.get('abc') is None
+    assert [b'SET', b'test:abc', b'{"step": "ask_age", "data": {"weight": 70}}', b'EX', b'60'] in fake_redis.commands
+
+
+def test_resp_client_from_url_authenticates_and_selects(fake_redis):
+    host, port = fake_redis.server_address
+    client = RespClient.from_url(f'redis://:secret@{host}:{port}/3')
+    assert client.execute('PING') == 'OK'
+    assert fake_redis.commands[:2] == [[b'AUTH', b'secret'], [b'SELECT', b'3']]
+
+
+@pytest.fixture
+def sqlite_path(tmp_path):
+    return str(tmp_path / 'sessions.db')
+
+
+def test_sqlite_expiry_keeps_chat_row(sqlite_path):
+    store = SQLiteSessionStore(sqlite_path, ttl=60)
+    store.save('chat-1', {'step': 'ask_age', 'data': {'weight': 70}})
+    connection = sqlite3.connect(sqlite_path)
+    connection.execute("UPDATE chats SET updated_at = datetime('now', '-2 minutes') WHERE chat_id = 'chat-1'")
+    connection.commit()
+
+    assert store.get('chat-1') is None
+    assert connection.execute("SELECT COUNT(*) FROM chats WHERE chat_id = 'chat-1'").fetchone()[0] == 1
+
+    store.save('chat-1', {'step': 'greeting', 'data': {}})
+    assert store.get('chat-1') == {'step': 'greeting', 'data': {}}
+    assert connection.execute('SELECT COUNT(*) FROM chats').fetchone()[0] == 1
+
+
+def test_sqlite_delete_clears_state_but_keeps_row(sqlite_path):
+    store = SQLiteSessionStore(sqlite_path)
+    store.save('chat-1', {'step': 'ask_age', 'data': {'weight': 70}, 'plan': {'monday': []}})
+    store.delete('chat-1')
+
+    assert store.get('chat-1') == {'step': 'greeting', 'data': {}}
+    connection = sqlite3.connect(sqlite_path)
+    assert connection.execute('SELECT COUNT(*) FROM chats').fetchone()[0] == 1
+
+
+def test_sqlite_owner_comes_from_caller(sqlite_path):
+    store = SQLiteSessionStore(sqlite_path)
+    connection = sqlite3.connect(sqlite_path)
+    connection.execute("INSERT INTO users (username, email, password_hash) VALUES ('asha', 'asha@example.com', 'x')")
+    connection.commit()
+    user_id = connection.execute("SELECT id FROM users WHERE username = 'asha'").fetchone()[0]
+
+    store.save('mine', {'step': 'greeting', 'data': {}}, user_id)
+    store.save('anonymous', {'step': 'greeting', 'data': {}})
+    owners = dict(connection.execute('SELECT chat_id, user_id FROM chats'))
+    guest_id = connection.execute("SELECT id FROM users WHERE username = 'guest'").fetchone()[0]
+    assert owners == {'mine': user_id, 'anonymous': guest_id}
+
+    with pytest.raises(ValueError):
+        store.save('theirs', {'step': 'greeting', 'data': {}}, user_id + 100)
+    with pytest.raises(ValueError):
+        store.save('theirs', {'step': 'greeting', 'data': {}}, 'not-a-number')
@@ -0,0 +1,166 @@
+import copy
+import json
+
+import pytest
+
+from models.nutrition import NutritionCalculator
+from models.plan_model import plan_json_default
+
+PROFILE = {
+    'weight': 70, 'height': 175, 'age': 30, 'gender': 'male', 'goal': 'weight_loss',
+    'food_preference': 'both', 'region': 'north_indian', 'food_style': 'both',
+    'current_season': 'winter', 'health_conditions': [], 'cost_preference': 'low'
+}
+
+
+@pytest.fixture(scope='module')
+def summary():
+    return NutritionCalculator().get_enhanced_nutrition_summary(70, 175, 30, 'male', 'weight_loss', 'short_term')
+
+
+@pytest.fixture
+def plan(engine, summary):
+    """A generated plan and grocery list in the JSON shape a client posts back"""
+    weekly_plan = engine.generate_enhanced_weekly_plan(
+        PROFILE, summary, PROFILE['health_conditions'], PROFILE['cost_preference'],
+        PROFILE['food_style'], PROFILE['current_season'], seed=4
+    )
+    grocery_list = engine.generate_grocery_list(weekly_plan)
+    return json.loads(json.dumps({'weekly_plan': weekly_plan, 'grocery_list': grocery_list}, default=plan_json_default))
+
+
+def assert_totals_equal(actual, expected):
+    for name in ('calories', 'protein', 'carbs', 'fats', 'fiber'):
+        assert actual[name] == pytest.approx(expected[name]), name
+    for group in ('vitamins', 'minerals'):
+        assert set(actual[group]) == set(expected[group]), group
+        for name, amount in expected[group].items():
+            assert actual[group][name] == pytest.approx(amount), (group, name)
+
+
+def test_candidates_satisfy_constraints(engine):
+    day_meals = []
+    everything = engine.get_swap_candidates('lunch', PROFILE, {}, day_meals)
+    assert everything
+    excluded = everything[0]['name']
+    constraints = {'exclude': [excluded], 'max_calories': 450, 'min_protein': 10, 'cost': 'low'}
+
+    candidates = engine.get_swap_candidates('lunch', PROFILE, constraints, day_meals)
+    expected = [
+        meal for meal in everything
+        if meal['name'] != excluded and meal['calories'] <= 450 and meal['macros'].get('protein', 0) >= 10
+        and engine.estimate_meal_cost(meal['name']) == 'low'
+    ]
+    assert [meal['name'] for meal in candidates] == [meal['name'] for meal in expected]
+
+
+def test_candidates_skip_meals_already_in_the_day(engine):
+    everything = engine.get_swap_candidates('breakfast', PROFILE, {}, [])
+    in_day = everything[:1]
+    names = [meal['name'] for meal in engine.get_swap_candidates('breakfast', PROFILE, {}, in_day)]
+    assert in_day[0]['name'] not in names
+
+
+def test_dietary_type_constraint(engine):
+    for meal in engine.get_swap_candidates('lunch', PROFILE, {'dietary_type': 'vegetarian'}, []):
+        assert meal['dietary_type'] == 'vegetarian'
+
+
+@pytest.mark.parametrize('rebalance', [False, True])
+def test_swap_adjusts_totals_like_a_full_recompute(engine, summary, plan, rebalance):
+    weekly_plan = plan['weekly_plan']
+    old_name = weekly_plan['Monday']['lunch']['name']
+
+    patch = engine.swap_meal(
+        weekly_plan, 'Monday', 'lunch', user_data=PROFILE, nutrition_summary=summary,
+        grocery_list=plan['grocery_list'], rebalance=rebalance
+    )
+    assert patch['meals']['lunch']['name'] != old_name
+    assert weekly_plan['Monday']['lunch'] is patch['meals']['lunch']
+    assert_totals_equal(patch['totals'], engine.calculate_daily_totals(weekly_plan['Monday']))
+
+
+def test_swap_without_totals_recomputes_them(engine, summary, plan):
+    weekly_plan = plan['weekly_plan']
+    del weekly_plan['Tuesday']['totals']
+    patch = engine.swap_meal(weekly_plan, 'Tuesday', 'breakfast', user_data=PROFILE, nutrition_summary=summary)
+    assert_totals_equal(patch['totals'], engine.calculate_daily_totals(weekly_plan['Tuesday']))
+    assert patch['grocery_delta'] is None
+
+
+def test_grocery_delta_matches_a_rebuilt_list(engine, summary, plan):
+    weekly_plan, grocery_list = plan['weekly_plan'], plan['grocery_list']
+    before = copy.deepcopy(grocery_list)
+
+    patch = engine.swap_meal(
+        weekly_plan, 'Wednesday', 'breakfast', user_data=PROFILE, nutrition_summary=summary,
+        grocery_list=grocery_list
+    )
+    assert patch['grocery_list'] == engine.generate_grocery_list(weekly_plan)
+
+    delta = patch['grocery_delta']
+    for category, items in delta['added'].items():
+        for item in items:
+            assert item not in before.get(category, []) and item in grocery_list[category]
+    for category, items in delta['removed'].items():
+        for item in items:
+            assert item in before[category] and item not in grocery_list.get(category, [])
+
+
+def test_rebalance_portions_neighbours_towards_the_target(engine, summary, plan):
+    day_plan = copy.deepcopy(plan['weekly_plan']['Thursday'])
+    before = {slot: day_plan[slot] for slot in engine.MEAL_CALORIE_SHARES}
+    target = summary['daily_calories']
+
+    changed = engine.rebalance_adjacent_slots(day_plan, 'lunch', target)
+    assert set(changed) <= {'breakfast', 'snacks'}
+    for slot, (old, new) in changed.items():
+        assert old is before[slot]
+        assert new['portion'] in engine.plan_optimizer.portions
+        base = old['calories'] / old.get('portion', 1)
+        assert new['calories'] == pytest.approx(base * new['portion'], abs=0.1)
+
+    def day_calories(meals):
+        return sum(meals[slot]['calories'] for slot in engine.MEAL_CALORIE_SHARES)
+    assert abs(day_calories(day_plan) - target) <= abs(day_calories(before) - target)
+
+
+def test_rebalance_keeps_portions_already_on_target(engine):
+    day_plan = {
+        'breakfast': {'calories': 500, 'macros': {}},
+        'lunch': {'calories': 700, 'macros': {}},
+        'snacks': {'calories': 300, 'macros': {}},
+        'dinner': {'calories': 500, 'macros': {}}
+    }
+    assert engine.rebalance_adjacent_slots(day_plan, 'lunch', 2000) == {}
+
+
+def swap_request(plan, **fields):
+    return dict(PROFILE, weekly_plan=plan['weekly_plan'], grocery_list=plan['grocery_list'],
+                day='Monday', meal_type='lunch', **fields)
+
+
+def test_swap_endpoint(client, plan):
+    response = client.post('/api/meal-plan/swap', json=swap_request(plan, rebalance=True))
+    assert response.status_code == 200
+    patch = response.get_json()
+    assert patch['status'] == 'success' and 'lunch' in patch['meals']
+
+
+@pytest.mark.parametrize('fields, error', [
+    ({'day': 'Funday'}, 'Unknown plan slot'),
+    ({'meal_type': 'brunch'}, 'Unknown plan slot'),
+    ({'constraints': {'max_calories': 1}}, 'No alternative meal'),
+])
+def test_swap_endpoint_rejects_bad_requests(client, plan, fields, error):
+    response = client.post('/api/meal-plan/swap', json=dict(swap_request(plan), **fields))
+    assert response.status_code == 400
+    assert error in response.get_json()['error']
+
+
+def test_swap_endpoint_requires_the_plan(client, plan):
+    body = swap_request(plan)
+    del body['weekly_plan']
+    response = client.post('/api/meal-plan/swap', json=body)
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Missing field: weekly_plan'